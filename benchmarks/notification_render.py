@@ -0,0 +1,120 @@
+"""
+Throughput of rendering result notifications: per-message render_to_string (every template is looked up
+and every part is rendered for every recipient) vs NotificationRenderer (templates compiled once,
+the subject and lines of answers rendered once per quiz).
+
+Renders messages of a synthetic quiz without touching the database, with DEBUG off (cached template loader)
+unless it is set in the environment:
+
+    python benchmarks/notification_render.py --participants 5000 --questions 20 --answers 4
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qaas.settings")
+os.environ.setdefault("DATABASE_URL", "sqlite://:memory:")
+os.environ.setdefault("DEBUG", "False")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.mail import EmailMessage, EmailMultiAlternatives  # noqa: E402
+from django.template import TemplateDoesNotExist  # noqa: E402
+from django.template.loader import render_to_string  # noqa: E402
+
+from quiz.notifications import TEMPLATE_PREFIX, NotificationRenderer  # noqa: E402
+
+
+def contexts(participants: int, questions: int, answers: int) -> List[Dict[str, Any]]:
+    quiz = {"quiz_title": "Benchmark quiz", "max_score": questions}
+    choices = [
+        [
+            {
+                "question": f"Question {q} of the benchmark quiz?",
+                "answer": f"Answer {a} to question {q}",
+                "correct": a == 0,
+            }
+            for a in range(answers)
+        ]
+        for q in range(questions)
+    ]
+    result = []
+    for i in range(participants):
+        chosen = [random.choice(question) for question in choices]
+        result.append(
+            {
+                "id": i,
+                "email": f"participant{i}@example.org",
+                "answers": chosen,
+                "score": sum(answer["correct"] for answer in chosen),
+                **quiz,
+            }
+        )
+    return result
+
+
+def render_per_message(context: Dict[str, Any]) -> EmailMessage:
+    """Every part of every message is rendered with render_to_string"""
+    context = {
+        **context,
+        "answers": [
+            {
+                **answer,
+                "text": render_to_string(
+                    f"{TEMPLATE_PREFIX}_answer.txt", answer
+                ).strip(),
+            }
+            for answer in context["answers"]
+        ],
+    }
+    subject = render_to_string(f"{TEMPLATE_PREFIX}_subject.txt", context)
+    subject = " ".join(subject.splitlines()).strip()
+    bodies = {}
+    for ext in ["html", "txt"]:
+        try:
+            template_name = f"{TEMPLATE_PREFIX}_body.{ext}"
+            bodies[ext] = render_to_string(template_name, context).strip()
+        except TemplateDoesNotExist:
+            if ext == "txt" and not bodies:
+                raise
+    msg = EmailMultiAlternatives(
+        subject, bodies["txt"], settings.DEFAULT_FROM_EMAIL, [context["email"]]
+    )
+    if "html" in bodies:
+        msg.attach_alternative(bodies["html"], "text/html")
+    return msg
+
+
+def measure(name: str, render: Callable, items: List[Dict[str, Any]]) -> List[str]:
+    started = time.perf_counter()
+    bodies = [render(context).body for context in items]
+    elapsed = time.perf_counter() - started
+    print(f"{name:>12}: {len(items) / elapsed:.0f} messages/s ({elapsed:.2f}s)")
+    return bodies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--participants", type=int, default=2000)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--answers", type=int, default=4)
+    args = parser.parse_args()
+
+    items = contexts(args.participants, args.questions, args.answers)
+    baseline = measure("per message", render_per_message, items)
+    # a renderer per task, as in notify_chunk
+    renderer = NotificationRenderer()
+    rendered = measure("renderer", renderer.render, items)
+    assert rendered == baseline, "renderers produce different messages"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Load test of participant's hot path: sync (DRF) views vs native async views.
+
+Opens a number of concurrent keep-alive connections and hammers the endpoint
+with GET requests, reporting throughput and latency percentiles for each path.
+
+    python benchmarks/participant_api.py --base-url http://localhost:8000 \\
+        --quiz 1 --token <participant token> --connections 2000 --requests 50000
+
+Measure each path the way it is deployed: the sync path under gunicorn with threaded workers
+(SERVER=wsgi ./run.sh, --mode sync) and the async one under uvicorn (SERVER=asgi ./run.sh, --mode async);
+ulimit -n should allow the requested number of connections
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+PATHS = {
+    "progress": {
+        "sync": "/api/quizzes/{quiz}/my-progress/",
+        "async": "/api/async/quizzes/{quiz}/my-progress/",
+    },
+    "detail": {
+        "sync": "/api/quizzes/{quiz}/",
+        "async": "/api/async/quizzes/{quiz}/",
+    },
+}
+
+
+@dataclass
+class Result:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def report(self, name: str) -> str:
+        if not self.latencies:
+            return f"{name}: no successful requests, {self.errors} errors"
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        return (
+            f"{name}: {len(latencies) / self.elapsed:.0f} req/s, "
+            f"ok {len(latencies)}, errors {self.errors}, "
+            f"mean {statistics.mean(latencies) * 1000:.1f}ms, "
+            f"p50 {percentile(0.5):.1f}ms, p95 {percentile(0.95):.1f}ms, "
+            f"p99 {percentile(0.99):.1f}ms"
+        )
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get("content-length", 0)))
+    if headers.get("connection", "").lower() == "close":
+        raise ConnectionResetError
+    return status
+
+
+async def _worker(
+    host: str,
+    port: int,
+    request: bytes,
+    remaining: List[int],
+    result: Result,
+) -> None:
+    reader: Optional[asyncio.StreamReader] = None
+    writer: Optional[asyncio.StreamWriter] = None
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            await writer.drain()
+            status = await _read_response(reader)  # type: ignore
+        except (OSError, asyncio.IncompleteReadError, ConnectionResetError):
+            result.errors += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            continue
+        if status == 200:
+            result.latencies.append(time.perf_counter() - started)
+        else:
+            result.errors += 1
+    if writer is not None:
+        writer.close()
+
+
+async def run(
+    base_url: str, path: str, token: str, connections: int, requests: int
+) -> Result:
+    url = urlsplit(base_url)
+    host, port = url.hostname or "localhost", url.port or 80
+    request = (
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: {host}:{port}\r\n"
+        f"Quiz-token: {token}\r\n"
+        "Accept: application/json\r\n"
+        "Connection: keep-alive\r\n\r\n"
+    ).encode()
+    result, remaining = Result(), [requests]
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(_worker(host, port, request, remaining, result) for _ in range(connections))
+    )
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--quiz", type=int, required=True)
+    parser.add_argument("--token", required=True, help="participant's token")
+    parser.add_argument("--endpoint", choices=PATHS, default="progress")
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    args = parser.parse_args()
+
+    modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+    for mode in modes:
+        path = PATHS[args.endpoint][mode].format(quiz=args.quiz)
+        result = asyncio.run(
+            run(args.base_url, path, args.token, args.connections, args.requests)
+        )
+        print(result.report(f"{mode:>5} {path}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import json
+from typing import List, Optional
+
+from django.db import connections
+from django.db.models import QuerySet
+from rest_framework import pagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+__all__ = [
+    "KeysetPagination",
+    "Pagination",
+    "estimate_count",
+]
+
+SKIP_COUNT = "false"
+ESTIMATE_COUNT = "estimate"
+
+
+def estimate_count(queryset: QuerySet) -> int:
+    """
+    Number of rows of the queryset estimated by the query planner on PostgreSQL,
+    exact count on other databases
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPagination(pagination.CursorPagination):
+    """
+    Cursor pagination on (created_at, id): every page is read with an index range scan,
+    so deep pages cost the same as the first one
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "limit"
+    max_page_size = 1000
+
+
+class Pagination(pagination.LimitOffsetPagination):
+    """
+    Limit/offset pagination by default. Also:
+    ?pagination=cursor (or ?cursor=...) switches to keyset pagination;
+    ?count=false skips the total count, ?count=estimate takes it from the query planner
+    """
+
+    pagination_query_param = "pagination"
+    count_query_param = "count"
+
+    def __init__(self):
+        self.keyset: Optional[KeysetPagination] = None
+        # set only when the total count is not known exactly
+        self.has_next: Optional[bool] = None
+
+    def paginate_queryset(self, queryset, request, view=None) -> Optional[List]:
+        params = request.query_params
+        if (
+            params.get(self.pagination_query_param) == "cursor"
+            or KeysetPagination.cursor_query_param in params
+        ):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        count_mode = params.get(self.count_query_param)
+        if count_mode not in (SKIP_COUNT, ESTIMATE_COUNT):
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        # one extra row tells whether there is a next page without counting
+        page = list(queryset[self.offset : self.offset + self.limit + 1])
+        self.has_next = len(page) > self.limit
+        self.count = estimate_count(queryset) if count_mode == ESTIMATE_COUNT else None
+        return page[: self.limit]
+
+    def get_paginated_response(self, data) -> Response:
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self) -> Optional[str]:
+        if self.has_next is None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(
+            url, self.offset_query_param, self.offset + self.limit
+        )
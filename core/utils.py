@@ -2,7 +2,9 @@ import datetime
 import importlib
 import random
 import string
-from typing import Iterable, List
+from typing import Iterable, Iterator, List, Tuple
+
+from django.utils import timezone
 
 DEFAULT_CHAR_STRING = string.ascii_lowercase + string.digits
 
@@ -30,5 +32,34 @@ def import_attribute(path):
     return ret
 
 
+def day_bounds(day: datetime.date) -> Tuple[datetime.datetime, datetime.datetime]:
+    """Half-open range [start, end) of the day in the current time zone"""
+    tz = timezone.get_current_timezone()
+    start = datetime.datetime.combine(day, datetime.time.min)
+    end = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min)
+    return timezone.make_aware(start, tz), timezone.make_aware(end, tz)
+
+
 def datetime_to_str(val: datetime.datetime) -> str:
     return val.strftime("%Y_%m_%d_%H%M%S") if val else ""
+
+
+class Echo:
+    """File-like object returning what is written, lets csv.writer produce lines for streaming"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def buffered(chunks: Iterable[str], size: int = 64 * 1024) -> Iterator[str]:
+    """Joins small chunks of a stream into ones of about the given size"""
+    buffer: List[str] = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
@@ -8,6 +8,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
+import datetime
 from pathlib import Path
 from typing import List
 
@@ -88,6 +89,8 @@ WSGI_APPLICATION = "qaas.wsgi.application"
 
 DATABASES = {"default": env.db("DATABASE_URL")}
 
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -137,7 +140,7 @@ REST_FRAMEWORK = {
     ),
     "DEFAULT_FILTER_BACKENDS": ("django_filters.rest_framework.DjangoFilterBackend",),
     "DEFAULT_SCHEMA_CLASS": "rest_framework.schemas.coreapi.AutoSchema",
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.Pagination",
     "PAGE_SIZE": 50,
 }
 
@@ -153,8 +156,64 @@ SITE_ID = 1
 INVITATIONS_INVITATION_MODEL = "quiz.QuizInvitation"
 INVITATIONS_ADMIN_ADD_FORM = "quiz.forms.QuizInvitationAdminAddForm"
 
-MAX_QUESTIONS_PER_QUIZ = 50
-MAX_ANSWERS_PER_QUESTION = 10
-MAX_INVITEES_PER_REQUEST = 50
+MAX_QUESTIONS_PER_QUIZ = env.int("MAX_QUESTIONS_PER_QUIZ", 50)
+MAX_ANSWERS_PER_QUESTION = env.int("MAX_ANSWERS_PER_QUESTION", 10)
+MAX_INVITEES_PER_REQUEST = env.int("MAX_INVITEES_PER_REQUEST", 10000)
+# Rows of uploaded invitee lists validated and inserted at once
+INVITATION_UPLOAD_CHUNK_SIZE = env.int("INVITATION_UPLOAD_CHUNK_SIZE", 1000)
+
+# Bulk import of quizzes: records validated and saved in one transaction, rows per INSERT
+QUIZ_IMPORT_CHUNK_SIZE = env.int("QUIZ_IMPORT_CHUNK_SIZE", 500)
+QUIZ_IMPORT_BATCH_SIZE = env.int("QUIZ_IMPORT_BATCH_SIZE", 1000)
+# Rows of the daily report fetched from the database cursor at once
+REPORT_CHUNK_SIZE = env.int("REPORT_CHUNK_SIZE", 2000)
+# Overlap of consecutive runs of report rollups: rows committed later than their updated_at by more
+# than this may be missed; a day is finalized once it's over by this time
+REPORT_ROLLUP_LAG = datetime.timedelta(seconds=env.int("REPORT_ROLLUP_LAG", 5 * 60))
+# Longest usage report: buckets (hours, days or weeks) within the range
+USAGE_REPORT_MAX_BUCKETS = env.int("USAGE_REPORT_MAX_BUCKETS", 5000)
+# Quizzes exported per round of questions/answers/tags queries
+QUIZ_EXPORT_CHUNK_SIZE = env.int("QUIZ_EXPORT_CHUNK_SIZE", 200)
 
 CELERY_IMPORTS = ("quiz.jobs",)
+
+# Answer keys of quizzes (valid answers and scores) are cached in-process and in the shared cache
+ANSWER_KEY_CACHE_TIMEOUT = env.int("ANSWER_KEY_CACHE_TIMEOUT", 60 * 60)
+ANSWER_KEY_LOCAL_CACHE_SIZE = env.int("ANSWER_KEY_LOCAL_CACHE_SIZE", 1024)
+# Lifetime of item statistics of a quiz, refreshed incrementally with new answers meanwhile
+QUIZ_STATS_CACHE_TIMEOUT = env.int("QUIZ_STATS_CACHE_TIMEOUT", 10 * 60)
+
+# "sync" - answers are saved within the request,
+# "stream" - answers are appended to a Redis stream and saved in batches by drain_answer_stream task
+ANSWER_INGESTION = env.str("ANSWER_INGESTION", "sync")
+ANSWER_STREAM_REDIS_URL = env.str("ANSWER_STREAM_REDIS_URL", CELERY_BROKER_URL)
+ANSWER_STREAM_NAME = "quiz:answers"
+# answers which can't be saved, kept for inspection
+ANSWER_STREAM_DEAD_LETTER_NAME = "quiz:answers:dead"
+ANSWER_STREAM_BATCH_SIZE = env.int("ANSWER_STREAM_BATCH_SIZE", 1000)
+ANSWER_STREAM_CLAIM_IDLE_MS = 60 * 1000
+ANSWER_STREAM_ANSWERED_TTL = 24 * 60 * 60
+
+CELERY_BEAT_SCHEDULE = {
+    "drain-answer-stream": {
+        "task": "drain_answer_stream",
+        "schedule": env.float("ANSWER_STREAM_DRAIN_INTERVAL", 1.0),
+    },
+    "refresh-report-rollups": {
+        "task": "refresh_report_rollups",
+        "schedule": env.float("REPORT_ROLLUP_INTERVAL", 60.0),
+    },
+}
+
+# Participants resolved by invitation tokens are cached for this time (seconds)
+PARTICIPANT_TOKEN_CACHE_TIMEOUT = env.int("PARTICIPANT_TOKEN_CACHE_TIMEOUT", 5 * 60)
+
+# Rows of materialized progress counters per quiz, raise for quizzes with many concurrent participants
+PROGRESS_COUNTER_SHARDS = env.int("PROGRESS_COUNTER_SHARDS", 1)
+
+# Mail sent in background: result notifications per chunk task, invitations per batch task
+# (rendered and sent over one connection), retries of a chunk after a mail error and the delay between them (seconds)
+NOTIFY_CHUNK_SIZE = env.int("NOTIFY_CHUNK_SIZE", 200)
+INVITATION_BATCH_SIZE = env.int("INVITATION_BATCH_SIZE", 200)
+MAIL_MAX_RETRIES = env.int("MAIL_MAX_RETRIES", 3)
+MAIL_RETRY_DELAY = env.int("MAIL_RETRY_DELAY", 60)
@@ -0,0 +1,178 @@
+"""
+Native async (ASGI) implementation of the participant's hot path: quiz details, answering and progress.
+Responses are the same as the ones of QuizViewSet, conditional GET (ETag / Last-Modified, 304) included.
+Database work of a request is done in one hop
+to a worker thread, so the event loop keeps serving other connections while queries are in flight
+"""
+import json
+from typing import Any, Callable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException,
+    MethodNotAllowed,
+    NotFound,
+    ParseError,
+)
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .cache import get_participant_by_token, get_quiz_version
+from .exceptions import QuizException
+from .ingestion import enqueue_answers
+from .models import *
+from .serializers import *
+from .views import ConditionalGetMixin
+
+__all__ = [
+    "quiz_detail",
+    "answer",
+    "progress",
+    "next_question",
+]
+
+TOKEN_HEADER = "Quiz-token"
+
+
+def _get_token(request: HttpRequest) -> Optional[str]:
+    return request.GET.get("token") or request.headers.get(TOKEN_HEADER)
+
+
+def _get_participant(request: HttpRequest, quiz_id: int) -> QuizParticipant:
+    """Participant of the quiz resolved by token or by authenticated user"""
+    token = _get_token(request)
+    if token:
+        participant = get_participant_by_token(token)
+    else:
+        authenticators = [
+            auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ]
+        user = Request(request, authenticators=authenticators).user
+        participant = (
+            QuizParticipant.objects.filter(user=user, quiz_id=quiz_id).first()
+            if user.is_authenticated
+            else None
+        )
+    if participant is None or participant.quiz_id != quiz_id:
+        raise NotFound()
+    request.participant = participant
+    return participant
+
+
+def _quiz_detail(request: HttpRequest, quiz_id: int) -> HttpResponse:
+    _get_participant(request, quiz_id)
+    updated_at = Quiz.objects.values_list("updated_at", flat=True).get(pk=quiz_id)
+
+    def get_response() -> HttpResponse:
+        quiz = Quiz.objects.deep().prefetch_related("tags").get(pk=quiz_id)
+        return JsonResponse(TakeQuizSerializer(quiz, context={"request": request}).data)
+
+    return ConditionalGetMixin._conditional_response(
+        request,
+        get_response,
+        quiz_id,
+        updated_at.timestamp(),
+        get_quiz_version(quiz_id),
+        last_modified=updated_at,
+    )
+
+
+def _answer(request: HttpRequest, quiz_id: int) -> Any:
+    participant = _get_participant(request, quiz_id)
+    if participant.status == QuizParticipant.STATUS.completed:
+        raise QuizException(detail="You have already completed this quiz")
+    try:
+        data = json.loads(request.body)
+    except ValueError as e:
+        raise ParseError(detail=f"JSON parse error - {e}")
+    serializer = ParticipantAnswerSerializer(data=data, context={"request": request})
+    serializer.is_valid(raise_exception=True)
+    if settings.ANSWER_INGESTION == "stream":
+        data = serializer.validated_data
+        answered = enqueue_answers(
+            participant, [(data["question_id"], data["answer_id"])]
+        )
+        return JsonResponse(
+            {
+                "answered_questions_count": answered,
+                "total_questions_count": participant.total_questions_count,
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+    serializer.save()
+    return get_progress_serializer_class(request)(participant).data
+
+
+def _participant_response(
+    request: HttpRequest, quiz_id: int, serializer_class
+) -> HttpResponse:
+    """Same conditional response as the one of QuizViewSet"""
+    participant = _get_participant(request, quiz_id)
+    response = ConditionalGetMixin._conditional_response(
+        request,
+        lambda: JsonResponse(serializer_class(participant).data),
+        serializer_class.__name__,
+        participant.pk,
+        participant.updated_at.timestamp(),
+        get_quiz_version(participant.quiz_id),
+        last_modified=participant.updated_at,
+    )
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+def _progress(request: HttpRequest, quiz_id: int) -> HttpResponse:
+    return _participant_response(
+        request, quiz_id, get_progress_serializer_class(request)
+    )
+
+
+def _next(request: HttpRequest, quiz_id: int) -> HttpResponse:
+    return _participant_response(request, quiz_id, ParticipantNextQuestionSerializer)
+
+
+def _participant_view(method: str, handler: Callable[[HttpRequest, int], Any]):
+    def handle(request: HttpRequest, pk: int) -> Any:
+        # connections of worker threads are not managed by request signals
+        close_old_connections()
+        try:
+            return handler(request, pk)
+        finally:
+            close_old_connections()
+
+    async def view(request: HttpRequest, pk: int) -> JsonResponse:
+        try:
+            if request.method != method:
+                raise MethodNotAllowed(request.method)
+            # thread_sensitive=False lets requests query the database concurrently
+            data = await sync_to_async(handle, thread_sensitive=False)(request, pk)
+            response = (
+                data
+                if isinstance(data, HttpResponse)
+                else JsonResponse(data, safe=False)
+            )
+        except APIException as e:
+            detail = (
+                e.detail if isinstance(e.detail, (list, dict)) else {"detail": e.detail}
+            )
+            response = JsonResponse(detail, status=e.status_code, safe=False)
+        token = _get_token(request)
+        if token:
+            response.headers[TOKEN_HEADER] = token
+        return response
+
+    # csrf_exempt decorator of Django 3.2 is not async-aware,
+    # CSRF is enforced by SessionAuthentication for authenticated users
+    view.csrf_exempt = True
+    return view
+
+
+quiz_detail = _participant_view("GET", _quiz_detail)
+answer = _participant_view("POST", _answer)
+progress = _participant_view("GET", _progress)
+next_question = _participant_view("GET", _next)
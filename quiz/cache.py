@@ -0,0 +1,190 @@
+"""
+Caches of quiz state which is read on every participant's request
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from annoying.functions import get_object_or_None
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Answer, QuizParticipant
+
+__all__ = [
+    "CONTENT",
+    "ACTIVITY",
+    "AnswerKey",
+    "answer_keys",
+    "get_answer_key",
+    "get_quiz_version",
+    "bump_quiz_version",
+    "get_participant_by_token",
+    "evict_participant_token",
+]
+
+
+# Scopes of quiz versions: questions and answers / participants and invitations
+CONTENT = "content"
+ACTIVITY = "activity"
+
+
+def _version_key(quiz_id: int, scope: str) -> str:
+    return f"quiz:{quiz_id}:{scope}-version"
+
+
+def _initial_version() -> int:
+    # versions are not reset to the same values if the cache is flushed
+    return int(time.time() * 1000)
+
+
+def get_quiz_version(quiz_id: int, scope: str = CONTENT) -> int:
+    """Version of quiz data of the given scope, changes on every modification"""
+    key = _version_key(quiz_id, scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key, 0)
+    return version
+
+
+def _bump_quiz_version(quiz_id: int, scope: str) -> None:
+    try:
+        cache.incr(_version_key(quiz_id, scope))
+    except ValueError:  # version is not in the cache yet
+        cache.add(_version_key(quiz_id, scope), _initial_version(), timeout=None)
+
+
+def bump_quiz_version(quiz_id: int, scope: str = CONTENT) -> None:
+    """
+    Invalidates cached data of the quiz of the given scope once the current transaction is committed:
+    invalidated earlier, the old data could be cached again under the new version by a concurrent request
+    """
+    transaction.on_commit(lambda: _bump_quiz_version(quiz_id, scope))
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    """
+    Everything needed to validate and score participant's answers:
+    question id -> {answer id -> correct}, question scores and order of questions
+    """
+
+    quiz_id: int
+    version: int
+    answers: Dict[int, Dict[int, bool]]
+    scores: Dict[int, int]
+    order: Tuple[int, ...]
+
+    @classmethod
+    def load(cls, quiz_id: int, version: int) -> "AnswerKey":
+        rows = (
+            Answer.objects.filter(question__quiz_id=quiz_id)
+            .order_by("question__order", "question_id", "order")
+            .values_list("question_id", "id", "correct", "question__score")
+        )
+        answers: Dict[int, Dict[int, bool]] = {}
+        scores: Dict[int, int] = {}
+        for question_id, answer_id, correct, score in rows:
+            answers.setdefault(question_id, {})[answer_id] = correct
+            scores[question_id] = score
+        return cls(
+            quiz_id=quiz_id,
+            version=version,
+            answers=answers,
+            scores=scores,
+            order=tuple(answers),
+        )
+
+    def has_question(self, question_id: int) -> bool:
+        return question_id in self.answers
+
+    def has_answer(self, question_id: int, answer_id: int) -> bool:
+        return answer_id in self.answers.get(question_id, {})
+
+    def points(self, question_id: int, answer_id: int) -> int:
+        """Score which the answer brings to the participant"""
+        correct = self.answers.get(question_id, {}).get(answer_id, False)
+        return self.scores[question_id] if correct else 0
+
+
+class AnswerKeyCache:
+    """
+    Small in-process LRU of answer keys backed by the shared cache.
+    Entries are checked against the quiz version kept in the shared cache,
+    so a change of questions or answers in any process invalidates them everywhere
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, AnswerKey]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, quiz_id: int) -> AnswerKey:
+        version = get_quiz_version(quiz_id)
+        answer_key = self._get_local(quiz_id, version)
+        if answer_key is None:
+            shared_key = f"quiz:{quiz_id}:answer-key:{version}"
+            answer_key = cache.get(shared_key)
+            if answer_key is None:
+                answer_key = AnswerKey.load(quiz_id, version)
+                cache.set(
+                    shared_key, answer_key, timeout=settings.ANSWER_KEY_CACHE_TIMEOUT
+                )
+            self._set_local(answer_key)
+        return answer_key
+
+    def _get_local(self, quiz_id: int, version: int) -> Optional[AnswerKey]:
+        with self._lock:
+            answer_key = self._entries.get(quiz_id)
+            if answer_key is None or answer_key.version != version:
+                return None
+            self._entries.move_to_end(quiz_id)
+            return answer_key
+
+    def _set_local(self, answer_key: AnswerKey) -> None:
+        with self._lock:
+            self._entries[answer_key.quiz_id] = answer_key
+            self._entries.move_to_end(answer_key.quiz_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+answer_keys = AnswerKeyCache(max_size=settings.ANSWER_KEY_LOCAL_CACHE_SIZE)
+
+
+def get_answer_key(quiz_id: int) -> AnswerKey:
+    return answer_keys.get(quiz_id)
+
+
+def _token_key(token: str) -> str:
+    return f"participant-token:{token}"
+
+
+def get_participant_by_token(token: str) -> Optional[QuizParticipant]:
+    """
+    Participant resolved by the token from invitation.
+    Cached instance is evicted whenever participant is saved or answers
+    """
+    participant = cache.get(_token_key(token))
+    if participant is None:
+        participant = get_object_or_None(QuizParticipant, key=token)
+        if participant is not None:
+            cache.set(
+                _token_key(token),
+                participant,
+                timeout=settings.PARTICIPANT_TOKEN_CACHE_TIMEOUT,
+            )
+    return participant
+
+
+def evict_participant_token(token: str) -> None:
+    """Evicts cached participant once the current transaction is committed, see bump_quiz_version"""
+    transaction.on_commit(lambda: cache.delete(_token_key(token)))
@@ -0,0 +1,86 @@
+"""
+Streaming export of quizzes with questions, answers and tags as JSONL, one quiz per line.
+
+Quizzes are read with a server-side cursor and their questions, answers and tags are fetched
+for a chunk of quizzes at a time, so memory doesn't depend on the number of exported quizzes.
+Lines have the format accepted by the bulk import (see importer.py)
+"""
+import json
+from collections import defaultdict
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import QuerySet
+from taggit.models import TaggedItem
+
+from .models import *
+
+__all__ = [
+    "export_quizzes",
+]
+
+
+def _questions(quiz_ids: List[int], chunk_size: int) -> Dict[int, List[Dict[str, Any]]]:
+    """Questions of the quizzes with answers, by quiz id"""
+    rows = (
+        Question.objects.filter(quiz_id__in=quiz_ids)
+        .order_by("quiz_id", "order", "id", "answers__order")
+        .values_list(
+            "quiz_id",
+            "id",
+            "question",
+            "score",
+            "answers__answer",
+            "answers__correct",
+        )
+    )
+    questions = defaultdict(list)
+    question_id = None
+    for quiz_id, q_id, question, score, answer, correct in rows.iterator(
+        chunk_size=chunk_size
+    ):
+        if q_id != question_id:
+            question_id = q_id
+            questions[quiz_id].append(
+                {"question": question, "score": score, "answers": []}
+            )
+        if answer is not None:
+            questions[quiz_id][-1]["answers"].append(
+                {"answer": answer, "correct": correct}
+            )
+    return questions
+
+
+def _tags(quiz_ids: List[int]) -> Dict[int, List[str]]:
+    tags = defaultdict(list)
+    tagged = TaggedItem.objects.filter(
+        content_type=ContentType.objects.get_for_model(Quiz), object_id__in=quiz_ids
+    ).order_by("tag__name")
+    for quiz_id, name in tagged.values_list("object_id", "tag__name"):
+        tags[quiz_id].append(name)
+    return tags
+
+
+def export_quizzes(
+    quizzes: QuerySet, chunk_size: Optional[int] = None
+) -> Iterator[str]:
+    """Lines of JSONL export of the quizzes, ordered by id"""
+    chunk_size = chunk_size or settings.QUIZ_EXPORT_CHUNK_SIZE
+    rows = (
+        quizzes.order_by("pk")
+        .values("id", "title", "description", "slug")
+        .iterator(chunk_size=chunk_size)
+    )
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        quiz_ids = [quiz["id"] for quiz in chunk]
+        questions = _questions(quiz_ids, chunk_size)
+        tags = _tags(quiz_ids)
+        for quiz in chunk:
+            quiz["tags"] = tags[quiz["id"]]
+            quiz["questions"] = questions[quiz["id"]]
+            yield json.dumps(quiz) + "\n"
@@ -0,0 +1,292 @@
+"""
+Bulk import of quizzes with questions, answers and tags from JSONL or CSV.
+
+Input is parsed as a stream of records, one quiz per record. Records are validated with the rules
+of QuizMakerSerializer in chunks, and every chunk is saved in one transaction with a few bulk inserts,
+so the number of queries depends on the number of chunks rather than quizzes.
+
+JSONL: one quiz per line, the same as the body of POST quizmaker/quizzes/
+CSV: one answer per row with columns title, description, tags, question, score, answer, correct;
+consecutive rows with the same title make up a quiz, consecutive rows with the same question - a question
+
+A file which can't be read further (not UTF-8, malformed CSV) stops the import at that line:
+quizzes read before it are imported, the error is added to the report
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import Any, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import DatabaseError, transaction
+from django.utils.crypto import get_random_string
+from django.utils.text import slugify
+from taggit.models import Tag, TaggedItem
+
+from users.models import User
+
+from .exceptions import QuizException
+from .models import *
+from .serializers import QuizMakerSerializer
+
+__all__ = [
+    "JSONL",
+    "CSV",
+    "FORMATS",
+    "RecordError",
+    "ImportReport",
+    "import_quizzes",
+]
+
+JSONL = "jsonl"
+CSV = "csv"
+FORMATS = (JSONL, CSV)
+
+CSV_COLUMNS = ("title", "description", "tags", "question", "score", "answer", "correct")
+CSV_TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+
+
+@dataclass
+class RecordError:
+    line: int  # line of the file the record starts at
+    title: Optional[str]
+    errors: Any
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    errors: List[RecordError] = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+
+@dataclass
+class _Record:
+    line: int
+    data: Any
+    error: Optional[str] = None
+
+    @property
+    def title(self) -> Optional[str]:
+        return self.data.get("title") if isinstance(self.data, dict) else None
+
+
+class QuizImportSerializer(QuizMakerSerializer):
+    """
+    Rules of QuizMakerSerializer, uniqueness of titles is checked for the whole chunk at once
+    """
+
+    class Meta(QuizMakerSerializer.Meta):
+        extra_kwargs = {"title": {"validators": []}}
+
+
+def _jsonl_records(lines: Iterable[str]) -> Iterator[_Record]:
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield _Record(line_no, json.loads(line))
+        except ValueError as e:
+            yield _Record(line_no, None, f"JSON parse error - {e}")
+
+
+def _csv_records(lines: Iterable[str]) -> Iterator[_Record]:
+    reader = csv.DictReader(lines)
+    missing = set(CSV_COLUMNS) - set(reader.fieldnames or [])
+    if missing:
+        raise QuizException(detail=f"Missing CSV columns: {', '.join(sorted(missing))}")
+    rows = ((reader.line_num, row) for row in reader)
+    for title, quiz_rows in groupby(rows, key=lambda item: item[1]["title"]):
+        quiz_rows = list(quiz_rows)
+        line, first = quiz_rows[0]
+        questions = [
+            {
+                "question": question,
+                "score": question_rows[0]["score"] or 1,
+                "answers": [
+                    {
+                        "answer": row["answer"],
+                        "correct": (row["correct"] or "").strip().lower()
+                        in CSV_TRUE_VALUES,
+                    }
+                    for row in question_rows
+                ],
+            }
+            for question, question_rows in (
+                (question, list(question_rows))
+                for question, question_rows in groupby(
+                    (row for _, row in quiz_rows), key=itemgetter("question")
+                )
+            )
+        ]
+        tags = [tag.strip() for tag in (first["tags"] or "").split(",")]
+        yield _Record(
+            line,
+            {
+                "title": title,
+                "description": first["description"] or None,
+                "tags": [tag for tag in tags if tag],
+                "questions": questions,
+            },
+        )
+
+
+def _chunks(records: Iterator[_Record], size: int) -> Iterator[List[_Record]]:
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _validate(chunk: List[_Record], report: ImportReport) -> List[_Record]:
+    """Records of the chunk which can be saved, errors of the others are added to the report"""
+    valid = []
+    for record in chunk:
+        if record.error is None and not isinstance(record.data, dict):
+            record.error = "Quiz object is expected"
+        if record.error is None:
+            serializer = QuizImportSerializer(data=record.data)
+            if serializer.is_valid():
+                record.data = serializer.validated_data
+            else:
+                record.error = dict(serializer.errors)
+        if record.error is None:
+            valid.append(record)
+        else:
+            report.errors.append(RecordError(record.line, record.title, record.error))
+    taken = set(
+        Quiz.objects.filter(title__in=[r.data["title"] for r in valid]).values_list(
+            "title", flat=True
+        )
+    )
+    unique = []
+    for record in valid:
+        title = record.data["title"]
+        if title in taken:
+            error = {"title": ["quiz with this title already exists."]}
+            report.errors.append(RecordError(record.line, title, error))
+        else:
+            taken.add(title)
+            unique.append(record)
+    return unique
+
+
+def _slugs(titles: List[str]) -> List[str]:
+    slugs = [slugify(title) or "quiz" for title in titles]
+    taken = set(Quiz.objects.filter(slug__in=slugs).values_list("slug", flat=True))
+    result = []
+    for slug in slugs:
+        if slug in taken:
+            slug = f"{slug}-{get_random_string(8).lower()}"
+        taken.add(slug)
+        result.append(slug)
+    return result
+
+
+def _save_tags(quizzes: List[Quiz], tags: List[List[str]]) -> None:
+    names = {name for quiz_tags in tags for name in quiz_tags}
+    if not names:
+        return
+    tag_objs = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    for name in names - set(tag_objs):
+        tag_objs[name], _ = Tag.objects.get_or_create(name=name)
+    content_type = ContentType.objects.get_for_model(Quiz)
+    TaggedItem.objects.bulk_create(
+        TaggedItem(content_type=content_type, object_id=quiz.pk, tag=tag_objs[name])
+        for quiz, quiz_tags in zip(quizzes, tags)
+        for name in set(quiz_tags)
+    )
+
+
+def _save(records: List[_Record], author: User) -> None:
+    """
+    Quizzes of the chunk with their questions, answers and tags.
+    Counters are computed in place, as bulk inserts don't send the signals maintaining them
+    """
+    data = [record.data for record in records]
+    quizzes = [
+        Quiz(
+            author=author,
+            title=quiz["title"],
+            description=quiz.get("description"),
+            slug=slug,
+            question_cnt=len(quiz["questions"]),
+            max_score=sum(question.get("score", 1) for question in quiz["questions"]),
+        )
+        for quiz, slug in zip(data, _slugs([quiz["title"] for quiz in data]))
+    ]
+    batch_size = settings.QUIZ_IMPORT_BATCH_SIZE
+    Quiz.objects.bulk_create(quizzes, batch_size=batch_size)
+    if quizzes[0].pk is None:
+        # the database doesn't return ids of inserted rows
+        ids = dict(
+            Quiz.objects.filter(slug__in=[quiz.slug for quiz in quizzes]).values_list(
+                "slug", "id"
+            )
+        )
+        for quiz in quizzes:
+            quiz.pk = ids[quiz.slug]
+    QuizProgressCounter.create_shards([quiz.pk for quiz in quizzes])
+    Question.objects.bulk_create_with_answers(
+        [(quiz, item["questions"]) for quiz, item in zip(quizzes, data)],
+        batch_size=batch_size,
+    )
+    _save_tags(quizzes, [item.get("tags", []) for item in data])
+
+
+def _counted(lines: Iterable[str], position: List[int]) -> Iterator[str]:
+    """Lines of the file, the number of lines read so far is kept in position"""
+    for line in lines:
+        position[0] += 1
+        yield line
+
+
+def _readable(
+    records: Iterator[_Record], position: List[int], errors: List[RecordError]
+) -> Iterator[_Record]:
+    """Records up to the line which can't be read, the error of that line is added to errors"""
+    try:
+        yield from records
+    except (UnicodeDecodeError, csv.Error) as e:
+        # a line which can't be decoded is not counted, a malformed CSV line is
+        line = position[0] if isinstance(e, csv.Error) else position[0] + 1
+        errors.append(RecordError(line, None, f"Invalid file - {e}"))
+
+
+def import_quizzes(
+    lines: Iterable[str],
+    author: User,
+    format_: str = JSONL,
+    chunk_size: Optional[int] = None,
+) -> ImportReport:
+    """
+    Imports quizzes of the author from lines of a JSONL or CSV file
+    :returns report with the number of created quizzes and errors of every rejected record
+    """
+    parse = _csv_records if format_ == CSV else _jsonl_records
+    report = ImportReport()
+    position, read_errors = [0], []
+    records = _readable(parse(_counted(lines, position)), position, read_errors)
+    for chunk in _chunks(records, chunk_size or settings.QUIZ_IMPORT_CHUNK_SIZE):
+        records = _validate(chunk, report)
+        if not records:
+            continue
+        try:
+            with transaction.atomic():
+                _save(records, author)
+        except DatabaseError as e:
+            # e.g. a quiz with the same title created concurrently
+            report.errors.extend(
+                RecordError(record.line, record.title, str(e)) for record in records
+            )
+        else:
+            report.created += len(records)
+    report.errors.extend(read_errors)
+    return report
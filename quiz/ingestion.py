@@ -0,0 +1,228 @@
+"""
+Write-behind ingestion of participant's answers (ANSWER_INGESTION = "stream").
+
+Answers validated against the cached answer key are appended to a Redis stream and the request returns
+immediately. Set of answered questions of every participant is kept in Redis, so duplicates are rejected
+without touching the database. A Celery task drains the stream in batches into ParticipantAnswer.
+Answers of participants, questions or answers deleted meanwhile are dropped; entries which still
+can't be saved are moved to ANSWER_STREAM_DEAD_LETTER_NAME, so they don't stall the stream.
+"""
+import logging
+import socket
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+import redis
+from django.conf import settings
+from django.core.exceptions import NON_FIELD_ERRORS
+from django.db import IntegrityError, transaction
+
+from .cache import get_answer_key
+from .exceptions import QuizException
+from .models import Answer, ParticipantAnswer, Question, QuizParticipant
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "enqueue_answers",
+    "drain_answer_stream",
+    "save_answers",
+]
+
+CONSUMER_GROUP = "quiz-answers"
+# sentinel member, so that an empty set of a participant still exists after seeding
+SEED_MEMBER = "-"
+
+# KEYS: answered set, stream; ARGV: ttl, participant id, then question, answer, points triples
+ENQUEUE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+for i = 3, #ARGV, 3 do
+    if redis.call('SISMEMBER', KEYS[1], ARGV[i]) == 1 then
+        return -2
+    end
+end
+for i = 3, #ARGV, 3 do
+    redis.call('SADD', KEYS[1], ARGV[i])
+    redis.call('XADD', KEYS[2], '*', 'participant', ARGV[2],
+        'question', ARGV[i], 'answer', ARGV[i + 1], 'points', ARGV[i + 2])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return redis.call('SCARD', KEYS[1]) - 1
+"""
+
+
+@lru_cache(maxsize=None)
+def _redis() -> redis.Redis:
+    return redis.Redis.from_url(settings.ANSWER_STREAM_REDIS_URL)
+
+
+def _answered_key(participant_id: int) -> str:
+    return f"quiz:participant:{participant_id}:answered"
+
+
+def _seed_answered(participant: QuizParticipant) -> None:
+    """Answered set of participant initialized from the database"""
+    answered = participant.answers.values_list("question_id", flat=True)
+    key = _answered_key(participant.id)
+    with _redis().pipeline() as pipe:
+        pipe.sadd(key, SEED_MEMBER, *answered)
+        pipe.expire(key, settings.ANSWER_STREAM_ANSWERED_TTL)
+        pipe.execute()
+
+
+def enqueue_answers(
+    participant: QuizParticipant, answers: Iterable[Tuple[int, int]]
+) -> int:
+    """
+    Appends (question id, answer id) pairs of the participant to the stream
+    :returns number of questions answered by participant so far
+    :raises QuizException if any of the questions has been answered before
+    """
+    answer_key = get_answer_key(participant.quiz_id)
+    args = [settings.ANSWER_STREAM_ANSWERED_TTL, participant.id]
+    for question_id, answer_id in answers:
+        args.extend([question_id, answer_id, answer_key.points(question_id, answer_id)])
+    keys = [_answered_key(participant.id), settings.ANSWER_STREAM_NAME]
+    script = _redis().register_script(ENQUEUE_SCRIPT)
+    result = script(keys=keys, args=args)
+    if result == -1:
+        _seed_answered(participant)
+        result = script(keys=keys, args=args)
+    if result == -2:
+        raise QuizException(
+            detail={NON_FIELD_ERRORS: ["You have already answered this question"]}
+        )
+    return result
+
+
+def _existing_ids(model, ids) -> set:
+    return set(model.objects.filter(pk__in=ids).values_list("pk", flat=True))
+
+
+def save_answers(entries: List[Dict[str, int]]) -> int:
+    """
+    Saves answers read from the stream: bulk insert and one counters update per participant.
+    Answers which are already in the database (e.g. redelivered after a failure) are skipped,
+    as well as the ones whose participant, question or answer has been deleted
+    :returns number of saved answers
+    """
+    participant_ids = {entry["participant"] for entry in entries}
+    with transaction.atomic():
+        participants = QuizParticipant.objects.in_bulk(participant_ids)
+        questions = _existing_ids(Question, {entry["question"] for entry in entries})
+        answers = _existing_ids(Answer, {entry["answer"] for entry in entries})
+        existing = set(
+            ParticipantAnswer.objects.filter(
+                participant_id__in=participant_ids
+            ).values_list("participant_id", "question_id")
+        )
+        objs, points, dropped = [], defaultdict(int), 0
+        for entry in entries:
+            if (
+                entry["participant"] not in participants
+                or entry["question"] not in questions
+                or entry["answer"] not in answers
+            ):
+                dropped += 1
+                continue
+            pair = (entry["participant"], entry["question"])
+            if pair in existing:
+                continue
+            existing.add(pair)
+            objs.append(
+                ParticipantAnswer(
+                    participant_id=entry["participant"],
+                    question_id=entry["question"],
+                    answer_id=entry["answer"],
+                    batched=True,
+                )
+            )
+            points[entry["participant"]] += entry["points"]
+        ParticipantAnswer.objects.bulk_create(
+            objs, batch_size=settings.ANSWER_STREAM_BATCH_SIZE
+        )
+        counts = defaultdict(int)
+        for obj in objs:
+            counts[obj.participant_id] += 1
+        for participant_id, count in counts.items():
+            participants[participant_id].register_answers(count, points[participant_id])
+    if dropped:
+        logger.warning(
+            f"{dropped} answers of deleted participants or questions dropped"
+        )
+    return len(objs)
+
+
+def _ensure_group(client: redis.Redis) -> None:
+    try:
+        client.xgroup_create(
+            settings.ANSWER_STREAM_NAME, CONSUMER_GROUP, id="0", mkstream=True
+        )
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def _parse(messages) -> Tuple[List[bytes], List[Dict[str, int]]]:
+    ids, entries = [], []
+    for message_id, fields in messages:
+        ids.append(message_id)
+        if fields:  # claimed messages which were deleted meanwhile have no fields
+            entries.append({key.decode(): int(value) for key, value in fields.items()})
+    return ids, entries
+
+
+def _save_or_dead_letter(client: redis.Redis, entries: List[Dict[str, int]]) -> int:
+    """
+    Saves answers of the batch, falls back to one by one if the batch fails (e.g. a question is
+    deleted concurrently), answers which still fail are moved to the dead-letter stream
+    :returns number of saved answers
+    """
+    try:
+        return save_answers(entries)
+    except IntegrityError:
+        if len(entries) == 1:
+            logger.exception(f"Answer {entries[0]} moved to the dead-letter stream")
+            client.xadd(settings.ANSWER_STREAM_DEAD_LETTER_NAME, entries[0])
+            return 0
+    return sum(_save_or_dead_letter(client, [entry]) for entry in entries)
+
+
+def drain_answer_stream(max_batches: int = 100) -> int:
+    """
+    Reads the stream in batches until it is empty, saves answers and acknowledges them.
+    Messages left unacknowledged by a failed consumer are claimed back
+    :returns number of saved answers
+    """
+    client = _redis()
+    _ensure_group(client)
+    consumer = socket.gethostname()
+    stream, batch_size = settings.ANSWER_STREAM_NAME, settings.ANSWER_STREAM_BATCH_SIZE
+    _, claimed, *_ = client.xautoclaim(
+        stream,
+        CONSUMER_GROUP,
+        consumer,
+        min_idle_time=settings.ANSWER_STREAM_CLAIM_IDLE_MS,
+        count=batch_size,
+    )
+    saved = 0
+    for _ in range(max_batches):
+        messages = claimed
+        claimed = []
+        if not messages:
+            response = client.xreadgroup(
+                CONSUMER_GROUP, consumer, {stream: ">"}, count=batch_size
+            )
+            messages = response[0][1] if response else []
+        if not messages:
+            break
+        ids, entries = _parse(messages)
+        if entries:
+            saved += _save_or_dead_letter(client, entries)
+        client.xack(stream, CONSUMER_GROUP, *ids)
+        client.xdel(stream, *ids)
+    logger.info(f"{saved} answers saved from the stream")
+    return saved
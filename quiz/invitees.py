@@ -0,0 +1,86 @@
+"""
+Invitation of many emails to a quiz at once, from a JSON list or an uploaded CSV file.
+
+Emails are read as a stream of (line, email) rows, validated and normalized in chunks, and every chunk
+is inserted with a few bulk inserts, so memory doesn't depend on the number of rows. Rejected rows
+(invalid, duplicate, already invited or accepted) are saved with the job and downloadable as CSV.
+
+CSV: a header with the "email" column (case-insensitive) is required, other columns are ignored
+"""
+import csv
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from core.utils import Echo
+from users.models import User
+
+from .cache import ACTIVITY, bump_quiz_version
+from .exceptions import QuizException
+from .jobs import send_invitations
+from .models import *
+
+__all__ = [
+    "csv_rows",
+    "invite",
+    "rejections_report",
+]
+
+CSV_EMAIL_COLUMN = "email"
+REPORT_COLUMNS = ("line", "email", "reason")
+
+
+def csv_rows(lines: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    """(line, email) rows of a CSV file"""
+    reader = csv.reader(lines)
+    header = [column.strip().lower() for column in next(reader, [])]
+    if CSV_EMAIL_COLUMN not in header:
+        raise QuizException(detail=f'Missing CSV column: "{CSV_EMAIL_COLUMN}"')
+    index = header.index(CSV_EMAIL_COLUMN)
+    for row in reader:
+        if not any(row):
+            continue
+        yield reader.line_num, row[index] if index < len(row) else ""
+
+
+def _chunks(rows: Iterator[Tuple[int, Any]], size: int) -> Iterator[List]:
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def invite(
+    quiz: Quiz,
+    rows: Iterable[Tuple[int, Any]],
+    inviter: Optional[User],
+    base_url: str,
+    chunk_size: Optional[int] = None,
+) -> InvitationJob:
+    """
+    The job inviting emails of the (line, email) rows to the quiz.
+    Invitations are sent in background once the transaction of the caller is committed
+    """
+    chunk_size = chunk_size or settings.INVITATION_UPLOAD_CHUNK_SIZE
+    with transaction.atomic():
+        job = InvitationJob.objects.create(
+            quiz=quiz, inviter=inviter, base_url=base_url
+        )
+        for chunk in _chunks(iter(rows), chunk_size):
+            emails, rejections = QuizInvitation.validate_emails(quiz, chunk, job)
+            job.add_invitations(emails, rejections)
+        bump_quiz_version(quiz.pk, ACTIVITY)
+        transaction.on_commit(lambda: send_invitations.delay(job.id))
+    return job
+
+
+def rejections_report(job: InvitationJob) -> Iterator[str]:
+    """Lines of CSV report of rows of the job which haven't been invited"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(REPORT_COLUMNS)
+    rejections = job.rejections.order_by("line", "id").values_list(*REPORT_COLUMNS)
+    for row in rejections.iterator(chunk_size=settings.INVITATION_UPLOAD_CHUNK_SIZE):
+        yield writer.writerow(row)
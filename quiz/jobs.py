@@ -1,72 +1,197 @@
-from typing import Any, Dict, List, Optional
+from itertools import islice
+from typing import List, Optional, Tuple
+from urllib.parse import urljoin
 
 from annoying.functions import get_object_or_None
 from celery.utils.log import get_task_logger
 from django.conf import settings
 from django.core import mail
-from django.core.mail import EmailMessage, EmailMultiAlternatives
-from django.template import TemplateDoesNotExist
-from django.template.loader import render_to_string
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+from rest_framework.reverse import reverse
 
 from qaas.celery import app
-from quiz.models import Quiz, QuizParticipant
+from quiz import ingestion, report
+from quiz.cache import ACTIVITY, bump_quiz_version
+from quiz.models import (
+    ChunkedRun,
+    InvitationJob,
+    NotificationRun,
+    Quiz,
+    QuizInvitation,
+    QuizParticipant,
+)
+from quiz.notifications import NotificationRenderer
 
 logger = get_task_logger(__name__)
 
 
-def _render_notification(
-    email: str,
-    context: Dict[str, Any],
-    template_prefix: str = "quiz/notifications/notification",
-) -> EmailMessage:
-    subject = render_to_string(f"{template_prefix}_subject.txt", context)
-    subject = " ".join(subject.splitlines()).strip()
-
-    bodies = {}
-    for ext in ["html", "txt"]:
-        try:
-            template_name = f"{template_prefix}_body.{ext}"
-            bodies[ext] = render_to_string(template_name, context).strip()
-        except TemplateDoesNotExist:
-            if ext == "txt" and not bodies:
-                raise
-    if "txt" in bodies:
-        msg = EmailMultiAlternatives(
-            subject, bodies["txt"], settings.DEFAULT_FROM_EMAIL, [email]
-        )
-        if "html" in bodies:
-            msg.attach_alternative(bodies["html"], "text/html")
-    else:
-        msg = EmailMessage(
-            subject, bodies["html"], settings.DEFAULT_FROM_EMAIL, [email]
-        )
-        msg.content_subtype = "html"
-    return msg
+def _dispatch(run: ChunkedRun, ids: QuerySet, task, chunk_size: int) -> None:
+    """
+    Splits ids of the recipients of the run into chunks sent by separate tasks.
+    Ids are read with a server-side cursor, so memory doesn't depend on their number
+    """
+    ids = (
+        ids.order_by("id").values_list("id", flat=True).iterator(chunk_size=chunk_size)
+    )
+    total = chunks = 0
+    while True:
+        chunk = list(islice(ids, chunk_size))
+        if not chunk:
+            break
+        task.delay(run.id, chunk)
+        total += len(chunk)
+        chunks += 1
+    run.dispatch(total, chunks)
+
+
+def _send(
+    messages: List[Tuple[int, EmailMessage]]
+) -> Tuple[List[int], Optional[Exception]]:
+    """
+    Sends messages over one connection
+    :returns ids of the recipients the messages were sent to and the error which stopped sending
+    """
+    sent_ids = []
+    connection = mail.get_connection()
+    try:
+        connection.open()
+        for recipient_id, msg in messages:
+            if connection.send_messages([msg]):
+                sent_ids.append(recipient_id)
+    except OSError as e:  # connection and SMTP errors
+        return sent_ids, e
+    finally:
+        connection.close()
+    return sent_ids, None
+
+
+@app.task(name="notify_results")
+def notify(run_id: int) -> None:
+    """Splits participants of the run to notify into chunks of NOTIFY_CHUNK_SIZE"""
+    run = get_object_or_None(NotificationRun, id=run_id)
+    if run is None or run.status != NotificationRun.STATUS.pending:
+        return
+    participants = QuizParticipant.objects.filter(
+        quiz_id=run.quiz_id,
+        status=QuizParticipant.STATUS.completed,
+        notified=False,
+    )
+    _dispatch(run, participants, notify_chunk, settings.NOTIFY_CHUNK_SIZE)
+
+
+@app.task(
+    name="notify_results_chunk",
+    bind=True,
+    max_retries=settings.MAIL_MAX_RETRIES,
+    default_retry_delay=settings.MAIL_RETRY_DELAY,
+)
+def notify_chunk(self, run_id: int, participant_ids: List[int]) -> int:
+    """
+    Sends results to the chunk of participants over one connection and marks them notified.
+    Participants notified already are skipped, so a retry sends only the rest of the chunk
+    :returns number of sent messages
+    """
+    run = NotificationRun.objects.select_related("quiz").get(id=run_id)
+    contexts = run.quiz.summary(id__in=participant_ids, notified=False)
+    renderer = NotificationRenderer()
+    messages = [(context["id"], renderer.render(context)) for context in contexts]
+    sent_ids, error = _send(messages)
 
+    if sent_ids:
+        QuizParticipant.objects.filter(id__in=sent_ids).update(notified=True)
+        # bulk updates don't send signals, cached listings of participants are invalidated here
+        bump_quiz_version(run.quiz_id, ACTIVITY)
+    if error is not None and self.request.retries < self.max_retries:
+        run.add(sent=len(sent_ids))
+        logger.info(f"Mail error, chunk of run {run_id} will be retried: {error}")
+        raise self.retry(exc=error)
+    if error is not None:
+        logger.warning(f"Mail error, chunk of run {run_id} is given up: {error}")
+    run.add(sent=len(sent_ids), failed=len(messages) - len(sent_ids), chunks_done=1)
+    run.finish_if_done()
+    return len(sent_ids)
 
-@app.task(name="notify_participants")
-def notify(quiz_id: int) -> List[int]:
-    quiz = get_object_or_None(Quiz, id=quiz_id)
-    quiz_summary = list(quiz.summary(notified=False))
+
+@app.task(name="send_invitations")
+def send_invitations(job_id: int) -> None:
+    """Splits queued invitations of the job into batches of INVITATION_BATCH_SIZE"""
+    job = get_object_or_None(InvitationJob, id=job_id)
+    if job is None or job.status != InvitationJob.STATUS.pending:
+        return
+    invitations = job.invitations.filter(sent__isnull=True, delivery_failed=False)
+    _dispatch(job, invitations, send_invitations_batch, settings.INVITATION_BATCH_SIZE)
+
+
+@app.task(
+    name="send_invitations_batch",
+    bind=True,
+    max_retries=settings.MAIL_MAX_RETRIES,
+    default_retry_delay=settings.MAIL_RETRY_DELAY,
+)
+def send_invitations_batch(self, job_id: int, invitation_ids: List[int]) -> int:
+    """
+    Sends the batch of invitations over one connection and marks them sent.
+    A retry sends only invitations which haven't been sent yet, those left after the last one are marked failed
+    :returns number of sent invitations
+    """
+    job = InvitationJob.objects.get(id=job_id)
+    invitations = job.invitations.select_related("quiz", "inviter").filter(
+        id__in=invitation_ids, sent__isnull=True, delivery_failed=False
+    )
     messages = [
-        _render_notification(participant["email"], participant)
-        for participant in quiz_summary
+        (
+            invitation.id,
+            invitation.render_invitation(
+                urljoin(job.base_url, reverse("accept-invite", args=[invitation.key]))
+            ),
+        )
+        for invitation in invitations
     ]
-    if messages:
-        try:
-            with mail.get_connection():
-                for msg in messages:
-                    msg.send()
-            return [p["id"] for p in quiz_summary]
-        except ConnectionError as e:
-            logger.info(f"Mail connection error, details: {e}")
+    sent_ids, error = _send(messages)
 
+    if sent_ids:
+        QuizInvitation.objects.filter(id__in=sent_ids).update(sent=timezone.now())
+    if error is not None and self.request.retries < self.max_retries:
+        job.add(sent=len(sent_ids))
+        logger.info(f"Mail error, batch of job {job_id} will be retried: {error}")
+        raise self.retry(exc=error)
+    if error is not None:
+        logger.warning(f"Mail error, batch of job {job_id} is given up: {error}")
+        failed_ids = {id_ for id_, _ in messages} - set(sent_ids)
+        QuizInvitation.objects.filter(id__in=failed_ids).update(delivery_failed=True)
+    job.add(sent=len(sent_ids), failed=len(messages) - len(sent_ids), chunks_done=1)
+    job.finish_if_done()
+    return len(sent_ids)
 
-@app.task(name="set_notified")
-def set_notified(participant_ids: Optional[List[int]]) -> None:
-    if participant_ids:
-        QuizParticipant.objects.filter(id__in=participant_ids).update(notified=True)
 
+@app.task(name="refresh_report_rollups", ignore_result=True)
+def refresh_report_rollups() -> None:
+    report.refresh_rollups()
 
-def notify_participants(quiz: Quiz) -> None:
-    (notify.s(quiz.id) | set_notified.s()).apply_async()
+
+@app.task(name="drain_answer_stream", ignore_result=True)
+def drain_answer_stream() -> None:
+    if settings.ANSWER_INGESTION == "stream":
+        ingestion.drain_answer_stream()
+
+
+def notify_participants(quiz: Quiz) -> NotificationRun:
+    """
+    Starts sending results to participants who completed the quiz and weren't notified yet.
+    While a run of the quiz is in progress, that run is returned instead, so nobody is notified twice
+    """
+    with transaction.atomic():
+        # concurrent requests for the same quiz wait for each other here
+        list(Quiz.objects.select_for_update().filter(pk=quiz.pk).values_list("pk"))
+        run = (
+            quiz.notification_runs.exclude(status=NotificationRun.STATUS.finished)
+            .order_by("-id")
+            .first()
+        )
+        if run is None:
+            run = NotificationRun.objects.create(quiz=quiz)
+            transaction.on_commit(lambda: notify.delay(run.id))
+    return run
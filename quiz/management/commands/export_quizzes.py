@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from quiz.exporter import export_quizzes
+from quiz.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Exports quizzes with questions, answers and tags as JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--author", help="Export only quizzes of the user with given username"
+        )
+        parser.add_argument("--output", help="File to write to, stdout by default")
+        parser.add_argument(
+            "--chunk-size", type=int, help="Number of quizzes read at a time"
+        )
+
+    def handle(self, *args, author=None, output=None, chunk_size=None, **options):
+        quizzes = Quiz.objects.all()
+        if author:
+            quizzes = quizzes.filter(author__username=author)
+        lines = export_quizzes(quizzes, chunk_size)
+        if output:
+            with open(output, "w") as file:
+                file.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
@@ -0,0 +1,57 @@
+import json
+from dataclasses import asdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.exceptions import QuizException
+from quiz.importer import CSV, FORMATS, JSONL, import_quizzes
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Imports quizzes with questions, answers and tags from a JSONL or CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSONL or CSV file")
+        parser.add_argument(
+            "--author", required=True, help="Username of the author of the quizzes"
+        )
+        parser.add_argument(
+            "--format",
+            dest="format_",
+            choices=FORMATS,
+            help="Format of the file, by default taken from its extension",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, help="Number of quizzes saved in one transaction"
+        )
+        parser.add_argument(
+            "--report",
+            help="File to write rejected records to as JSONL, stderr by default",
+        )
+
+    def handle(
+        self, path, author, format_=None, chunk_size=None, report=None, **options
+    ):
+        try:
+            user = User.objects.get(username=author)
+        except User.DoesNotExist:
+            raise CommandError(f"User {author} does not exist")
+        format_ = format_ or (CSV if path.lower().endswith(".csv") else JSONL)
+        try:
+            with open(path, encoding="utf-8-sig", newline="") as lines:
+                result = import_quizzes(lines, user, format_, chunk_size)
+        except (OSError, QuizException) as e:
+            raise CommandError(str(e))
+        errors = (json.dumps(asdict(error)) for error in result.errors)
+        if report:
+            with open(report, "w") as output:
+                output.writelines(f"{error}\n" for error in errors)
+        else:
+            for error in errors:
+                self.stderr.write(error)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{result.created} quizzes imported, {result.failed} records rejected"
+            )
+        )
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from quiz.cache import ACTIVITY, bump_quiz_version
+from quiz.models import Quiz, QuizParticipant, QuizProgressCounter
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds denormalized question/answer counters and scores of quizzes and participants, "
+        "and progress counters of quizzes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--quiz",
+            type=int,
+            action="append",
+            dest="quiz_ids",
+            help="Rebuild counters only for the quiz with given id (can be repeated)",
+        )
+
+    def handle(self, *args, quiz_ids=None, **options):
+        quizzes = Quiz.objects.all()
+        participants = QuizParticipant.objects.all()
+        if quiz_ids:
+            quizzes = quizzes.filter(id__in=quiz_ids)
+            participants = participants.filter(quiz_id__in=quiz_ids)
+        with transaction.atomic():
+            quiz_cnt = quizzes.refresh_counters()
+            participant_cnt = participants.refresh_counters()
+            QuizProgressCounter.rebuild(quizzes)
+            # counters are rebuilt by bulk updates, which don't invalidate cached data
+            for quiz_id in quizzes.values_list("pk", flat=True).iterator():
+                bump_quiz_version(quiz_id)
+                bump_quiz_version(quiz_id, ACTIVITY)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Counters rebuilt for {quiz_cnt} quizzes and {participant_cnt} participants"
+            )
+        )
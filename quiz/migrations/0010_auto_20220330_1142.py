@@ -1,11 +1,51 @@
-from django.core.management import call_command
+import json
+import os
+
+from django.core.management.color import no_style
 from django.db import migrations
 
-fixture = "initial"
+fixture = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "initial.json")
 
 
 def load_fixture(apps, schema_editor):
-    call_command("loaddata", fixture, app_label="quiz")
+    # Fixture is loaded with historical models,
+    # otherwise fields added to the models later break this migration
+    with open(fixture) as f:
+        records = json.load(f)
+    using = schema_editor.connection.alias
+    models = []
+    for record in records:
+        model = apps.get_model(record["model"])
+        if model not in models:
+            models.append(model)
+        fields = {"pk": record["pk"]}
+        many_to_many = {}
+        for name, value in record["fields"].items():
+            field = model._meta.get_field(name)
+            if field.many_to_many:
+                many_to_many[name] = value
+            elif field.is_relation:
+                fields[field.attname] = value
+            else:
+                fields[name] = field.to_python(value)
+        obj = model(**fields)
+        model._base_manager.using(using).bulk_create([obj])
+        # auto_now(_add) fields are set on insert, the ones of the fixture are kept
+        timestamps = {
+            field.name: fields[field.name]
+            for field in model._meta.concrete_fields
+            if getattr(field, "auto_now", False)
+            or getattr(field, "auto_now_add", False)
+            if field.name in fields
+        }
+        if timestamps:
+            model._base_manager.using(using).filter(pk=obj.pk).update(**timestamps)
+        for name, value in many_to_many.items():
+            getattr(obj, name).set(value)
+    # rows are inserted with explicit ids
+    with schema_editor.connection.cursor() as cursor:
+        for sql in schema_editor.connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
 
 
 class Migration(migrations.Migration):
@@ -0,0 +1,67 @@
+# Generated by Django 3.2.25 on 2026-10-17 01:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def _aggregate(queryset, field, aggregate):
+    subquery = queryset.order_by().values(field).annotate(result=aggregate)
+    return Coalesce(Subquery(subquery.values("result")), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Quiz = apps.get_model("quiz", "Quiz")
+    Question = apps.get_model("quiz", "Question")
+    QuizParticipant = apps.get_model("quiz", "QuizParticipant")
+    ParticipantAnswer = apps.get_model("quiz", "ParticipantAnswer")
+
+    questions = Question.objects.filter(quiz=OuterRef("pk"))
+    Quiz.objects.update(
+        question_cnt=_aggregate(questions, "quiz", Count("pk")),
+        max_score=_aggregate(questions, "quiz", Sum("score")),
+    )
+    answers = ParticipantAnswer.objects.filter(participant=OuterRef("pk"))
+    QuizParticipant.objects.update(
+        answered_questions_count=_aggregate(answers, "participant", Count("pk")),
+        current_score=_aggregate(
+            answers.filter(answer__correct=True),
+            "participant",
+            Sum("question__score"),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0010_auto_20220330_1142"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="quiz",
+            name="max_score",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="max score"
+            ),
+        ),
+        migrations.AddField(
+            model_name="quiz",
+            name="question_cnt",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="number of questions"
+            ),
+        ),
+        migrations.AddField(
+            model_name="quizparticipant",
+            name="answered_questions_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="quizparticipant",
+            name="current_score",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-17 01:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0011_denormalized_counters"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="quizparticipant",
+            name="key",
+            field=models.CharField(max_length=100, unique=True),
+        ),
+    ]
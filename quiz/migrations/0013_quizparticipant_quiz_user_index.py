@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-17 01:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0012_quizparticipant_unique_key"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="quizparticipant",
+            index=models.Index(
+                fields=["quiz", "user"], name="quiz_quizpa_quiz_id_466f13_idx"
+            ),
+        ),
+    ]
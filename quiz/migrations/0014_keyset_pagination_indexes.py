@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-17 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0013_quizparticipant_quiz_user_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="quiz",
+            index=models.Index(
+                fields=["author", "created_at", "id"],
+                name="quiz_quiz_author__bb7a3d_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="quizinvitation",
+            index=models.Index(
+                fields=["quiz", "created_at", "id"],
+                name="quiz_quizin_quiz_id_07ba52_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="quizparticipant",
+            index=models.Index(
+                fields=["quiz", "created_at", "id"],
+                name="quiz_quizpa_quiz_id_dae736_idx",
+            ),
+        ),
+    ]
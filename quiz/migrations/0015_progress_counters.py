@@ -0,0 +1,69 @@
+# Generated by Django 3.2.25 on 2026-10-17 01:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    QuizProgressCounter = apps.get_model("quiz", "QuizProgressCounter")
+    QuizInvitation = apps.get_model("quiz", "QuizInvitation")
+    QuizParticipant = apps.get_model("quiz", "QuizParticipant")
+
+    counters = {}
+    invitations = QuizInvitation.objects.order_by().values("quiz_id", "accepted")
+    for row in invitations.annotate(count=Count("pk")):
+        counter = counters.setdefault(
+            row["quiz_id"], QuizProgressCounter(quiz_id=row["quiz_id"])
+        )
+        field = "invitations_accepted" if row["accepted"] else "invitations_pending"
+        setattr(counter, field, row["count"])
+    participants = QuizParticipant.objects.order_by().values("quiz_id", "status")
+    for row in participants.annotate(count=Count("pk")):
+        counter = counters.setdefault(
+            row["quiz_id"], QuizProgressCounter(quiz_id=row["quiz_id"])
+        )
+        setattr(counter, f"participants_{row['status']}", row["count"])
+    QuizProgressCounter.objects.bulk_create(counters.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0014_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QuizProgressCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shard", models.PositiveSmallIntegerField(default=0)),
+                ("invitations_pending", models.IntegerField(default=0)),
+                ("invitations_accepted", models.IntegerField(default=0)),
+                ("participants_accepted", models.IntegerField(default=0)),
+                ("participants_attempted", models.IntegerField(default=0)),
+                ("participants_completed", models.IntegerField(default=0)),
+                (
+                    "quiz",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="progress_counters",
+                        to="quiz.quiz",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("quiz", "shard")},
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 3.2.25 on 2026-10-17 01:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0017_invitation_jobs"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="invitationjob",
+            name="invalid",
+        ),
+        migrations.AddField(
+            model_name="invitationjob",
+            name="rejected",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="InvitationRejection",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("line", models.PositiveIntegerField()),
+                ("email", models.TextField()),
+                (
+                    "reason",
+                    models.CharField(
+                        choices=[
+                            ("invalid email", "invalid email"),
+                            ("duplicate", "duplicate"),
+                            ("pending invite", "pending invite"),
+                            ("already accepted", "already accepted"),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rejections",
+                        to="quiz.invitationjob",
+                    ),
+                ),
+            ],
+        ),
+    ]
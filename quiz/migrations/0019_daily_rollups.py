@@ -0,0 +1,96 @@
+# Generated by Django 3.2.25 on 2026-10-17 01:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0018_invitation_rejections"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(unique=True)),
+                ("quizzes_created", models.PositiveIntegerField(default=0)),
+                ("participants", models.PositiveIntegerField(default=0)),
+                ("participants_completed", models.PositiveIntegerField(default=0)),
+                ("answers_given", models.PositiveIntegerField(default=0)),
+                ("finalized_at", models.DateTimeField(blank=True, null=True)),
+                ("csv_report", models.TextField(blank=True)),
+                ("json_report", models.TextField(blank=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="RollupWatermark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=64, unique=True)),
+                ("value", models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DailyQuizRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("quiz_created", models.BooleanField(default=False)),
+                ("participants_accepted", models.PositiveIntegerField(default=0)),
+                ("participants_attempted", models.PositiveIntegerField(default=0)),
+                ("participants_completed", models.PositiveIntegerField(default=0)),
+                ("answers_given", models.PositiveIntegerField(default=0)),
+                ("score_total", models.PositiveIntegerField(default=0)),
+                (
+                    "quiz",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_rollups",
+                        to="quiz.quiz",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("day", "quiz")},
+            },
+        ),
+        migrations.AddIndex(
+            model_name="quiz",
+            index=models.Index(
+                fields=["updated_at"], name="quiz_quiz_updated_be8ddd_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="quizparticipant",
+            index=models.Index(
+                fields=["updated_at"], name="quiz_quizpa_updated_1401e1_idx"
+            ),
+        ),
+    ]
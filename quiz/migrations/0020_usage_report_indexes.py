@@ -0,0 +1,35 @@
+# Generated by Django 3.2.25 on 2026-10-17 01:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0019_daily_rollups"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="participantanswer",
+            index=models.Index(
+                fields=["created_at"], name="quiz_partic_created_1f6548_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="quizinvitation",
+            index=models.Index(fields=["sent"], name="quiz_quizin_sent_b99453_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="quiz",
+            index=models.Index(
+                fields=["created_at"], name="quiz_quiz_created_8a9e8a_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="quizparticipant",
+            index=models.Index(
+                fields=["created_at"], name="quiz_quizpa_created_a00a8c_idx"
+            ),
+        ),
+    ]
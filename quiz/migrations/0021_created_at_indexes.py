@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-17 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0020_usage_report_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="quizinvitation",
+            index=models.Index(
+                fields=["created_at"], name="quiz_quizin_created_7e897e_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0021_created_at_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="participantanswer",
+            name="batched",
+            field=models.BooleanField(default=False),
+        ),
+    ]
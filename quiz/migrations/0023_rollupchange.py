@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0022_participant_answer_batched"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RollupChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("quiz_id", models.PositiveIntegerField()),
+            ],
+        ),
+    ]
@@ -1,33 +1,58 @@
 import datetime
 import logging
+import random
 from functools import reduce
 from itertools import groupby
 from operator import itemgetter, or_
-from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from annoying.functions import get_object_or_None
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.mail import EmailMessage
+from django.core.validators import validate_email
 from django.db import IntegrityError, models, transaction
-from django.db.models import Count, Prefetch, Q, QuerySet, Subquery, Sum
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Q,
+    QuerySet,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Lower
+from django.dispatch import Signal
 from django.utils import timezone
 from django.utils.crypto import get_random_string
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from invitations.adapters import get_invitations_adapter
 from invitations.app_settings import app_settings
 from invitations.base_invitation import AbstractBaseInvitation
 from model_utils import Choices
 from model_utils.fields import StatusField
-from ordered_model.models import OrderedModel
+from model_utils.tracker import FieldTracker
+from ordered_model.models import OrderedModel, OrderedModelManager, OrderedModelQuerySet
 from rest_framework.reverse import reverse
 from taggit.managers import TaggableManager
 
 from core.models import TimestampedModel
-from core.utils import compact, percentage
+from core.utils import compact, day_bounds, percentage
 from users.models import User
 
 from .exceptions import QuizException
 
 logger = logging.getLogger(__name__)
 
+# Sent when participant's counters and status are updated in bulk, bypassing save()
+participant_answered = Signal()
+
 __all__ = [
     "Quiz",
     "Question",
@@ -35,9 +60,25 @@ __all__ = [
     "Answer",
     "QuizInvitation",
     "ParticipantAnswer",
+    "QuizProgressCounter",
+    "NotificationRun",
+    "InvitationJob",
+    "InvitationRejection",
+    "DailyRollup",
+    "DailyQuizRollup",
+    "RollupWatermark",
+    "RollupChange",
 ]
 
 
+def _subquery_aggregate(queryset: QuerySet, field: str, aggregate) -> Coalesce:
+    """Aggregate over related rows, suitable for annotations and bulk updates"""
+    subquery = (
+        queryset.order_by().values(field).annotate(result=aggregate).values("result")
+    )
+    return Coalesce(Subquery(subquery), 0)
+
+
 class DeepQuizQueryset(models.QuerySet):
     def deep(self):
         return self.prefetch_related(
@@ -47,16 +88,132 @@ class DeepQuizQueryset(models.QuerySet):
             )
         )
 
+    def refresh_counters(self) -> int:
+        """Recalculates denormalized question count and max score of the quizzes"""
+        questions = Question.objects.filter(quiz=OuterRef("pk"))
+        return self.update(
+            question_cnt=_subquery_aggregate(questions, "quiz", Count("pk")),
+            max_score=_subquery_aggregate(questions, "quiz", Sum("score")),
+        )
+
+
+class OrderedBulkQueryset(OrderedModelQuerySet):
+    def bulk_create_in_order(self, objs: Iterable[OrderedModel], **kwargs):
+        """
+        bulk_create of objects with order already set by the caller,
+        without querying the next order of every group like OrderedModelQuerySet.bulk_create does
+        """
+        return models.QuerySet.bulk_create(self, objs, **kwargs)
+
+
+class QuestionQueryset(OrderedBulkQueryset):
+    def bulk_create_with_answers(
+        self,
+        quiz_questions: Iterable[Tuple["Quiz", List[Dict[str, Any]]]],
+        batch_size: Optional[int] = None,
+    ) -> List["Question"]:
+        """
+        Questions of new quizzes (validated data of QuestionSerializer) and their answers,
+        inserted with one bulk insert of questions and one of answers across all the quizzes.
+        Order values are precomputed, so no max-order query is run per question
+        """
+        questions, answers = [], []
+        for quiz, questions_data in quiz_questions:
+            for order, data in enumerate(questions_data):
+                data = dict(data)
+                answers.append(data.pop("answers"))
+                questions.append(Question(quiz=quiz, order=order, **data))
+        self.bulk_create_in_order(questions, batch_size=batch_size)
+        if questions and questions[0].pk is None:
+            # the database doesn't return ids of inserted rows
+            ids = Question.objects.filter(
+                quiz__in={question.quiz_id for question in questions}
+            ).values_list("quiz_id", "order", "id")
+            ids = {(quiz_id, order): pk for quiz_id, order, pk in ids}
+            for question in questions:
+                question.pk = ids[question.quiz_id, question.order]
+        Answer.objects.bulk_create_in_order(
+            (
+                Answer(question=question, order=order, **answer)
+                for question, question_answers in zip(questions, answers)
+                for order, answer in enumerate(question_answers)
+            ),
+            batch_size=batch_size,
+        )
+        return questions
+
+
+class ParticipantQueryset(models.QuerySet):
+    def refresh_counters(self) -> int:
+        """Recalculates denormalized answers count and current score of the participants"""
+        answers = ParticipantAnswer.objects.filter(participant=OuterRef("pk"))
+        return self.update(
+            answered_questions_count=_subquery_aggregate(
+                answers, "participant", Count("pk")
+            ),
+            current_score=_subquery_aggregate(
+                answers.filter(answer__correct=True),
+                "participant",
+                Sum("question__score"),
+            ),
+        )
+
 
 class TodayRecordsMixin:
+    """
+    Records created on a day in TIME_ZONE, filtered by the half-open range of the day
+    (not by the date of created_at), so the index on created_at is used
+    """
+
     @classmethod
-    def get_today_records(cls):
+    def get_day_records(cls, day: datetime.date) -> QuerySet:
         assert hasattr(cls, "created_at")
-        today = datetime.datetime.today()
-        return cls.objects.filter(created_at__date=today)  # type: ignore
+        start, end = day_bounds(day)
+        return cls.objects.filter(created_at__gte=start, created_at__lt=end)  # type: ignore
+
+    @classmethod
+    def get_today_records(cls) -> QuerySet:
+        return cls.get_day_records(timezone.localdate())
+
+
+class CountersMixin:
+    """
+    Model with denormalized counters maintained by bulk updates.
+    Counters are not written when an existing instance is saved (even if listed in update_fields),
+    so a stale instance can't overwrite them
+    """
 
+    counter_fields: Tuple[str, ...] = ()
 
-class Quiz(TodayRecordsMixin, TimestampedModel):
+    def save(self, *args, **kwargs) -> None:
+        if not self._state.adding:
+            update_fields = kwargs.get("update_fields")
+            if update_fields is None:
+                update_fields = [
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if not field.primary_key
+                ]
+            kwargs["update_fields"] = [
+                name for name in update_fields if name not in self.counter_fields
+            ]
+            if not kwargs["update_fields"]:
+                return
+        super().save(*args, **kwargs)
+
+
+class AtomicSaveMixin:
+    """
+    Saves the instance in a transaction, so that changes made by post_save receivers
+    are committed or rolled back together with it (post_delete receivers already run in one)
+    """
+
+    def save(self, *args, **kwargs) -> None:
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class Quiz(CountersMixin, TodayRecordsMixin, TimestampedModel):
     STATUS = Choices("draft", "published", "closed")
 
     author = models.ForeignKey(
@@ -77,70 +234,102 @@ class Quiz(TodayRecordsMixin, TimestampedModel):
     )
     slug = models.SlugField(null=False, blank=True, unique=True, verbose_name="slug")
     tags = TaggableManager(blank=True)
+    question_cnt = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="number of questions"
+    )
+    max_score = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="max score"
+    )
 
     objects = DeepQuizQueryset.as_manager()
+    counter_fields = ("question_cnt", "max_score")
 
     class Meta:
         verbose_name = _("Quiz")
         verbose_name_plural = _("Quizzes")
+        indexes = [
+            models.Index(fields=["author", "created_at", "id"]),
+            # changes read by report rollups
+            models.Index(fields=["updated_at"]),
+            # daily and usage reports
+            models.Index(fields=["created_at"]),
+        ]
 
     def __str__(self) -> str:
         return self.title
 
-    @property
-    def question_cnt(self) -> int:
-        return self.questions.count()
+    def refresh_counters(self) -> None:
+        Quiz.objects.filter(pk=self.pk).refresh_counters()
+        self.refresh_from_db(fields=["question_cnt", "max_score"])
+
+    @cached_property
+    def progress_totals(self) -> Dict[str, int]:
+        """Counts of invitations and participants by their state, read from the materialized counters"""
+        return QuizProgressCounter.totals(self.pk)
 
     @property
-    def invitees_summary(self) -> QuerySet:
+    def invitees_summary(self) -> List[Dict[str, Any]]:
         """
         Count of invitees base on their status
         [{'accepted': True, 'count': 1}]
         """
-        return (
-            self.invitations.values("accepted")
-            .annotate(count=Count("pk"))
-            .order_by("accepted")
-        )
+        summary = [
+            {
+                "accepted": accepted,
+                "count": self.progress_totals[
+                    QuizProgressCounter.invitation_field(accepted)
+                ],
+            }
+            for accepted in (False, True)
+        ]
+        return [row for row in summary if row["count"]]
 
     @property
-    def participants_summary(self) -> QuerySet:
+    def participants_summary(self) -> List[Dict[str, Any]]:
         """
         Count of participants base on their status
         [{'status': 'attempted", 'count': 1}]
         """
-        return (
-            self.participants.values("status")
-            .annotate(count=Count("pk"))
-            .order_by("status")
-        )
+        summary = [
+            {
+                "status": status,
+                "count": self.progress_totals[
+                    QuizProgressCounter.participant_field(status)
+                ],
+            }
+            for status, _ in QuizParticipant.STATUS
+        ]
+        return [row for row in summary if row["count"]]
 
     @classmethod
     def for_user_or_participant(
         cls, user: User, participant: Optional["QuizParticipant"] = None
     ) -> QuerySet["Quiz"]:
-        """Returns queryset of quizzes related to user-participant or quizParticipant when user is anonymous"""
+        """
+        Returns queryset of quizzes related to user-participant or quizParticipant when user is anonymous.
+        Quizzes are annotated with the status and number of answered questions of that participant
+        """
         if not (user.is_authenticated or participant):
             # if user is not authenticated and participant is not provided via token, there's nothing to return
             return Quiz.objects.none()
         criteria = [
-            Q(participants__user=user) if user.is_authenticated else None,
-            Q(participants__id=participant.id) if participant else None,
+            Q(user=user) if user.is_authenticated else None,
+            Q(id=participant.id) if participant else None,
         ]
-        return (
-            cls.objects.prefetch_related("participants")
-            .filter(reduce(or_, compact(criteria)))
-            .distinct()
+        own_participants = QuizParticipant.objects.filter(
+            reduce(or_, compact(criteria))
+        )
+        own_participant = own_participants.filter(quiz=OuterRef("pk")).order_by("id")
+        return cls.objects.filter(Exists(own_participant)).annotate(
+            participant_status=Subquery(own_participant.values("status")[:1]),
+            participant_answered_questions_count=Subquery(
+                own_participant.values("answered_questions_count")[:1]
+            ),
         )
 
     def get_absolute_url(self):
         return reverse("quizzes-detail", args=[self.id])
 
-    @property
-    def max_score(self) -> int:
-        """Max number of scores that can be achieved"""
-        return self.questions.all().aggregate(Sum("score"))["score__sum"]
-
     def summary(self, **filter_params) -> Iterable[Dict[str, Any]]:
         """Summary about results of participants who completed the quiz"""
         common_context = {"quiz_title": self.title, "max_score": self.max_score}
@@ -187,7 +376,7 @@ class Quiz(TodayRecordsMixin, TimestampedModel):
         return map(map_to_context, groupby(participants, key=itemgetter("id")))  # type: ignore
 
 
-class QuizInvitation(TodayRecordsMixin, AbstractBaseInvitation):
+class QuizInvitation(AtomicSaveMixin, TodayRecordsMixin, AbstractBaseInvitation):
     quiz = models.ForeignKey(
         Quiz,
         on_delete=models.CASCADE,
@@ -196,9 +385,29 @@ class QuizInvitation(TodayRecordsMixin, AbstractBaseInvitation):
     )
     email = models.EmailField(verbose_name="e-mail address")
     created_at = models.DateTimeField(verbose_name="created", default=timezone.now)
+    # set for invitations delivered in background, see InvitationJob
+    job = models.ForeignKey(
+        "InvitationJob",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="invitations",
+    )
+    delivery_failed = models.BooleanField(default=False)
+
+    tracker = FieldTracker(fields=["accepted"])
+
+    DELIVERY = Choices("queued", "sent", "failed")
 
     class Meta:
         unique_together = "quiz", "email"
+        indexes = [
+            # keyset pagination of the invitees
+            models.Index(fields=["quiz", "created_at", "id"]),
+            # reports
+            models.Index(fields=["created_at"]),
+            models.Index(fields=["sent"]),
+        ]
 
     @classmethod
     def create(cls, email, inviter=None, **kwargs) -> "QuizInvitation":
@@ -209,15 +418,64 @@ class QuizInvitation(TodayRecordsMixin, AbstractBaseInvitation):
             email=email, key=key, inviter=inviter, quiz=quiz
         )
 
+    @classmethod
+    def validate_emails(
+        cls, quiz: Quiz, rows: Iterable[Tuple[int, Any]], job: "InvitationJob"
+    ) -> Tuple[List[str], List["InvitationRejection"]]:
+        """
+        Normalized emails of the rows (line, email) which can be invited to the quiz by the job
+        and rejections of the others, existing invitations are checked with one query
+        """
+        valid, lines, rejections = {}, {}, []
+
+        def reject(line: int, email: str, reason: str) -> None:
+            rejections.append(
+                InvitationRejection(job=job, line=line, email=email, reason=reason)
+            )
+
+        for line, email in rows:
+            email = User.objects.normalize_email(str(email).strip())
+            try:
+                validate_email(email)
+            except ValidationError:
+                reject(line, email, InvitationRejection.REASON.invalid)
+                continue
+            if email.lower() in valid:
+                reject(line, email, InvitationRejection.REASON.duplicate)
+            else:
+                valid[email.lower()] = email
+                lines[email.lower()] = line
+        existing = (
+            cls.objects.filter(quiz=quiz)
+            .annotate(email_lower=Lower("email"))
+            .filter(email_lower__in=list(valid))
+            .values_list("email_lower", "accepted", "job_id")
+        )
+        for email_lower, accepted, job_id in existing:
+            if job_id == job.pk:  # invited by a previous chunk of the job
+                reason = InvitationRejection.REASON.duplicate
+            elif accepted:
+                reason = InvitationRejection.REASON.accepted
+            else:
+                reason = InvitationRejection.REASON.pending
+            reject(lines[email_lower], valid.pop(email_lower), reason)
+        return list(valid.values()), rejections
+
     def key_expired(self):
+        if self.sent is None:  # delivery is queued
+            return False
         expiration_date = self.sent + datetime.timedelta(
             days=app_settings.INVITATION_EXPIRY
         )
         return expiration_date <= timezone.now()
 
-    def send_invitation(self, request, **kwargs):
-        invite_url = reverse("accept-invite", args=[self.key])
-        invite_url = request.build_absolute_uri(invite_url)
+    @property
+    def delivery(self) -> str:
+        if self.sent:
+            return self.DELIVERY.sent
+        return self.DELIVERY.failed if self.delivery_failed else self.DELIVERY.queued
+
+    def render_invitation(self, invite_url: str, **kwargs) -> EmailMessage:
         ctx = kwargs
         ctx.update(
             {
@@ -228,10 +486,14 @@ class QuizInvitation(TodayRecordsMixin, AbstractBaseInvitation):
                 "inviter": self.inviter,
             }
         )
-
         email_template = "invitations/email/email_invite"
+        return get_invitations_adapter().render_mail(email_template, self.email, ctx)
+
+    def send_invitation(self, request, **kwargs):
+        invite_url = reverse("accept-invite", args=[self.key])
+        invite_url = request.build_absolute_uri(invite_url)
         try:
-            get_invitations_adapter().send_mail(email_template, self.email, ctx)
+            self.render_invitation(invite_url, **kwargs).send()
         except ConnectionError as e:
             logger.error(f"SMTP server is not available, details: {e}")
             raise QuizException("Mail service is temporarily unavailable")
@@ -262,7 +524,9 @@ class QuizInvitation(TodayRecordsMixin, AbstractBaseInvitation):
                 )
 
 
-class QuizParticipant(TodayRecordsMixin, TimestampedModel):
+class QuizParticipant(
+    AtomicSaveMixin, CountersMixin, TodayRecordsMixin, TimestampedModel
+):
     STATUS = Choices("accepted", "attempted", "completed")
 
     email = models.EmailField(verbose_name="e-mail")
@@ -281,17 +545,27 @@ class QuizParticipant(TodayRecordsMixin, TimestampedModel):
     )
     status = StatusField(default=STATUS.accepted, verbose_name="status")
     score = models.PositiveIntegerField(null=True)
-    key = models.CharField(max_length=100, null=False)
+    key = models.CharField(max_length=100, null=False, unique=True)
     notified = models.BooleanField(default=False)
+    answered_questions_count = models.PositiveIntegerField(default=0, editable=False)
+    current_score = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ParticipantQueryset.as_manager()
+    counter_fields = ("answered_questions_count", "current_score")
+    tracker = FieldTracker(fields=["status"])
 
     class Meta:
         verbose_name = _("Participant")
         verbose_name_plural = _("Participants")
         unique_together = ("email", "quiz")
-
-    @property
-    def answered_questions_count(self) -> int:
-        return self.answers.count()
+        indexes = [
+            models.Index(fields=["quiz", "user"]),
+            models.Index(fields=["quiz", "created_at", "id"]),
+            # changes read by report rollups
+            models.Index(fields=["updated_at"]),
+            # daily and usage reports
+            models.Index(fields=["created_at"]),
+        ]
 
     @property
     def total_questions_count(self) -> int:
@@ -313,16 +587,56 @@ class QuizParticipant(TodayRecordsMixin, TimestampedModel):
         ).prefetch_related("answers")
 
     @property
-    def _score(self) -> int:
-        return (
-            self.answers.prefetch_related("answer", "answer__question")
-            .filter(answer__correct=True)
-            .aggregate(Sum("answer__question__score"))["answer__question__score__sum"]
+    def next_question(self) -> Optional["Question"]:
+        """First of the questions that haven't been answered by participant"""
+        return self.remaining_questions.first()
+
+    def register_answers(self, count: int, points: int) -> None:
+        """
+        Accounts newly saved answers: increments counters and sets status (and final score)
+        with a single update regardless of how many questions were answered before
+        """
+        total = Subquery(
+            Quiz.objects.filter(pk=OuterRef("quiz_id")).values("question_cnt")
         )
+        completed = Q(answered_questions_count__gte=total - count)
+        # no savepoint within the transaction of the caller: nothing here is meant to be recovered
+        with transaction.atomic(savepoint=False):
+            QuizParticipant.objects.filter(pk=self.pk).update(
+                answered_questions_count=F("answered_questions_count") + count,
+                current_score=F("current_score") + points,
+                status=Case(
+                    When(completed, then=Value(self.STATUS.completed)),
+                    default=Value(self.STATUS.attempted),
+                ),
+                score=Case(
+                    When(completed, then=F("current_score") + points),
+                    default=F("score"),
+                ),
+                updated_at=timezone.now(),
+            )
+            self.refresh_from_db(
+                fields=[
+                    "answered_questions_count",
+                    "current_score",
+                    "status",
+                    "score",
+                    "updated_at",
+                ]
+            )
+            # participant with no answers is always in accepted status
+            previous_status = (
+                self.STATUS.accepted
+                if self.answered_questions_count == count
+                else self.STATUS.attempted
+            )
+            participant_answered.send(
+                sender=QuizParticipant, instance=self, previous_status=previous_status
+            )
 
     @property
     def score_str(self) -> str:
-        score = self.score if self.score is not None else (self._score or 0)
+        score = self.score if self.score is not None else self.current_score
         return f"{score} out of {self.quiz.max_score}"
 
     def __str__(self) -> str:
@@ -341,6 +655,8 @@ class Question(OrderedModel):
 
     order_with_respect_to = "quiz"
 
+    objects = OrderedModelManager.from_queryset(QuestionQueryset)()
+
     class Meta:
         verbose_name = _("Question")
         verbose_name_plural = _("Questions")
@@ -362,6 +678,8 @@ class Answer(OrderedModel):
 
     order_with_respect_to = "question"
 
+    objects = OrderedModelManager.from_queryset(OrderedBulkQueryset)()
+
     class Meta:
         verbose_name = _("Answer")
         verbose_name_plural = _("Answers")
@@ -381,8 +699,332 @@ class ParticipantAnswer(TimestampedModel):
     )
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     answer = models.ForeignKey(Answer, on_delete=models.CASCADE)
+    # saved along with other answers (batch submission, write-behind stream),
+    # created_at is the time of saving, not of answering
+    batched = models.BooleanField(default=False)
 
     class Meta:
         verbose_name = _("Participant's answer")
         verbose_name_plural = _("Participant's answers")
         unique_together = "participant", "question", "answer"
+        indexes = [models.Index(fields=["created_at"])]
+
+
+class QuizProgressCounter(models.Model):
+    """
+    Materialized counts of invitations and participants of the quiz by their state,
+    maintained on every change of invitations and participants.
+    Counts of a quiz are split into PROGRESS_COUNTER_SHARDS rows updated at random,
+    so that concurrent updates of a busy quiz don't queue on a single row; the total is their sum.
+    Rows are created along with the quiz, so updates don't have to insert them
+    """
+
+    FIELDS = (
+        "invitations_pending",
+        "invitations_accepted",
+        "participants_accepted",
+        "participants_attempted",
+        "participants_completed",
+    )
+
+    quiz = models.ForeignKey(
+        Quiz, on_delete=models.CASCADE, related_name="progress_counters"
+    )
+    shard = models.PositiveSmallIntegerField(default=0)
+    # a single shard may go below zero, only the sum is meaningful
+    invitations_pending = models.IntegerField(default=0)
+    invitations_accepted = models.IntegerField(default=0)
+    participants_accepted = models.IntegerField(default=0)
+    participants_attempted = models.IntegerField(default=0)
+    participants_completed = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = "quiz", "shard"
+
+    @staticmethod
+    def invitation_field(accepted: bool) -> str:
+        return "invitations_accepted" if accepted else "invitations_pending"
+
+    @staticmethod
+    def participant_field(status: str) -> str:
+        return f"participants_{status}"
+
+    @classmethod
+    def create_shards(cls, quiz_ids: List[int]) -> None:
+        """Empty rows of all shards of the quizzes"""
+        cls.objects.bulk_create(
+            cls(quiz_id=quiz_id, shard=shard)
+            for quiz_id in quiz_ids
+            for shard in range(settings.PROGRESS_COUNTER_SHARDS)
+        )
+
+    @classmethod
+    def add(cls, quiz_id: int, **deltas: int) -> None:
+        """
+        Changes counts of the quiz by the given deltas, in the transaction of the caller.
+        Decrements are applied to an existing shard: when there is none, the quiz is being deleted
+        along with its counters (post_delete of its participants and invitations comes after)
+        """
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        shard = random.randrange(settings.PROGRESS_COUNTER_SHARDS)
+        counters = cls.objects.filter(quiz_id=quiz_id, shard=shard)
+        update = {field: F(field) + delta for field, delta in deltas.items()}
+        if counters.update(**update):
+            return
+        if all(delta < 0 for delta in deltas.values()):
+            existing = cls.objects.filter(quiz_id=quiz_id).values("pk")[:1]
+            cls.objects.filter(pk__in=existing).update(**update)
+            return
+        # quiz created before its shards were, or PROGRESS_COUNTER_SHARDS has been raised since
+        try:
+            with transaction.atomic():
+                cls.objects.create(quiz_id=quiz_id, shard=shard, **deltas)
+        except IntegrityError:  # the shard has been created concurrently
+            counters.update(**update)
+
+    @classmethod
+    def totals(cls, quiz_id: int) -> Dict[str, int]:
+        totals = cls.objects.filter(quiz_id=quiz_id).aggregate(
+            **{field: Sum(field) for field in cls.FIELDS}
+        )
+        return {field: count or 0 for field, count in totals.items()}
+
+    @classmethod
+    def rebuild(cls, quizzes: QuerySet[Quiz]) -> None:
+        """Recounts the quizzes from invitations and participants, all shards are recreated"""
+        quiz_ids = quizzes.values("pk")
+        counters = {
+            quiz_id: cls(quiz_id=quiz_id)
+            for quiz_id in quizzes.values_list("pk", flat=True)
+        }
+
+        def counter(quiz_id: int) -> "QuizProgressCounter":
+            return counters.setdefault(quiz_id, cls(quiz_id=quiz_id))
+
+        invitations = QuizInvitation.objects.filter(quiz__in=quiz_ids)
+        invitations = invitations.order_by().values("quiz_id", "accepted")
+        for row in invitations.annotate(count=Count("pk")):
+            setattr(
+                counter(row["quiz_id"]),
+                cls.invitation_field(row["accepted"]),
+                row["count"],
+            )
+        participants = QuizParticipant.objects.filter(quiz__in=quiz_ids)
+        participants = participants.order_by().values("quiz_id", "status")
+        for row in participants.annotate(count=Count("pk")):
+            setattr(
+                counter(row["quiz_id"]),
+                cls.participant_field(row["status"]),
+                row["count"],
+            )
+        with transaction.atomic():
+            cls.objects.filter(quiz__in=quiz_ids).delete()
+            cls.objects.bulk_create(
+                [
+                    *counters.values(),
+                    *(
+                        cls(quiz_id=quiz_id, shard=shard)
+                        for quiz_id in counters
+                        for shard in range(1, settings.PROGRESS_COUNTER_SHARDS)
+                    ),
+                ]
+            )
+
+
+class ChunkedRun(TimestampedModel):
+    """
+    Progress of mail sent to many recipients: recipients are split into chunks sent by separate tasks,
+    every chunk adds to the counters
+    """
+
+    STATUS = Choices("pending", "dispatched", "finished")
+
+    status = StatusField(default=STATUS.pending, verbose_name="status")
+    total = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    chunks_total = models.PositiveIntegerField(default=0)
+    chunks_done = models.PositiveIntegerField(default=0)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta(TimestampedModel.Meta):
+        abstract = True
+
+    @property
+    def progress(self) -> str:
+        if not self.total:
+            return percentage(1, 1)
+        return percentage(self.sent + self.failed, self.total)
+
+    def add(self, sent: int = 0, failed: int = 0, chunks_done: int = 0) -> None:
+        type(self).objects.filter(pk=self.pk).update(
+            sent=F("sent") + sent,
+            failed=F("failed") + failed,
+            chunks_done=F("chunks_done") + chunks_done,
+        )
+
+    def dispatch(self, total: int, chunks: int) -> None:
+        """Records that all chunks of the run are queued"""
+        type(self).objects.filter(pk=self.pk).update(
+            status=self.STATUS.dispatched, total=total, chunks_total=chunks
+        )
+        # chunks may have been done before the run was dispatched
+        self.finish_if_done()
+
+    def finish_if_done(self) -> bool:
+        """Marks the run finished once all chunks of a dispatched run are done"""
+        return bool(
+            type(self)
+            .objects.filter(
+                pk=self.pk,
+                status=self.STATUS.dispatched,
+                chunks_done__gte=F("chunks_total"),
+            )
+            .update(status=self.STATUS.finished, finished_at=timezone.now())
+        )
+
+
+class NotificationRun(ChunkedRun):
+    """Progress of sending results of the quiz to participants who completed it"""
+
+    quiz = models.ForeignKey(
+        Quiz, on_delete=models.CASCADE, related_name="notification_runs"
+    )
+
+
+class InvitationJob(ChunkedRun):
+    """
+    Progress of sending invitations to the quiz created by one request.
+    Outcomes of delivery are kept in the invitations, emails rejected by validation - in its rejections
+    """
+
+    quiz = models.ForeignKey(
+        Quiz, on_delete=models.CASCADE, related_name="invitation_jobs"
+    )
+    inviter = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    # absolute links to accept invitations are built with it outside of the request
+    base_url = models.URLField()
+    rejected = models.PositiveIntegerField(default=0)
+
+    def add_invitations(
+        self, emails: List[str], rejections: List["InvitationRejection"]
+    ) -> int:
+        """
+        Inserts invitations of the emails, sent by the jobs later, and rejections of the others.
+        Emails invited concurrently after validation are skipped
+        :returns number of inserted invitations
+        """
+        batch_size = settings.INVITATION_BATCH_SIZE
+        # only rows of the chunk are counted, with the unique index on (quiz, email)
+        chunk = QuizInvitation.objects.filter(
+            quiz_id=self.quiz_id, email__in=emails, job=self
+        )
+        with transaction.atomic():
+            before = chunk.count()
+            QuizInvitation.objects.bulk_create(
+                (
+                    QuizInvitation(
+                        email=email,
+                        key=get_random_string(64).lower(),
+                        inviter=self.inviter,
+                        quiz=self.quiz,
+                        job=self,
+                    )
+                    for email in emails
+                ),
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+            created = chunk.count() - before
+            InvitationRejection.objects.bulk_create(rejections, batch_size=batch_size)
+            InvitationJob.objects.filter(pk=self.pk).update(
+                total=F("total") + created, rejected=F("rejected") + len(rejections)
+            )
+            # bulk inserts don't send the signals maintaining the counters
+            QuizProgressCounter.add(self.quiz_id, invitations_pending=created)
+        self.total += created
+        self.rejected += len(rejections)
+        return created
+
+
+class InvitationRejection(models.Model):
+    """Email of the invitation job which hasn't been invited"""
+
+    REASON = Choices(
+        ("invalid email", "invalid", "invalid email"),
+        ("duplicate", "duplicate", "duplicate"),
+        ("pending invite", "pending", "pending invite"),
+        ("already accepted", "accepted", "already accepted"),
+    )
+
+    job = models.ForeignKey(
+        InvitationJob, on_delete=models.CASCADE, related_name="rejections"
+    )
+    line = models.PositiveIntegerField()  # in the uploaded file or the list of emails
+    email = models.TextField()
+    reason = models.CharField(max_length=32, choices=REASON)
+
+
+class DailyRollup(models.Model):
+    """
+    Usage of the service on the day (in TIME_ZONE), the sum of its DailyQuizRollup rows.
+    Once the day is over it's finalized: rendered reports are stored and never recomputed
+    """
+
+    day = models.DateField(unique=True)
+    quizzes_created = models.PositiveIntegerField(default=0)
+    participants = models.PositiveIntegerField(default=0)
+    participants_completed = models.PositiveIntegerField(default=0)
+    answers_given = models.PositiveIntegerField(default=0)
+    finalized_at = models.DateTimeField(null=True, blank=True)
+    csv_report = models.TextField(blank=True)
+    json_report = models.TextField(blank=True)
+
+
+class DailyQuizRollup(models.Model):
+    """
+    Activity of the quiz on the day: whether the quiz was created on the day,
+    participants who joined on the day by status, their answers and score
+    """
+
+    day = models.DateField()
+    quiz = models.ForeignKey(
+        Quiz, on_delete=models.CASCADE, related_name="daily_rollups"
+    )
+    quiz_created = models.BooleanField(default=False)
+    participants_accepted = models.PositiveIntegerField(default=0)
+    participants_attempted = models.PositiveIntegerField(default=0)
+    participants_completed = models.PositiveIntegerField(default=0)
+    answers_given = models.PositiveIntegerField(default=0)
+    score_total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = "day", "quiz"
+
+    @property
+    def participants(self) -> int:
+        return (
+            self.participants_accepted
+            + self.participants_attempted
+            + self.participants_completed
+        )
+
+
+class RollupWatermark(models.Model):
+    """Time up to which changes of the source rows are accounted in the rollups"""
+
+    name = models.CharField(max_length=64, unique=True)
+    value = models.DateTimeField()
+
+
+class RollupChange(models.Model):
+    """
+    (day, quiz) group of rollups to recompute after a deletion, which updated_at of the rows can't reveal.
+    Left in the transaction of the deletion, consumed by the next refresh of the rollups
+    """
+
+    day = models.DateField()
+    # not a foreign key: the quiz may be deleted
+    quiz_id = models.PositiveIntegerField()
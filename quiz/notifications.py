@@ -0,0 +1,99 @@
+"""
+Rendering of emails with results of the quiz sent to participants.
+
+Templates are resolved and compiled once per renderer. The subject and the lines of answers depend
+only on the quiz (a line is the same for everybody who has chosen the answer), so they are rendered
+once per quiz; only the body is rendered per recipient, on top of the context shared by the quiz.
+
+Templates (Django template language), by the prefix:
+    <prefix>_subject.txt - quiz_title, max_score
+    <prefix>_answer.txt - question, answer, correct
+    <prefix>_body.txt and/or <prefix>_body.html - also score, email and answers, every answer has
+    the rendered line as "text"
+"""
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.template import Context, Template, TemplateDoesNotExist
+from django.template.loader import get_template
+
+__all__ = [
+    "TEMPLATE_PREFIX",
+    "NotificationRenderer",
+]
+
+TEMPLATE_PREFIX = "quiz/notifications/notification"
+QUIZ_KEYS = ("quiz_title", "max_score")
+
+
+def _compile(template_name: str) -> Template:
+    return get_template(template_name).template
+
+
+class NotificationRenderer:
+    """Renderer of one task, the parts shared by the quiz are kept for the quiz rendered last"""
+
+    def __init__(self, template_prefix: str = TEMPLATE_PREFIX):
+        self.subject_template = _compile(f"{template_prefix}_subject.txt")
+        self.answer_template = _compile(f"{template_prefix}_answer.txt")
+        self.body_templates: Dict[str, Template] = {}
+        for ext in ["html", "txt"]:
+            try:
+                self.body_templates[ext] = _compile(f"{template_prefix}_body.{ext}")
+            except TemplateDoesNotExist:
+                if ext == "txt" and not self.body_templates:
+                    raise
+        self._quiz: Optional[Tuple] = None
+        self._context = Context()
+        self._subject = ""
+        self._answers: Dict[Tuple, str] = {}
+
+    def _use_quiz(self, context: Dict[str, Any]) -> None:
+        quiz = tuple(context[key] for key in QUIZ_KEYS)
+        if quiz == self._quiz:
+            return
+        self._quiz = quiz
+        self._context = Context(dict(zip(QUIZ_KEYS, quiz)))
+        subject = self.subject_template.render(self._context)
+        self._subject = " ".join(subject.splitlines()).strip()
+        self._answers = {}
+
+    def _answer_line(self, answer: Dict[str, Any]) -> str:
+        key = answer["question"], answer["answer"], answer["correct"]
+        line = self._answers.get(key)
+        if line is None:
+            with self._context.push(answer):
+                line = self.answer_template.render(self._context).strip()
+            self._answers[key] = line
+        return line
+
+    def render(self, context: Dict[str, Any]) -> EmailMessage:
+        """Message to the participant with the context from Quiz.summary"""
+        self._use_quiz(context)
+        participant = {
+            key: value for key, value in context.items() if key not in QUIZ_KEYS
+        }
+        participant["answers"] = [
+            {**answer, "text": self._answer_line(answer)}
+            for answer in context["answers"]
+        ]
+        with self._context.push(participant):
+            bodies = {
+                ext: template.render(self._context).strip()
+                for ext, template in self.body_templates.items()
+            }
+
+        email = context["email"]
+        if "txt" in bodies:
+            msg = EmailMultiAlternatives(
+                self._subject, bodies["txt"], settings.DEFAULT_FROM_EMAIL, [email]
+            )
+            if "html" in bodies:
+                msg.attach_alternative(bodies["html"], "text/html")
+        else:
+            msg = EmailMessage(
+                self._subject, bodies["html"], settings.DEFAULT_FROM_EMAIL, [email]
+            )
+            msg.content_subtype = "html"
+        return msg
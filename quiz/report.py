@@ -1,12 +1,59 @@
+"""
+Daily report about the usage of the service, served from rollups.
+
+DailyQuizRollup rows (activity of a quiz on a day) and DailyRollup rows (totals of the day) are maintained
+by refresh_rollups, run periodically by Celery beat: it reads only quizzes and participants changed since
+the watermark of the previous run and recomputes the (day, quiz) groups they belong to. Groups of deleted
+participants and quizzes are left as RollupChange rows by signal receivers. Days are in TIME_ZONE.
+A day is finalized once it's over and its changes are surely processed: the rendered reports are stored
+in its DailyRollup and served as is, the day isn't recomputed anymore.
+
+Reports are produced lazily, so they can be streamed
+"""
+import csv
 import datetime
+import json
+from collections import defaultdict
 from dataclasses import asdict, astuple, dataclass
-from typing import Any, Dict, List
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, QuerySet, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
 
-from django.db.models import Count, Q
-from sql_util.utils import SubquerySum
+from core.utils import Echo, buffered
 
 from .models import *
 
+__all__ = [
+    "CSV",
+    "JSON",
+    "DailySummary",
+    "QuizReportEntry",
+    "QuizActivityEntry",
+    "DailyReport",
+    "get_daily_report",
+    "refresh_rollups",
+]
+
+CSV = "csv"
+JSON = "json"
+
+WATERMARK = "daily_report"
+
+
+@dataclass
+class DailySummary:
+    day: datetime.date
+    quizzes_created: int
+    participants: int
+    participants_completed: int
+    answers_given: int
+
 
 @dataclass
 class QuizReportEntry:
@@ -17,93 +64,224 @@ class QuizReportEntry:
 
 
 @dataclass
-class QuizParticipantEntry:
+class QuizActivityEntry:
     quiz: str
-    email: str
-    status: str
-    score: int
+    accepted: int
+    attempted: int
+    completed: int
     answers_given: int
-    created_at: datetime.datetime
+    total_score: int
 
 
 @dataclass
 class DailyReport:
-    quizzes: List[QuizReportEntry]
-    participants: List[QuizParticipantEntry]
-
-    @property
-    def as_dict(self) -> Dict:
-        return asdict(self)
+    summary: DailySummary
+    quizzes: Iterable[QuizReportEntry]
+    participants: Iterable[QuizActivityEntry]
 
     @property
-    def as_rows(self) -> List[List[Any]]:
+    def as_rows(self) -> Iterator[Sequence[Any]]:
         """Representation for csv"""
-        result = [
-            ["Quizzes"],
-            ["Title", "Author", "Question count", "Created At"],
-        ]
-        result.extend([astuple(q) for q in self.quizzes])
-        result.append([])
-        result.append(["Participants"])
-        result.append(["E-mail", "Quiz", "Status", "Score", "Answers given", "Created"])
-        result.extend([astuple(p) for p in self.participants])
-        return result
-
-
-def _get_quiz_report_entries() -> List[QuizReportEntry]:
-    quizzes = (
-        Quiz.get_today_records()
-        .annotate(
-            question_count=Count("questions"),
-        )
-        .values("title", "author__username", "question_count", "created_at")
+        yield ["Summary"]
+        yield ["Day", "Quizzes created", "Participants", "Completed", "Answers given"]
+        yield astuple(self.summary)
+        yield []
+        yield ["Quizzes"]
+        yield ["Title", "Author", "Question count", "Created At"]
+        yield from (astuple(q) for q in self.quizzes)
+        yield []
+        yield ["Participants"]
+        yield ["Quiz", "Accepted", "Attempted", "Completed", "Answers given", "Score"]
+        yield from (astuple(p) for p in self.participants)
+
+    def as_csv(self) -> Iterator[str]:
+        writer = csv.writer(Echo())
+        return buffered(writer.writerow(row) for row in self.as_rows)
+
+    def as_json(self) -> Iterator[str]:
+        def dumps(value: Any) -> str:
+            return json.dumps(value, cls=JSONEncoder)
+
+        def section(name: str, entries: Iterable) -> Iterator[str]:
+            yield f", {dumps(name)}: ["
+            for i, entry in enumerate(entries):
+                yield (", " if i else "") + dumps(asdict(entry))
+            yield "]"
+
+        def chunks() -> Iterator[str]:
+            yield f'{{"summary": {dumps(asdict(self.summary))}'
+            yield from section("quizzes", self.quizzes)
+            yield from section("participants", self.participants)
+            yield "}"
+
+        return buffered(chunks())
+
+    def render(self, format_: str) -> Iterator[str]:
+        return self.as_json() if format_ == JSON else self.as_csv()
+
+
+def _quiz_entries(rollups: QuerySet) -> Iterator[QuizReportEntry]:
+    quizzes = rollups.filter(quiz_created=True).values_list(
+        "quiz__title",
+        "quiz__author__username",
+        "quiz__question_cnt",
+        "quiz__created_at",
+    )
+    for title, author, questions_count, created_at in quizzes.iterator(
+        chunk_size=settings.REPORT_CHUNK_SIZE
+    ):
+        yield QuizReportEntry(title, author, questions_count, created_at)
+
+
+def _activity_entries(rollups: QuerySet) -> Iterator[QuizActivityEntry]:
+    activity = rollups.exclude(
+        participants_accepted=0, participants_attempted=0, participants_completed=0
+    ).values_list(
+        "quiz__title",
+        "participants_accepted",
+        "participants_attempted",
+        "participants_completed",
+        "answers_given",
+        "score_total",
+    )
+    for row in activity.iterator(chunk_size=settings.REPORT_CHUNK_SIZE):
+        yield QuizActivityEntry(*row)
+
+
+def get_daily_report(day: Optional[datetime.date] = None) -> DailyReport:
+    """The report of the day (today by default) with entries read lazily, once"""
+    day = day or timezone.localdate()
+    totals = DailyRollup.objects.filter(day=day).first() or DailyRollup(day=day)
+    rollups = DailyQuizRollup.objects.filter(day=day).order_by("quiz_id")
+    return DailyReport(
+        summary=DailySummary(
+            day=day,
+            quizzes_created=totals.quizzes_created,
+            participants=totals.participants,
+            participants_completed=totals.participants_completed,
+            answers_given=totals.answers_given,
+        ),
+        quizzes=_quiz_entries(rollups),
+        participants=_activity_entries(rollups),
     )
-    return [
-        QuizReportEntry(
-            title=record["title"],
-            author=record["author__username"],
-            questions_count=record["question_count"],
-            created_at=record["created_at"],
+
+
+def _changed_groups(
+    since: Optional[datetime.datetime],
+) -> Dict[datetime.date, Set[int]]:
+    """Ids of quizzes by days with quizzes or participants changed since the time"""
+    tz = timezone.get_current_timezone()
+    groups = defaultdict(set)
+    for queryset, quiz_field in [
+        (Quiz.objects.all(), "id"),
+        (QuizParticipant.objects.all(), "quiz_id"),
+    ]:
+        if since is not None:
+            queryset = queryset.filter(updated_at__gte=since)
+        rows = (
+            queryset.order_by()
+            .annotate(day=TruncDate("created_at", tzinfo=tz))
+            .values_list("day", quiz_field)
+            .distinct()
         )
-        for record in quizzes
-    ]
+        for day, quiz_id in rows.iterator(chunk_size=settings.REPORT_CHUNK_SIZE):
+            groups[day].add(quiz_id)
+    return groups
+
 
+def _rollup(day: datetime.date, quiz_ids: List[int]) -> None:
+    """Recomputes rollups of the quizzes on the day from quizzes and participants"""
+    rollups: Dict[int, DailyQuizRollup] = {}
 
-def _get_participant_entries() -> List[QuizParticipantEntry]:
+    def rollup(quiz_id: int) -> DailyQuizRollup:
+        return rollups.setdefault(quiz_id, DailyQuizRollup(day=day, quiz_id=quiz_id))
+
+    created = Quiz.get_day_records(day).filter(id__in=quiz_ids)
+    for quiz_id in created.values_list("id", flat=True):
+        rollup(quiz_id).quiz_created = True
     participants = (
-        QuizParticipant.get_today_records()
-        .select_related("quiz")
+        QuizParticipant.get_day_records(day)
+        .filter(quiz_id__in=quiz_ids)
+        .order_by()
+        .values("quiz_id")
         .annotate(
-            answers_given=Count("answers"),
-            score_=SubquerySum(
-                "answers__answer__question__score",
-                filter=Q(answers__correct=True),
-            ),
-        )
-        .values(
-            "email",
-            "quiz__title",
-            "answers_given",
-            "created_at",
-            "status",
-            "score_",
+            **{
+                f"participants_{status}": Count("pk", filter=Q(status=status))
+                for status, _ in QuizParticipant.STATUS
+            },
+            answers_given=Sum("answered_questions_count"),
+            score_total=Sum("current_score"),
         )
     )
-    return [
-        QuizParticipantEntry(
-            email=record["email"],
-            quiz=record["quiz__title"],
-            score=record["score_"] or 0,
-            answers_given=record["answers_given"],
-            status=record["status"],
-            created_at=record["created_at"],
+    for row in participants:
+        quiz_rollup = rollup(row.pop("quiz_id"))
+        for field, value in row.items():
+            setattr(quiz_rollup, field, value or 0)
+
+    with transaction.atomic():
+        DailyQuizRollup.objects.filter(day=day, quiz_id__in=quiz_ids).delete()
+        DailyQuizRollup.objects.bulk_create(rollups.values())
+        totals = DailyQuizRollup.objects.filter(day=day).aggregate(
+            quizzes_created=Count("pk", filter=Q(quiz_created=True)),
+            participants_accepted=Sum("participants_accepted"),
+            participants_attempted=Sum("participants_attempted"),
+            participants_completed=Sum("participants_completed"),
+            answers_given=Sum("answers_given"),
+        )
+        totals = {field: value or 0 for field, value in totals.items()}
+        DailyRollup.objects.update_or_create(
+            day=day,
+            defaults={
+                "quizzes_created": totals["quizzes_created"],
+                "participants": totals["participants_accepted"]
+                + totals["participants_attempted"]
+                + totals["participants_completed"],
+                "participants_completed": totals["participants_completed"],
+                "answers_given": totals["answers_given"],
+            },
         )
-        for record in participants
-    ]
 
 
-def get_daily_report() -> DailyReport:
-    return DailyReport(
-        quizzes=_get_quiz_report_entries(),
-        participants=_get_participant_entries(),
+def _finalize(now: datetime.datetime) -> None:
+    """Stores reports of the days which are over and whose changes have been processed"""
+    last_day = timezone.localdate(
+        now - settings.REPORT_ROLLUP_LAG
+    ) - datetime.timedelta(days=1)
+    for rollup in DailyRollup.objects.filter(
+        finalized_at__isnull=True, day__lte=last_day
+    ):
+        rollup.csv_report = "".join(get_daily_report(rollup.day).as_csv())
+        rollup.json_report = "".join(get_daily_report(rollup.day).as_json())
+        rollup.finalized_at = now
+        rollup.save()
+
+
+def refresh_rollups(now: Optional[datetime.datetime] = None) -> None:
+    """
+    Accounts quizzes and participants changed or deleted since the previous run in the rollups
+    and finalizes the days which are over. Changes are re-read with an overlap of REPORT_ROLLUP_LAG,
+    so rows committed a bit later than their updated_at aren't missed
+    """
+    now = now or timezone.now()
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).first()
+    since = watermark.value - settings.REPORT_ROLLUP_LAG if watermark else None
+    groups = _changed_groups(since)
+    deletions = list(RollupChange.objects.values_list("pk", "day", "quiz_id"))
+    for _, day, quiz_id in deletions:
+        groups[day].add(quiz_id)
+    finalized = set(
+        DailyRollup.objects.filter(
+            day__in=list(groups), finalized_at__isnull=False
+        ).values_list("day", flat=True)
     )
+    for day in sorted(set(groups) - finalized):
+        quiz_ids = iter(sorted(groups[day]))
+        while True:
+            chunk = list(islice(quiz_ids, settings.REPORT_CHUNK_SIZE))
+            if not chunk:
+                break
+            _rollup(day, chunk)
+    if deletions:
+        RollupChange.objects.filter(pk__in=[pk for pk, _, _ in deletions]).delete()
+    RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={"value": now})
+    _finalize(now)
@@ -5,27 +5,37 @@ from django.core.exceptions import NON_FIELD_ERRORS
 from django.db import transaction
 from django.db.models import QuerySet
 from django.db.utils import IntegrityError
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from rest_framework_dataclasses.serializers import DataclassSerializer
 from taggit.serializers import TaggitSerializer, TagListSerializerField
 
+from core.utils import percentage
+
+from . import usage
+from .cache import AnswerKey, bump_quiz_version, get_answer_key
 from .models import *
-from .report import DailyReport, QuizParticipantEntry, QuizReportEntry
 
 __all__ = [
     "QuizMakerListSerializer",
     "QuizMakerSerializer",
+    "ParticipantQuizListSerializer",
     "ParticipantSerializer",
     "QuestionSerializer",
     "AnswerSerializer",
     "InviteeSerializer",
+    "InvitationJobSerializer",
+    "InvitationOutcomeSerializer",
     "TakeQuizSerializer",
     "ParticipantAnswerSerializer",
+    "ParticipantAnswerItemSerializer",
     "ParticipantProgressSerializer",
+    "ParticipantNextQuestionSerializer",
+    "get_progress_serializer_class",
     "ProgressSerializer",
-    "ReportSerializer",
+    "NotificationRunSerializer",
     "QuestionListSerializer",
+    "UsageReportQuerySerializer",
 ]
 
 
@@ -48,16 +58,22 @@ class AnswerListField(RelatedManagerRepresentationMixin, serializers.ListField):
 
 
 class QuestionSerializer(serializers.ModelSerializer):
-    answers = AnswerListField(
-        allow_empty=False,
-        max_length=settings.MAX_ANSWERS_PER_QUESTION,
-        min_length=2,
-    )
+    answers = AnswerListField(allow_empty=False, min_length=2)
 
     class Meta:
         model = Question
         fields = "id", "answers", "score", "question"
 
+    def get_fields(self):
+        fields = super().get_fields()
+        # limit is read from the settings on every use, not once on import
+        fields["answers"] = AnswerListField(
+            allow_empty=False,
+            max_length=settings.MAX_ANSWERS_PER_QUESTION,
+            min_length=2,
+        )
+        return fields
+
     def validate_answers(self, value: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         correct_ans_cnt = len([a for a in value if a.get("correct", False)])
         if correct_ans_cnt == 0:
@@ -66,6 +82,8 @@ class QuestionSerializer(serializers.ModelSerializer):
             raise ValidationError(
                 {"answers": "More than one correct answer is specified"}
             )
+        if len({a["answer"] for a in value}) < len(value):
+            raise ValidationError({"answers": "Answers of the question must be unique"})
         return value
 
 
@@ -80,27 +98,26 @@ class QuestionListField(RelatedManagerRepresentationMixin, serializers.ListField
 
 
 class QuizMakerSerializer(TaggitSerializer, serializers.ModelSerializer):
-    questions = QuestionListField(
-        allow_empty=False, max_length=settings.MAX_QUESTIONS_PER_QUIZ
-    )
+    questions = QuestionListField(allow_empty=False)
     tags = TagListSerializerField(required=False)
 
     class Meta:
         model = Quiz
         fields = "id", "title", "description", "questions", "tags"
 
-    @classmethod
-    def save_questions(cls, questions: List[Dict[str, Any]], quiz: Quiz) -> None:
-        for question in questions:
-            q_answers = question.pop("answers")
-            question["quiz"] = quiz
-            saved = Question.objects.create(**question)
-            cls.save_answers(q_answers, saved)
+    def get_fields(self):
+        fields = super().get_fields()
+        fields["questions"] = QuestionListField(
+            allow_empty=False, max_length=settings.MAX_QUESTIONS_PER_QUIZ
+        )
+        return fields
 
     @classmethod
-    def save_answers(cls, answers: List[Dict[str, Any]], question: Question) -> None:
-        objs = [Answer(question=question, **answer) for answer in answers]
-        Answer.objects.bulk_create(objs)
+    def save_questions(cls, questions: List[Dict[str, Any]], quiz: Quiz) -> None:
+        Question.objects.bulk_create_with_answers([(quiz, questions)])
+        # bulk inserts don't send signals of questions and answers
+        quiz.refresh_counters()
+        bump_quiz_version(quiz.pk)
 
     def create(self, validated_data) -> Quiz:
         assert "questions" in validated_data, "No questions in request data"
@@ -109,7 +126,8 @@ class QuizMakerSerializer(TaggitSerializer, serializers.ModelSerializer):
         with transaction.atomic():
             quiz = super().create(validated_data)
             self.save_questions(questions, quiz)
-            return quiz
+        # questions of the response are read with their answers in two queries
+        return Quiz.objects.deep().get(pk=quiz.pk)
 
 
 class QuizMakerListSerializer(TaggitSerializer, serializers.ModelSerializer):
@@ -120,6 +138,24 @@ class QuizMakerListSerializer(TaggitSerializer, serializers.ModelSerializer):
         exclude = ("author",)
 
 
+class ParticipantQuizListSerializer(QuizMakerListSerializer):
+    """
+    Quiz for participant's list, with participant's own progress
+    read from annotations of Quiz.for_user_or_participant
+    """
+
+    participant_status = serializers.CharField(read_only=True)
+    participant_answered_questions_count = serializers.IntegerField(read_only=True)
+    participant_progress = serializers.SerializerMethodField()
+
+    def get_participant_progress(self, quiz: Quiz) -> str:
+        if quiz.participant_status == QuizParticipant.STATUS.completed:
+            return "100%"
+        if not quiz.question_cnt:
+            return "0%"
+        return percentage(quiz.participant_answered_questions_count, quiz.question_cnt)
+
+
 class ParticipantSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuizParticipant
@@ -139,10 +175,47 @@ class ProgressSerializer(serializers.ModelSerializer):
         fields = "invitees_summary", "participants_summary"
 
 
+class NotificationRunSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = NotificationRun
+        fields = (
+            "id",
+            "status",
+            "total",
+            "sent",
+            "failed",
+            "progress",
+            "created_at",
+            "finished_at",
+        )
+
+
 class InviteeSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuizInvitation
-        exclude = "created_at", "quiz", "inviter", "key"
+        exclude = "created_at", "quiz", "inviter", "key", "job", "delivery_failed"
+
+
+class InvitationJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = InvitationJob
+        fields = (
+            "id",
+            "status",
+            "total",
+            "sent",
+            "failed",
+            "progress",
+            "rejected",
+            "created_at",
+            "finished_at",
+        )
+
+
+class InvitationOutcomeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = QuizInvitation
+        fields = "id", "email", "delivery", "sent", "accepted"
 
 
 class TakeAnswerSerializer(serializers.ModelSerializer):
@@ -187,43 +260,48 @@ class TakeQuizSerializer(TaggitSerializer, serializers.ModelSerializer):
         )
 
 
-class ParticipantRelatedQuestionField(serializers.PrimaryKeyRelatedField):
-    """
-    Extension to make sure that queryset returns only related to participant's quiz questions
-    """
+def _get_request_participant(context: Dict[str, Any]) -> QuizParticipant:
+    request = context.get("request")
+    assert request is not None, "Request context is not provided"
+    assert request.participant is not None, "Participant is not provided"
+    return request.participant
+
 
-    def get_queryset(self) -> QuerySet[Question]:
-        request = self.context.get("request", None)
-        queryset = super().get_queryset()
-        if not request or not queryset:
-            return Question.objects.none()
-        participant = request.participant
-        if not participant:
-            return Question.objects.none()
-        return queryset.filter(quiz__id=participant.quiz.id).prefetch_related("answers")
+def _answer_key_errors(
+    answer_key: AnswerKey, question_id: int, answer_id: int
+) -> Dict[str, List[str]]:
+    if not answer_key.has_question(question_id):
+        return {"question": [f'Invalid pk "{question_id}" - object does not exist.']}
+    if not answer_key.has_answer(question_id, answer_id):
+        return {"answer": ["Wrong answer id"]}
+    return {}
 
 
 class ParticipantAnswerSerializer(serializers.ModelSerializer):
-    question = ParticipantRelatedQuestionField(queryset=Question.objects)
-    answer = serializers.PrimaryKeyRelatedField(queryset=Answer.objects.all())
+    """
+    Participant's answer, validated against cached answer key of the quiz
+    """
+
+    question = serializers.IntegerField(source="question_id")
+    answer = serializers.IntegerField(source="answer_id")
 
     class Meta:
         model = ParticipantAnswer
         fields = "question", "answer"
 
-    def run_validation(self, *args, **kwargs):
-        cleaned_data = super(ParticipantAnswerSerializer, self).run_validation(
-            *args, **kwargs
+    def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:
+        participant = _get_request_participant(self.context)
+        errors = _answer_key_errors(
+            get_answer_key(participant.quiz_id),
+            attrs["question_id"],
+            attrs["answer_id"],
         )
-        if cleaned_data["answer"] not in cleaned_data["question"].answers.all():
-            raise ValidationError({"answer": ["Wrong answer id"]})
-        return cleaned_data
+        if errors:
+            raise ValidationError(errors)
+        return attrs
 
     def create(self, validated_data):
-        request = self.context.get("request")
-        assert request is not None, "Request context is not provided"
-        assert request.participant is not None, "Participant is not provided"
-        validated_data["participant"] = request.participant
+        validated_data["participant"] = _get_request_participant(self.context)
         try:
             return super(ParticipantAnswerSerializer, self).create(validated_data)
         except IntegrityError:  # attempt to answer question second time
@@ -232,6 +310,71 @@ class ParticipantAnswerSerializer(serializers.ModelSerializer):
             )
 
 
+class ParticipantAnswerBatchSerializer(serializers.ListSerializer):
+    """
+    Validates and saves a whole set of participant's answers at once:
+    answers are checked against cached answer key of the quiz and inserted with a single query
+    """
+
+    def to_internal_value(self, data) -> List[Dict[str, Any]]:
+        participant = _get_request_participant(self.context)
+        answer_key = get_answer_key(participant.quiz_id)
+        # every question can be answered once
+        max_length = len(answer_key.order)
+        if isinstance(data, list) and len(data) > max_length:
+            raise ValidationError(
+                {NON_FIELD_ERRORS: [f"Ensure there are at most {max_length} answers"]}
+            )
+        attrs = super().to_internal_value(data)
+        answered = set(participant.answers.values_list("question_id", flat=True))
+        errors, has_errors = [], False
+        for item in attrs:
+            question_id, answer_id = item["question"], item["answer"]
+            error = _answer_key_errors(answer_key, question_id, answer_id)
+            if not error and question_id in answered:
+                error[NON_FIELD_ERRORS] = ["You have already answered this question"]
+            item["points"] = answer_key.points(question_id, answer_id)
+            answered.add(question_id)
+            has_errors = has_errors or bool(error)
+            errors.append(error)
+        if has_errors:
+            raise ValidationError(errors)
+        return attrs
+
+    def create(self, validated_data: List[Dict[str, Any]]) -> List[ParticipantAnswer]:
+        participant = _get_request_participant(self.context)
+        objs = [
+            ParticipantAnswer(
+                participant=participant,
+                question_id=item["question"],
+                answer_id=item["answer"],
+                batched=len(validated_data) > 1,
+            )
+            for item in validated_data
+        ]
+        try:
+            with transaction.atomic():
+                created = ParticipantAnswer.objects.bulk_create(objs)
+                participant.register_answers(
+                    len(created), sum(item["points"] for item in validated_data)
+                )
+        except IntegrityError:  # concurrent attempt to answer the same questions
+            raise ValidationError(
+                {NON_FIELD_ERRORS: ["You have already answered this question"]}
+            )
+        return created
+
+
+class ParticipantAnswerItemSerializer(serializers.Serializer):
+    """Single question-answer pair of a batch submission"""
+
+    question = serializers.IntegerField()
+    answer = serializers.IntegerField()
+
+    class Meta:
+        list_serializer_class = ParticipantAnswerBatchSerializer
+
+
 class ParticipantProgressSerializer(serializers.ModelSerializer):
     answered_questions_count = serializers.IntegerField()
     total_questions_count = serializers.IntegerField()
@@ -246,16 +389,72 @@ class ParticipantProgressSerializer(serializers.ModelSerializer):
         )
 
 
-class QuizReportEntrySerializer(DataclassSerializer):
-    class Meta:
-        dataclass = QuizReportEntry
+class ParticipantNextQuestionSerializer(serializers.ModelSerializer):
+    """
+    Lean progress: counters and only the next unanswered question (null when there is none)
+    """
 
+    answered_questions_count = serializers.IntegerField()
+    total_questions_count = serializers.IntegerField()
+    next_question = TakeQuestionSerializer(allow_null=True)
 
-class QuizParticipantReportEntrySerializer(DataclassSerializer):
     class Meta:
-        dataclass = QuizParticipantEntry
+        model = QuizParticipant
+        fields = (
+            "answered_questions_count",
+            "total_questions_count",
+            "next_question",
+        )
 
 
-class ReportSerializer(DataclassSerializer):
-    class Meta:
-        dataclass = DailyReport
+NEXT_QUESTION_VIEW = "next"
+
+
+def _accept_profiles(accept: str) -> List[str]:
+    profiles = []
+    for media_range in accept.split(","):
+        for param in media_range.split(";")[1:]:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "profile":
+                profiles.append(value.strip().strip('"'))
+    return profiles
+
+
+def get_progress_serializer_class(request) -> type:
+    """
+    Serializer of participant's progress chosen by the client:
+    ?view=next or Accept: application/json; profile="next" selects the lean one
+    """
+    if request.GET.get("view") == NEXT_QUESTION_VIEW or (
+        NEXT_QUESTION_VIEW in _accept_profiles(request.headers.get("Accept", ""))
+    ):
+        return ParticipantNextQuestionSerializer
+    return ParticipantProgressSerializer
+
+
+class UsageReportQuerySerializer(serializers.Serializer):
+    """Range and buckets of the usage report, times without offset are in TIME_ZONE"""
+
+    start = serializers.DateTimeField(input_formats=["iso-8601", "%Y-%m-%d"])
+    end = serializers.DateTimeField(
+        input_formats=["iso-8601", "%Y-%m-%d"], required=False
+    )
+    bucket = serializers.ChoiceField(choices=list(usage.BUCKETS), default=usage.DAY)
+
+    def validate(self, attrs):
+        attrs.setdefault("end", timezone.now())
+        if attrs["start"] >= attrs["end"]:
+            raise ValidationError({"end": ["Must be later than start"]})
+        buckets = sum(
+            1
+            for _ in usage.bucket_starts(attrs["start"], attrs["end"], attrs["bucket"])
+        )
+        if buckets > settings.USAGE_REPORT_MAX_BUCKETS:
+            raise ValidationError(
+                {
+                    NON_FIELD_ERRORS: [
+                        f"Too many buckets: {buckets} > {settings.USAGE_REPORT_MAX_BUCKETS}"
+                    ]
+                }
+            )
+        return attrs
@@ -1,21 +1,137 @@
-from django.db.models.signals import post_save, pre_save
+from typing import Optional
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.text import slugify
 
+from .cache import ACTIVITY, bump_quiz_version, evict_participant_token, get_answer_key
 from .models import *
+from .models import participant_answered
+
+
+def _on_quiz_content_changed(quiz_id: int) -> None:
+    Quiz.objects.filter(pk=quiz_id).update(updated_at=timezone.now())
+    bump_quiz_version(quiz_id)
+
+
+@receiver(post_save, sender=Quiz)
+def on_quiz_created(
+    sender, instance: Quiz, created: bool, raw: bool = False, **kwargs
+) -> None:
+    if created and not raw:
+        QuizProgressCounter.create_shards([instance.pk])
 
 
 @receiver(post_save, sender=ParticipantAnswer)
-def on_participant_answer_saved(sender, instance: ParticipantAnswer, **kwargs) -> None:
+def on_participant_answer_saved(
+    sender, instance: ParticipantAnswer, created: bool, raw: bool = False, **kwargs
+) -> None:
+    if raw or not created:
+        return
     participant = instance.participant
-    total_question_cnt = participant.quiz.question_cnt
-    answered_so_far = participant.answered_questions_count
-    if answered_so_far < total_question_cnt:
-        participant.status = QuizParticipant.STATUS.attempted
+    answer_key = get_answer_key(participant.quiz_id)
+    participant.register_answers(
+        1, answer_key.points(instance.question_id, instance.answer_id)
+    )
+
+
+@receiver([post_save, post_delete, participant_answered], sender=QuizParticipant)
+def on_participant_changed(sender, instance: QuizParticipant, **kwargs) -> None:
+    evict_participant_token(instance.key)
+    bump_quiz_version(instance.quiz_id, ACTIVITY)
+
+
+@receiver([post_save, post_delete], sender=QuizInvitation)
+def count_invitation(
+    sender,
+    instance: QuizInvitation,
+    created: bool = False,
+    raw: bool = False,
+    **kwargs,
+) -> None:
+    if raw:
+        return
+    field = QuizProgressCounter.invitation_field(instance.accepted)
+    if kwargs["signal"] is post_delete:
+        QuizProgressCounter.add(instance.quiz_id, **{field: -1})
+    elif created:
+        QuizProgressCounter.add(instance.quiz_id, **{field: 1})
+    elif instance.tracker.has_changed("accepted"):
+        previous = QuizProgressCounter.invitation_field(
+            instance.tracker.previous("accepted")
+        )
+        QuizProgressCounter.add(instance.quiz_id, **{previous: -1, field: 1})
+
+
+@receiver([post_save, post_delete, participant_answered], sender=QuizParticipant)
+def count_participant(
+    sender,
+    instance: QuizParticipant,
+    created: bool = False,
+    raw: bool = False,
+    previous_status: Optional[str] = None,
+    **kwargs,
+) -> None:
+    if raw:
+        return
+    field = QuizProgressCounter.participant_field(instance.status)
+    if kwargs["signal"] is post_delete:
+        QuizProgressCounter.add(instance.quiz_id, **{field: -1})
+    elif created:
+        QuizProgressCounter.add(instance.quiz_id, **{field: 1})
     else:
-        participant.status = QuizParticipant.STATUS.completed
-        participant.score = participant._score or 0
-    participant.save()
+        if previous_status is None and instance.tracker.has_changed("status"):
+            previous_status = instance.tracker.previous("status")
+        if previous_status and previous_status != instance.status:
+            previous = QuizProgressCounter.participant_field(previous_status)
+            QuizProgressCounter.add(instance.quiz_id, **{previous: -1, field: 1})
+
+
+@receiver(pre_delete, sender=Quiz)
+def on_quiz_deleted(sender, instance: Quiz, **kwargs) -> None:
+    # rollups of the quiz are deleted along with it, totals of their days are to be recomputed
+    RollupChange.objects.bulk_create(
+        RollupChange(day=day, quiz_id=instance.pk)
+        for day in instance.daily_rollups.values_list("day", flat=True)
+    )
+
+
+@receiver(post_delete, sender=QuizParticipant)
+def on_participant_deleted(sender, instance: QuizParticipant, **kwargs) -> None:
+    RollupChange.objects.create(
+        day=timezone.localdate(instance.created_at), quiz_id=instance.quiz_id
+    )
+
+
+@receiver([post_save, post_delete], sender=QuizInvitation)
+def on_invitation_changed(
+    sender, instance: QuizInvitation, raw: bool = False, **kwargs
+) -> None:
+    if not raw:
+        bump_quiz_version(instance.quiz_id, ACTIVITY)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def on_question_changed(
+    sender, instance: Question, raw: bool = False, **kwargs
+) -> None:
+    if not raw:
+        Quiz.objects.filter(pk=instance.quiz_id).refresh_counters()
+        _on_quiz_content_changed(instance.quiz_id)
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def on_answer_changed(sender, instance: Answer, raw: bool = False, **kwargs) -> None:
+    if raw:
+        return
+    quiz_id = (
+        Question.objects.filter(pk=instance.question_id)
+        .values_list("quiz_id", flat=True)
+        .first()
+    )
+    if quiz_id:  # otherwise the question is deleted and its own signal takes care
+        _on_quiz_content_changed(quiz_id)
 
 
 @receiver(pre_save, sender=Quiz)
@@ -0,0 +1,136 @@
+"""
+Item statistics of a quiz for its author: how many participants picked every answer of every question,
+percent of correct answers and average time to answer.
+
+Time to answer is the time since the previous answer of the participant (or since they joined the quiz).
+Answers saved together (a batch submission, the write-behind stream) aren't timed: their created_at
+is the time they were saved, so they count in the distribution only.
+Counts and total times of (question, answer) pairs are aggregated by a single grouped query and cached
+per quiz along with the id of the last answer accounted. Answers bump the activity version of the quiz:
+once it changes, only the answers added since are aggregated and added to the cached counts.
+A change of questions or answers (content version) starts over; cached entries expire after
+QUIZ_STATS_CACHE_TIMEOUT, which also accounts deleted participants and late committed answers
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import (
+    Count,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+)
+from django.db.models.functions import Coalesce
+
+from core.utils import percentage
+
+from .cache import ACTIVITY, AnswerKey, get_answer_key, get_quiz_version
+from .models import ParticipantAnswer
+
+__all__ = [
+    "QuizStats",
+    "get_quiz_stats",
+]
+
+
+@dataclass
+class QuizStats:
+    quiz_id: int
+    expires_at: float
+    activity_version: Optional[int] = None
+    last_answer_id: int = 0
+    # (question id, answer id) -> [times picked, times timed, total seconds to answer]
+    counts: Dict[Tuple[int, int], List[float]] = field(default_factory=dict)
+
+    def refresh(self, activity_version: int) -> None:
+        """Accounts answers added since the last refresh"""
+        previous = ParticipantAnswer.objects.filter(
+            participant_id=OuterRef("participant_id"),
+            created_at__lt=OuterRef("created_at"),
+        ).order_by("-created_at")
+        elapsed = ExpressionWrapper(
+            F("created_at")
+            - Coalesce(
+                Subquery(previous.values("created_at")[:1]),
+                F("participant__created_at"),
+            ),
+            output_field=DurationField(),
+        )
+        rows = (
+            ParticipantAnswer.objects.filter(
+                question__quiz_id=self.quiz_id, id__gt=self.last_answer_id
+            )
+            .order_by()
+            .values_list("question_id", "answer_id")
+            .annotate(
+                picked=Count("pk"),
+                timed=Count("pk", filter=Q(batched=False)),
+                elapsed=Sum(elapsed, filter=Q(batched=False)),
+                last_id=Max("pk"),
+            )
+        )
+        for question_id, answer_id, picked, timed, total_elapsed, last_id in rows:
+            counts = self.counts.setdefault((question_id, answer_id), [0, 0, 0.0])
+            counts[0] += picked
+            counts[1] += timed
+            counts[2] += total_elapsed.total_seconds() if total_elapsed else 0.0
+            self.last_answer_id = max(self.last_answer_id, last_id)
+        self.activity_version = activity_version
+
+    def as_list(self, answer_key: AnswerKey) -> List[Dict[str, Any]]:
+        """Statistics of the questions in order, with all of their answers"""
+        questions = []
+        for question_id in answer_key.order:
+            answers, answered, correct, timed, elapsed = [], 0, 0, 0, 0.0
+            for answer_id, is_correct in answer_key.answers[question_id].items():
+                picked, answer_timed, total_elapsed = self.counts.get(
+                    (question_id, answer_id), (0, 0, 0.0)
+                )
+                answers.append(
+                    {"id": answer_id, "correct": is_correct, "picked": picked}
+                )
+                answered += picked
+                correct += picked if is_correct else 0
+                timed += answer_timed
+                elapsed += total_elapsed
+            questions.append(
+                {
+                    "id": question_id,
+                    "answered": answered,
+                    "correct": percentage(correct, answered) if answered else None,
+                    "average_time": elapsed / timed if timed else None,
+                    "answers": answers,
+                }
+            )
+        return questions
+
+
+def _stats_key(quiz_id: int, content_version: int) -> str:
+    return f"quiz:{quiz_id}:stats:{content_version}"
+
+
+def get_quiz_stats(quiz_id: int) -> List[Dict[str, Any]]:
+    """Statistics of the questions of the quiz, refreshed with the answers added since cached"""
+    answer_key = get_answer_key(quiz_id)
+    # read before the answers, so answers added meanwhile are accounted by the next refresh
+    activity_version = get_quiz_version(quiz_id, ACTIVITY)
+    key = _stats_key(quiz_id, answer_key.version)
+    now = time.time()
+    stats = cache.get(key)
+    if stats is None or stats.expires_at <= now:
+        # refreshes don't extend the lifetime, so the counts are recomputed from scratch in time
+        stats = QuizStats(
+            quiz_id=quiz_id, expires_at=now + settings.QUIZ_STATS_CACHE_TIMEOUT
+        )
+    if stats.activity_version != activity_version:
+        stats.refresh(activity_version)
+        cache.set(key, stats, timeout=max(1, int(stats.expires_at - now)))
+    return stats.as_list(answer_key)
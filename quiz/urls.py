@@ -1,6 +1,7 @@
 from django.urls import path, re_path
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .views import *
 
 router = DefaultRouter()
@@ -19,4 +20,25 @@ urlpatterns += [
         name="accept-invite",
     ),
     path("report", daily_report, name="daily-report"),
+    path("report/usage", usage_report, name="usage-report"),
+    path(
+        "async/quizzes/<int:pk>/",
+        async_views.quiz_detail,
+        name="async-quizzes-detail",
+    ),
+    path(
+        "async/quizzes/<int:pk>/answer/",
+        async_views.answer,
+        name="async-quizzes-answer",
+    ),
+    path(
+        "async/quizzes/<int:pk>/my-progress/",
+        async_views.progress,
+        name="async-quizzes-progress",
+    ),
+    path(
+        "async/quizzes/<int:pk>/next/",
+        async_views.next_question,
+        name="async-quizzes-next",
+    ),
 ]
@@ -0,0 +1,146 @@
+"""
+Usage of the service over an arbitrary range of time, split into hourly, daily or weekly buckets.
+
+Every metric is counted by the database with a single query grouping the rows of the range
+(a range scan of the index on their timestamp, added along with the report) by the timestamp
+truncated to the bucket in TIME_ZONE:
+- quizzes created, by Quiz.created_at;
+- invitations sent and how many of them have been accepted, by QuizInvitation.sent;
+- participants who joined, by their current status, by QuizParticipant.created_at;
+- answers submitted, by ParticipantAnswer.created_at.
+Ranges are half-open [start, end), buckets without activity are reported with zeros
+"""
+import datetime
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List
+
+from django.db.models import Count, Q, QuerySet
+from django.db.models.functions import TruncDay, TruncHour, TruncWeek
+from django.utils import timezone
+
+from .models import *
+
+__all__ = [
+    "HOUR",
+    "DAY",
+    "WEEK",
+    "BUCKETS",
+    "UsageBucket",
+    "bucket_starts",
+    "get_usage_report",
+]
+
+HOUR = "hour"
+DAY = "day"
+WEEK = "week"
+
+BUCKETS = {HOUR: TruncHour, DAY: TruncDay, WEEK: TruncWeek}
+
+
+@dataclass
+class UsageBucket:
+    start: datetime.datetime
+    quizzes_created: int = 0
+    invitations_sent: int = 0
+    invitations_accepted: int = 0
+    participants: Dict[str, int] = field(
+        default_factory=lambda: {status: 0 for status, _ in QuizParticipant.STATUS}
+    )
+    answers_submitted: int = 0
+
+
+def _truncate(value: datetime.datetime, bucket: str) -> datetime.datetime:
+    """Naive local start of the bucket containing the time"""
+    value = timezone.localtime(value).replace(tzinfo=None)
+    if bucket == HOUR:
+        return value.replace(minute=0, second=0, microsecond=0)
+    day = datetime.datetime.combine(value.date(), datetime.time.min)
+    return day - datetime.timedelta(days=day.weekday()) if bucket == WEEK else day
+
+
+def bucket_starts(
+    start: datetime.datetime, end: datetime.datetime, bucket: str
+) -> Iterator[datetime.datetime]:
+    """Naive local starts of the buckets overlapping [start, end)"""
+    step = {
+        HOUR: datetime.timedelta(hours=1),
+        DAY: datetime.timedelta(days=1),
+        WEEK: datetime.timedelta(weeks=1),
+    }[bucket]
+    current, last = _truncate(start, bucket), timezone.localtime(end).replace(
+        tzinfo=None
+    )
+    while current < last:
+        yield current
+        current += step
+
+
+def _grouped(
+    queryset: QuerySet,
+    time_field: str,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    bucket: str,
+    **aggregates,
+) -> Iterator[Dict]:
+    """Aggregates of the rows within the range grouped by the bucket of their time"""
+    tz = timezone.get_current_timezone()
+    rows = (
+        queryset.filter(**{f"{time_field}__gte": start, f"{time_field}__lt": end})
+        .order_by()
+        .annotate(bucket=BUCKETS[bucket](time_field, tzinfo=tz))
+        .values("bucket")
+        .annotate(**aggregates)
+    )
+    for row in rows:
+        row["bucket"] = _truncate(row["bucket"], bucket)
+        yield row
+
+
+def get_usage_report(
+    start: datetime.datetime, end: datetime.datetime, bucket: str = DAY
+) -> List[UsageBucket]:
+    """Usage of the service within [start, end) by buckets, in order"""
+    buckets = {
+        local_start: UsageBucket(start=timezone.make_aware(local_start, is_dst=False))
+        for local_start in bucket_starts(start, end, bucket)
+    }
+    for row in _grouped(
+        Quiz.objects.all(), "created_at", start, end, bucket, count=Count("pk")
+    ):
+        buckets[row["bucket"]].quizzes_created = row["count"]
+    for row in _grouped(
+        QuizInvitation.objects.all(),
+        "sent",
+        start,
+        end,
+        bucket,
+        sent=Count("pk"),
+        accepted=Count("pk", filter=Q(accepted=True)),
+    ):
+        buckets[row["bucket"]].invitations_sent = row["sent"]
+        buckets[row["bucket"]].invitations_accepted = row["accepted"]
+    for row in _grouped(
+        QuizParticipant.objects.all(),
+        "created_at",
+        start,
+        end,
+        bucket,
+        **{
+            status: Count("pk", filter=Q(status=status))
+            for status, _ in QuizParticipant.STATUS
+        },
+    ):
+        buckets[row["bucket"]].participants = {
+            status: row[status] for status, _ in QuizParticipant.STATUS
+        }
+    for row in _grouped(
+        ParticipantAnswer.objects.all(),
+        "created_at",
+        start,
+        end,
+        bucket,
+        count=Count("pk"),
+    ):
+        buckets[row["bucket"]].answers_submitted = row["count"]
+    return list(buckets.values())
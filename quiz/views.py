@@ -1,19 +1,24 @@
+import codecs
 import csv
 import datetime
 import json
-from typing import Any, Dict, Optional
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Optional
 
 from annoying.functions import get_object_or_None
 from django.conf import settings
-from django.core.exceptions import ValidationError
-from django.core.validators import validate_email
+from django.db import transaction
 from django.db.models import QuerySet
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
 from django.urls import reverse
-from invitations.exceptions import AlreadyAccepted, AlreadyInvited
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 from rest_framework import mixins, status
 from rest_framework.decorators import action, api_view, permission_classes
-from rest_framework.exceptions import APIException
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
@@ -21,12 +26,19 @@ from rest_framework.viewsets import GenericViewSet
 
 from core.utils import datetime_to_str
 
+from .cache import ACTIVITY, get_participant_by_token, get_quiz_version
+from .exceptions import QuizException
+from .exporter import export_quizzes
 from .filters import *
-from .forms import CleanInvitationMixin
+from .importer import CSV, FORMATS, JSONL, import_quizzes
+from .ingestion import enqueue_answers
+from .invitees import csv_rows, invite, rejections_report
 from .jobs import notify_participants
 from .models import *
 from .report import get_daily_report
 from .serializers import *
+from .stats import get_quiz_stats
+from .usage import get_usage_report
 
 __all__ = [
     "QuizMakerViewSet",
@@ -35,6 +47,7 @@ __all__ = [
     "QuizViewSet",
     "accept_invitation",
     "daily_report",
+    "usage_report",
 ]
 
 
@@ -65,8 +78,34 @@ class PaginatedQuerysetMixin:
         return Response(serializer.data)
 
 
+class ConditionalGetMixin:
+    """
+    Mixin-helper to answer conditional GET requests (If-None-Match / If-Modified-Since)
+    with 304 Not Modified based on cheap version stamps, before anything is serialized
+    """
+
+    @classmethod
+    def _conditional_response(
+        cls,
+        request,
+        get_response: Callable[[], HttpResponseBase],
+        *version: Any,
+        last_modified: Optional[datetime.datetime] = None,
+    ) -> HttpResponseBase:
+        etag = quote_etag("-".join(str(part) for part in version))
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = get_response()
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        return response
+
+
 class QuizMakerViewSet(
     ActionBasedSerializerMixin,
+    ConditionalGetMixin,
     PaginatedQuerysetMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
@@ -81,49 +120,165 @@ class QuizMakerViewSet(
     serializer_class = QuizMakerSerializer
     serializer_action_classes = {
         "list": QuizMakerListSerializer,
+        "invite": InvitationJobSerializer,
+        "invitation_job": InvitationOutcomeSerializer,
         "invitees": InviteeSerializer,
         "participants": ParticipantSerializer,
         "progress": ProgressSerializer,
+        "notify": NotificationRunSerializer,
+        "notifications": NotificationRunSerializer,
     }
     filterset_class = QuizFilter
 
     def get_queryset(self) -> QuerySet[Quiz]:
         base_queryset = (
-            Quiz.objects.all()
-            if self.action in ["list", "invitees", "invite"]
-            else Quiz.objects.deep()  # we will need info about questions and answers
+            Quiz.objects.deep()  # we will need info about questions and answers
+            if self.action in ["retrieve", "questions"]
+            else Quiz.objects.all()
         )
         return base_queryset.filter(author=self.request.user)
 
     @action(detail=True, methods=["post"])
     def invite(self, request, *args, **kwargs) -> Response:
+        """
+        Invites the emails to the quiz, invitations are sent in background.
+        Progress and outcomes of every invitee are available by the id of the job
+        """
         quiz = self.get_object()
-        status_code = status.HTTP_400_BAD_REQUEST
+        if not isinstance(request.data, list):
+            raise QuizException(detail="A list of emails is expected")
         if len(request.data) > settings.MAX_INVITEES_PER_REQUEST:
-            raise APIException(
-                code=status_code,
+            raise QuizException(
                 detail=f"The number of invitees exceeds the limit: {settings.MAX_INVITEES_PER_REQUEST}",
             )
-        response = {"valid": [], "invalid": []}
-        for invitee in request.data:
-            try:
-                validate_email(invitee)
-                CleanInvitationMixin().validate_invitation(invitee, quiz)
-                invite = QuizInvitation.create(invitee, quiz=quiz, inviter=request.user)
-            except ValidationError:
-                response["invalid"].append({invitee: "invalid email"})
-            except AlreadyAccepted:
-                response["invalid"].append({invitee: "already accepted"})
-            except AlreadyInvited:
-                response["invalid"].append({invitee: "pending invite"})
-            else:
-                invite.send_invitation(request)
-                response["valid"].append({invitee: "invited"})
-
-        if response["valid"]:
-            status_code = status.HTTP_201_CREATED
-
-        return Response(data=response, status=status_code)
+        with transaction.atomic():
+            job = invite(
+                quiz,
+                enumerate(request.data, start=1),
+                inviter=request.user,
+                base_url=request.build_absolute_uri("/"),
+            )
+            invalid = [
+                {email: reason}
+                for email, reason in job.rejections.order_by("line").values_list(
+                    "email", "reason"
+                )
+            ]
+            if not job.total:
+                transaction.set_rollback(True)
+                return Response(
+                    data={"valid": [], "invalid": invalid},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        return Response(
+            {**self.get_serializer(job).data, "invalid": invalid},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="invite/upload",
+        parser_classes=[MultiPartParser],
+    )
+    def invite_upload(self, request, *args, **kwargs) -> Response:
+        """
+        Invites emails of CSV file uploaded as "file" with the "email" column.
+        The file is parsed as a stream, rejected rows are available as CSV report of the job
+        """
+        quiz = self.get_object()
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise QuizException(detail="No file uploaded")
+        try:
+            job = invite(
+                quiz,
+                csv_rows(codecs.iterdecode(upload, "utf-8-sig")),
+                inviter=request.user,
+                base_url=request.build_absolute_uri("/"),
+            )
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise QuizException(detail=f"Invalid CSV file - {e}")
+        return Response(
+            InvitationJobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
+
+    @action(
+        detail=True,
+        methods=["get"],
+        url_path=r"invitation-jobs/(?P<job_id>\d+)",
+        filterset_class=InviteeFilter,
+    )
+    def invitation_job(self, request, job_id: str, *args, **kwargs) -> Response:
+        """Progress of the invitation job and outcomes of its invitees"""
+        quiz = self.get_object()
+        job = get_object_or_404(quiz.invitation_jobs, pk=job_id)
+        response = self._paginated_response(job.invitations.order_by("id"))
+        response.data["job"] = InvitationJobSerializer(job).data
+        return response
+
+    @action(
+        detail=True,
+        methods=["get"],
+        url_path=r"invitation-jobs/(?P<job_id>\d+)/rejections",
+    )
+    def invitation_rejections(
+        self, request, job_id: str, *args, **kwargs
+    ) -> StreamingHttpResponse:
+        """Rows of the invitation job which haven't been invited, streamed as CSV"""
+        quiz = self.get_object()
+        job = get_object_or_404(quiz.invitation_jobs, pk=job_id)
+        return StreamingHttpResponse(
+            rejections_report(job),
+            content_type="text/csv",
+            headers={
+                "Content-Disposition": f'attachment; filename="invitation-job-{job.pk}-rejections.csv"'
+            },
+        )
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        parser_classes=[MultiPartParser],
+    )
+    def bulk_import(self, request, *args, **kwargs) -> Response:
+        """
+        Bulk import of quizzes from JSONL or CSV file uploaded as "file",
+        the format is taken from ?input_format or from the file extension
+        """
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise QuizException(detail="No file uploaded")
+        format_ = request.query_params.get("input_format") or (
+            CSV if upload.name.lower().endswith(".csv") else JSONL
+        )
+        if format_ not in FORMATS:
+            raise QuizException(detail="Unknown format")
+        report = import_quizzes(
+            codecs.iterdecode(upload, "utf-8-sig"), request.user, format_
+        )
+        return Response(
+            data={"failed": report.failed, **asdict(report)},
+            status=status.HTTP_201_CREATED
+            if report.created
+            else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(detail=False, methods=["get"])
+    def export(self, request, *args, **kwargs) -> StreamingHttpResponse:
+        """
+        Author's quizzes (filtered the same way as the list) with questions, answers and tags,
+        streamed as JSONL in the format accepted by import
+        """
+        quizzes = self.filter_queryset(self.get_queryset())
+        return StreamingHttpResponse(
+            export_quizzes(quizzes),
+            content_type="application/x-ndjson",
+            headers={
+                "Content-Disposition": f'attachment; filename="quizzes-{datetime_to_str(datetime.datetime.now())}.jsonl"'
+            },
+        )
 
     @action(detail=True, methods=["get"])
     def invitees(self, request, *args, **kwargs) -> Response:
@@ -135,20 +290,52 @@ class QuizMakerViewSet(
     def notify(self, request, *args, **kwargs) -> Response:
         """Send notifications with results to those who completed the quiz"""
         quiz = self.get_object()
-        notify_participants(quiz)
-        return Response(status=status.HTTP_200_OK)
+        run = notify_participants(quiz)
+        return Response(self.get_serializer(run).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["get"])
+    def notifications(self, request, *args, **kwargs) -> Response:
+        """Runs of notifications with their progress, the latest first"""
+        quiz = self.get_object()
+        self.filterset_class = None
+        return self._paginated_response(quiz.notification_runs.all())
 
     @action(detail=True, methods=["get"])
     def participants(self, request, *args, **kwargs) -> Response:
         """Quiz participants and their scores"""
         quiz = self.get_object()
         self.filterset_class = ParticipantFilter
-        return self._paginated_response(quiz.participants.all())
+        return self._conditional_response(
+            request,
+            # counters are stored in the rows and all of them share the quiz instance,
+            # so a page is read with a single query
+            lambda: self._paginated_response(quiz.participants.all()),
+            quiz.pk,
+            get_quiz_version(quiz.pk, ACTIVITY),
+            get_quiz_version(quiz.pk),
+        )
 
     @action(detail=True, methods=["get"])
     def progress(self, request, *args, **kwargs) -> Response:
         quiz = self.get_object()
-        return Response(self.get_serializer(quiz).data)
+        return self._conditional_response(
+            request,
+            lambda: Response(self.get_serializer(quiz).data),
+            quiz.pk,
+            get_quiz_version(quiz.pk, ACTIVITY),
+        )
+
+    @action(detail=True, methods=["get"])
+    def stats(self, request, *args, **kwargs) -> Response:
+        """Answer distribution, percent correct and average time to answer by question"""
+        quiz = self.get_object()
+        return self._conditional_response(
+            request,
+            lambda: Response({"questions": get_quiz_stats(quiz.pk)}),
+            quiz.pk,
+            get_quiz_version(quiz.pk, ACTIVITY),
+            get_quiz_version(quiz.pk),
+        )
 
     @action(detail=True, methods=["get"])
     def questions(self, request, *args, **kwargs) -> Response:
@@ -189,6 +376,7 @@ class AnswerViewSet(
 
 class QuizViewSet(
     ActionBasedSerializerMixin,
+    ConditionalGetMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -205,8 +393,10 @@ class QuizViewSet(
 
     serializer_action_classes = {
         "answer": ParticipantAnswerSerializer,
+        "answers": ParticipantAnswerItemSerializer,
         "progress": ParticipantProgressSerializer,
-        "list": QuizMakerListSerializer,
+        "next": ParticipantNextQuestionSerializer,
+        "list": ParticipantQuizListSerializer,
     }
 
     def get_queryset(self):
@@ -218,36 +408,114 @@ class QuizViewSet(
 
     def dispatch(self, request, *args, **kwargs):
         token = self.get_token(request)
-        request.participant = (
-            get_object_or_None(QuizParticipant, key=token) if token else None
-        )
+        request.participant = get_participant_by_token(token) if token else None
         response = super(QuizViewSet, self).dispatch(request, *args, **kwargs)
         if token:
             response.headers[self.token_header] = token
         return response
 
-    def _get_participant(self, request) -> Optional[QuizParticipant]:
-        return request.participant or get_object_or_None(
-            QuizParticipant, user=request.user, quiz=self.get_object()
+    def retrieve(self, request, *args, **kwargs) -> HttpResponseBase:
+        quiz = self.get_object()
+        return self._conditional_response(
+            request,
+            lambda: Response(self.get_serializer(quiz).data),
+            quiz.pk,
+            quiz.updated_at.timestamp(),
+            get_quiz_version(quiz.pk),
+            last_modified=quiz.updated_at,
+        )
+
+    def _get_participant(self, request) -> QuizParticipant:
+        """
+        Participant of the requested quiz, resolved by token or with a single indexed lookup by user.
+        The quiz itself is not loaded
+        """
+        try:
+            quiz_id = int(self.kwargs[self.lookup_field])
+        except ValueError:
+            raise Http404
+        participant = request.participant
+        if participant is None and request.user.is_authenticated:
+            participant = get_object_or_None(
+                QuizParticipant, user=request.user, quiz_id=quiz_id
+            )
+        if participant is None or participant.quiz_id != quiz_id:
+            raise Http404
+        return participant
+
+    def _get_answering_participant(self, request) -> QuizParticipant:
+        participant = request.participant = self._get_participant(request)
+        if participant.status == QuizParticipant.STATUS.completed:
+            raise QuizException(detail="You have already completed this quiz")
+        return participant
+
+    @classmethod
+    def _enqueue_answers(cls, participant: QuizParticipant, answers) -> Response:
+        """Write-behind mode: answers are saved later, only counters are returned"""
+        return Response(
+            {
+                "answered_questions_count": enqueue_answers(participant, answers),
+                "total_questions_count": participant.total_questions_count,
+            },
+            status=status.HTTP_202_ACCEPTED,
         )
 
     @action(detail=True, methods=["post"])
     def answer(self, request, *args, **kwargs) -> Response:
         """Participant's answer to the question of the quiz"""
-        participant = request.participant = self._get_participant(request)
-        if participant.status == QuizParticipant.STATUS.completed:
-            raise APIException(
-                detail="You have already completed this quiz",
-                code=status.HTTP_400_BAD_REQUEST,
-            )
+        participant = self._get_answering_participant(request)
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        if settings.ANSWER_INGESTION == "stream":
+            data = serializer.validated_data
+            return self._enqueue_answers(
+                participant, [(data["question_id"], data["answer_id"])]
+            )
         serializer.save()
         return Response(
-            ParticipantProgressSerializer(participant).data,
+            get_progress_serializer_class(request)(participant).data,
             status=status.HTTP_200_OK,
         )
 
+    @action(detail=True, methods=["post"])
+    def answers(self, request, *args, **kwargs) -> Response:
+        """
+        Batch of participant's answers, e.g. the whole attempt buffered by an offline client
+        [{"question": 1, "answer": 2}, ...]
+        """
+        participant = self._get_answering_participant(request)
+        serializer = self.get_serializer(
+            data=request.data, many=True, allow_empty=False
+        )
+        serializer.is_valid(raise_exception=True)
+        if settings.ANSWER_INGESTION == "stream":
+            return self._enqueue_answers(
+                participant,
+                [
+                    (item["question"], item["answer"])
+                    for item in serializer.validated_data
+                ],
+            )
+        serializer.save()
+        return Response(
+            get_progress_serializer_class(request)(participant).data,
+            status=status.HTTP_200_OK,
+        )
+
+    def _participant_response(self, request, serializer_class) -> HttpResponseBase:
+        participant = self._get_participant(request)
+        response = self._conditional_response(
+            request,
+            lambda: Response(serializer_class(participant).data),
+            serializer_class.__name__,
+            participant.pk,
+            participant.updated_at.timestamp(),
+            get_quiz_version(participant.quiz_id),
+            last_modified=participant.updated_at,
+        )
+        patch_vary_headers(response, ["Accept"])
+        return response
+
     @action(
         detail=True,
         methods=["get"],
@@ -257,8 +525,16 @@ class QuizViewSet(
         """
         Participant's progress
         """
-        serializer = self.get_serializer(self._get_participant(request))
-        return Response(serializer.data)
+        return self._participant_response(
+            request, get_progress_serializer_class(request)
+        )
+
+    @action(detail=True, methods=["get"])
+    def next(self, request, *args, **kwargs) -> Response:
+        """
+        Participant's progress with the next unanswered question only, for clients fetching one question at a time
+        """
+        return self._participant_response(request, ParticipantNextQuestionSerializer)
 
 
 @api_view(["GET"])
@@ -284,7 +560,7 @@ def accept_invitation(request, key) -> Response:
 
 @api_view(["GET"])
 @permission_classes([IsAdminUser])
-def daily_report(request: Request) -> HttpResponse:
+def daily_report(request: Request) -> HttpResponseBase:
     """
     Daily report about the usage of the service
     """
@@ -292,19 +568,40 @@ def daily_report(request: Request) -> HttpResponse:
     format_ = request.query_params.get("output_format", "csv")
     if format_ not in known_formats:
         return HttpResponse("Unknown format", status=status.HTTP_400_BAD_REQUEST)
+    try:
+        day = request.query_params.get("day")
+        day = datetime.date.fromisoformat(day) if day else timezone.localdate()
+    except ValueError:
+        return HttpResponse("Invalid day", status=status.HTTP_400_BAD_REQUEST)
     response_kwargs = {
         "content_type": known_formats[format_],
         "headers": {
-            "Content-Disposition": f'attachment; filename="report-{datetime_to_str(datetime.datetime.now())}.{format_}"'
+            "Content-Disposition": f'attachment; filename="report-{day.isoformat()}.{format_}"'
         },
     }
-    report = get_daily_report()
-    if format_ == "json":
-        return HttpResponse(
-            json.dumps(ReportSerializer(report).data), **response_kwargs
-        )
-    else:
-        response = HttpResponse(**response_kwargs)
-        writer = csv.writer(response)
-        writer.writerows(report.as_rows)
-        return response
+    finalized = DailyRollup.objects.filter(day=day, finalized_at__isnull=False).first()
+    if finalized is not None:
+        return HttpResponse(getattr(finalized, f"{format_}_report"), **response_kwargs)
+    return StreamingHttpResponse(
+        get_daily_report(day).render(format_), **response_kwargs
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def usage_report(request: Request) -> Response:
+    """
+    Usage of the service within the range by hourly, daily or weekly buckets
+    """
+    serializer = UsageReportQuerySerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    params = serializer.validated_data
+    buckets = get_usage_report(params["start"], params["end"], params["bucket"])
+    return Response(
+        {
+            "start": params["start"],
+            "end": params["end"],
+            "bucket": params["bucket"],
+            "results": [asdict(bucket) for bucket in buckets],
+        }
+    )
@@ -1,3 +1,11 @@
 #!/bin/bash
 
-python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+if [ "$SERVER" = "asgi" ]; then
+    exec uvicorn qaas.asgi:application --host 0.0.0.0 --port 8000 --workers "${WEB_CONCURRENCY:-4}"
+fi
+
+if [ "$SERVER" = "wsgi" ]; then
+    exec gunicorn qaas.wsgi:application --bind 0.0.0.0:8000 --workers "${WEB_CONCURRENCY:-4}" --threads "${WEB_THREADS:-8}"
+fi
+
+python manage.py runserver 0.0.0.0:8000
@@ -1,4 +1,7 @@
 import pytest
+from django.core.cache import cache
+
+from quiz.cache import answer_keys
 
 from .factories import AnswerFactory, QuestionFactory, QuizFactory, UserFactory
 
@@ -10,6 +13,16 @@ def use_dummy_max_cnt(settings):
     settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
 
 
+@pytest.fixture(autouse=True)
+def use_local_cache(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    # ids are reused after rollbacks, entries of previous tests must not be found
+    cache.clear()
+    answer_keys.clear()
+
+
 @pytest.fixture
 def user():
     return UserFactory(username="test", password="test")
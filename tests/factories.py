@@ -55,6 +55,7 @@ class QuizParticipantFactory(factory.django.DjangoModelFactory):
 
     quiz = factory.SubFactory(QuizFactory)
     user = factory.SubFactory(UserFactory)
+    key = fuzzy.FuzzyText(length=64)
 
 
 class QuizInvitationFactory(factory.django.DjangoModelFactory):
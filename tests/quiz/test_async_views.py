@@ -0,0 +1,115 @@
+import pytest
+from rest_framework.reverse import reverse
+
+from quiz.models import QuizParticipant
+from tests.factories import QuizParticipantFactory
+
+# views query the database from worker threads, so data has to be committed
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def test_async_quiz_detail(client, quiz):
+    participant = QuizParticipantFactory(quiz=quiz)
+    url = reverse("async-quizzes-detail", args=[quiz.id])
+    response = client.get(url, {"token": participant.key})
+    assert response.status_code == 200
+    assert response.json()["id"] == quiz.id
+    assert len(response.json()["questions"]) == 2
+    assert response.headers["Quiz-token"] == participant.key
+
+
+def test_async_quiz_detail_of_another_quiz(client, quiz):
+    participant = QuizParticipantFactory()
+    url = reverse("async-quizzes-detail", args=[quiz.id])
+    response = client.get(url, {"token": participant.key})
+    assert response.status_code == 404
+
+
+def test_async_answer_and_progress(client, quiz):
+    participant = QuizParticipantFactory(quiz=quiz)
+    client.force_login(participant.user)
+    question = quiz.questions.first()
+    request_data = {"question": question.id, "answer": question.answers.first().id}
+    url = reverse("async-quizzes-answer", args=[quiz.id])
+    response = client.post(url, request_data, content_type="application/json")
+    assert response.status_code == 200
+    assert response.json()["answered_questions_count"] == 1
+    response = client.post(url, request_data, content_type="application/json")
+    assert response.status_code == 400
+    response = client.get(reverse("async-quizzes-progress", args=[quiz.id]))
+    assert response.status_code == 200
+    assert response.json()["answered_questions_count"] == 1
+    participant.refresh_from_db()
+    assert participant.status == QuizParticipant.STATUS.attempted
+
+
+def test_async_answer_enqueued_in_stream_mode(client, quiz, settings, mocker):
+    settings.ANSWER_INGESTION = "stream"
+    enqueue_answers = mocker.patch("quiz.async_views.enqueue_answers", return_value=1)
+    participant = QuizParticipantFactory(quiz=quiz)
+    question = quiz.questions.first()
+    answer = question.answers.first()
+    response = client.post(
+        f'{reverse("async-quizzes-answer", args=[quiz.id])}?token={participant.key}',
+        {"question": question.id, "answer": answer.id},
+        content_type="application/json",
+    )
+    assert response.status_code == 202
+    assert response.json() == {
+        "answered_questions_count": 1,
+        "total_questions_count": 2,
+    }
+    enqueue_answers.assert_called_once_with(participant, [(question.id, answer.id)])
+    assert not participant.answers.exists()
+
+
+def test_async_answer_of_completed_participant(client, quiz):
+    participant = QuizParticipantFactory(
+        quiz=quiz, status=QuizParticipant.STATUS.completed
+    )
+    question = quiz.questions.first()
+    response = client.post(
+        f'{reverse("async-quizzes-answer", args=[quiz.id])}?token={participant.key}',
+        {"question": question.id, "answer": question.answers.first().id},
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+    assert response.json() == {"detail": "You have already completed this quiz"}
+
+
+def test_async_next_question(client, quiz):
+    participant = QuizParticipantFactory(quiz=quiz)
+    response = client.get(
+        reverse("async-quizzes-next", args=[quiz.id]), {"token": participant.key}
+    )
+    assert response.status_code == 200
+    assert response.json()["next_question"]["id"] == quiz.questions.first().id
+
+
+def test_async_conditional_get(client, quiz):
+    participant = QuizParticipantFactory(quiz=quiz)
+    etags = {}
+    for name in (
+        "async-quizzes-progress",
+        "async-quizzes-next",
+        "async-quizzes-detail",
+    ):
+        url = f"{reverse(name, args=[quiz.id])}?token={participant.key}"
+        response = client.get(url)
+        assert response.status_code == 200
+        etags[name] = response.headers["ETag"]
+        response = client.get(url, HTTP_IF_NONE_MATCH=etags[name])
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etags[name]
+    question = quiz.questions.first()
+    client.post(
+        f'{reverse("async-quizzes-answer", args=[quiz.id])}?token={participant.key}',
+        {"question": question.id, "answer": question.answers.first().id},
+        content_type="application/json",
+    )
+    response = client.get(
+        f'{reverse("async-quizzes-progress", args=[quiz.id])}?token={participant.key}',
+        HTTP_IF_NONE_MATCH=etags["async-quizzes-progress"],
+    )
+    assert response.status_code == 200
+    assert response.json()["answered_questions_count"] == 1
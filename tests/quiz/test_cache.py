@@ -0,0 +1,54 @@
+import pytest
+
+from quiz.cache import get_answer_key, get_participant_by_token
+from quiz.models import QuizParticipant
+from tests.factories import AnswerFactory, QuizParticipantFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_answer_key_is_cached(quiz, django_assert_num_queries):
+    answer_key = get_answer_key(quiz.id)
+    question = quiz.questions.first()
+    correct = question.answers.get(correct=True)
+    wrong = question.answers.get(correct=False)
+    with django_assert_num_queries(0):
+        assert get_answer_key(quiz.id) is answer_key
+        assert answer_key.has_answer(question.id, correct.id)
+        assert answer_key.points(question.id, correct.id) == question.score
+        assert answer_key.points(question.id, wrong.id) == 0
+    assert answer_key.order == tuple(quiz.questions.values_list("id", flat=True))
+
+
+def test_answer_key_invalidated_on_change(quiz, django_capture_on_commit_callbacks):
+    question = quiz.questions.first()
+    answer_key = get_answer_key(quiz.id)
+    with django_capture_on_commit_callbacks(execute=True):
+        answer = AnswerFactory(question=question)
+    assert not answer_key.has_answer(question.id, answer.id)
+    assert get_answer_key(quiz.id).has_answer(question.id, answer.id)
+    question_id = question.id
+    with django_capture_on_commit_callbacks(execute=True):
+        question.delete()
+    assert not get_answer_key(quiz.id).has_question(question_id)
+
+
+def test_invalidation_waits_for_commit(quiz, django_capture_on_commit_callbacks):
+    answer_key = get_answer_key(quiz.id)
+    with django_capture_on_commit_callbacks(execute=True):
+        AnswerFactory(question=quiz.questions.first())
+        # a concurrent request would cache the old key again under the new version
+        assert get_answer_key(quiz.id) is answer_key
+    assert get_answer_key(quiz.id).version != answer_key.version
+
+
+def test_participant_token_evicted_on_commit(quiz, django_capture_on_commit_callbacks):
+    participant = QuizParticipantFactory(quiz=quiz)
+    assert get_participant_by_token(participant.key) == participant
+    with django_capture_on_commit_callbacks(execute=True):
+        participant.status = QuizParticipant.STATUS.attempted
+        participant.save()
+        cached = get_participant_by_token(participant.key)
+        assert cached.status == QuizParticipant.STATUS.accepted
+    cached = get_participant_by_token(participant.key)
+    assert cached.status == QuizParticipant.STATUS.attempted
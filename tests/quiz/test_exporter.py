@@ -0,0 +1,45 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from quiz.exporter import export_quizzes
+from quiz.importer import import_quizzes
+from quiz.models import Quiz
+from tests.factories import QuizFactory, UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_export_quizzes(quiz, django_assert_max_num_queries):
+    quiz.tags.add("b", "a")
+    other = QuizFactory(questions=[], author=quiz.author)
+    quizzes = Quiz.objects.filter(pk__in=[quiz.pk, other.pk])
+    with django_assert_max_num_queries(4):
+        lines = list(export_quizzes(quizzes, chunk_size=10))
+    records = [json.loads(line) for line in lines]
+    assert [record["id"] for record in records] == [quiz.pk, other.pk]
+    assert records[0]["tags"] == ["a", "b"]
+    assert [q["question"] for q in records[0]["questions"]] == [
+        q.question for q in quiz.questions.all()
+    ]
+    assert len(records[0]["questions"][0]["answers"]) == 2
+    assert records[1]["questions"] == []
+
+
+def test_export_can_be_imported(quiz, user):
+    lines = list(export_quizzes(Quiz.objects.filter(pk=quiz.pk)))
+    quiz.delete()
+    report = import_quizzes(lines, user)
+    assert report.created == 1
+    imported = Quiz.objects.get(title=quiz.title)
+    assert imported.question_cnt == 2
+
+
+def test_export_command(quiz):
+    author = UserFactory(username="exporter")
+    QuizFactory(questions=[], author=author)
+    output = StringIO()
+    call_command("export_quizzes", author="exporter", stdout=output)
+    assert len(output.getvalue().splitlines()) == 1
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+from django.core.management import call_command
+
+from quiz.importer import CSV, import_quizzes
+from quiz.models import Quiz
+from tests.factories import QuizFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def quiz_record(title, tags=("tag",), correct=(True, False)):
+    return {
+        "title": title,
+        "tags": list(tags),
+        "questions": [
+            {
+                "question": f"{title} question {i}",
+                "score": i + 1,
+                "answers": [
+                    {"answer": str(j), "correct": value}
+                    for j, value in enumerate(correct)
+                ],
+            }
+            for i in range(3)
+        ],
+    }
+
+
+def test_import_jsonl(user):
+    lines = [json.dumps(quiz_record(f"Imported {i}")) + "\n" for i in range(5)]
+    report = import_quizzes(lines, user, chunk_size=2)
+    assert report.created == 5
+    assert not report.errors
+    quiz = Quiz.objects.get(title="Imported 3")
+    assert quiz.author == user
+    assert quiz.slug == "imported-3"
+    assert quiz.question_cnt == 3
+    assert quiz.max_score == 6
+    assert list(quiz.tags.names()) == ["tag"]
+    questions = list(quiz.questions.all())
+    assert [q.question for q in questions] == [
+        f"Imported 3 question {i}" for i in range(3)
+    ]
+    assert [a.correct for a in questions[0].answers.all()] == [True, False]
+
+
+def test_import_reports_rejected_records(user):
+    QuizFactory(title="Existing", questions=[])
+    lines = [
+        json.dumps(quiz_record("Valid")),
+        "{not json",
+        json.dumps(quiz_record("No correct answer", correct=(False, False))),
+        json.dumps(quiz_record("Existing")),
+        json.dumps(quiz_record("Valid")),
+    ]
+    report = import_quizzes(lines, user)
+    assert report.created == 1
+    assert [error.line for error in report.errors] == [2, 3, 4, 5]
+    assert "answers" in report.errors[1].errors["questions"][0]
+    assert "title" in report.errors[2].errors
+    assert "title" in report.errors[3].errors
+
+
+def test_import_csv(user):
+    lines = [
+        "title,description,tags,question,score,answer,correct\n",
+        'Quiz,Description,"a, b",Question 1,2,Yes,1\n',
+        "Quiz,,,Question 1,,No,0\n",
+        "Quiz,,,Question 2,,Yes,true\n",
+        "Quiz,,,Question 2,,No,\n",
+        "Another,,,Question,,Yes,1\n",
+        "Another,,,Question,,No,0\n",
+    ]
+    report = import_quizzes(lines, user, CSV)
+    assert report.created == 2
+    quiz = Quiz.objects.get(title="Quiz")
+    assert quiz.description == "Description"
+    assert sorted(quiz.tags.names()) == ["a", "b"]
+    assert quiz.question_cnt == 2
+    assert quiz.max_score == 3
+
+
+def test_import_command(user, tmp_path):
+    path = tmp_path / "quizzes.jsonl"
+    path.write_text(json.dumps(quiz_record("Imported")) + "\n[]\n")
+    report = tmp_path / "report.jsonl"
+    call_command("import_quizzes", str(path), author=user.username, report=report)
+    assert Quiz.objects.filter(title="Imported", author=user).exists()
+    errors = [json.loads(line) for line in report.read_text().splitlines()]
+    assert errors == [{"line": 2, "title": None, "errors": "Quiz object is expected"}]
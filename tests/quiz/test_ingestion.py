@@ -0,0 +1,116 @@
+import fakeredis
+import pytest
+from django.db import IntegrityError
+
+from quiz import ingestion
+from quiz.exceptions import QuizException
+from quiz.ingestion import CONSUMER_GROUP, drain_answer_stream, enqueue_answers
+from quiz.models import ParticipantAnswer, QuizParticipant
+from tests.factories import QuizParticipantFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def redis_client(mocker):
+    client = fakeredis.FakeRedis()
+    mocker.patch("quiz.ingestion._redis", return_value=client)
+    return client
+
+
+def _answers(quiz):
+    return [
+        (question.id, question.answers.get(correct=True).id)
+        for question in quiz.questions.all()
+    ]
+
+
+def test_enqueue_rejects_answered_questions(quiz, redis_client, settings):
+    participant = QuizParticipantFactory(quiz=quiz)
+    first, second = _answers(quiz)
+    assert enqueue_answers(participant, [first]) == 1
+    with pytest.raises(QuizException):
+        enqueue_answers(participant, [first])
+    # a batch with an answered question is rejected as a whole
+    with pytest.raises(QuizException):
+        enqueue_answers(participant, [second, first])
+    assert redis_client.xlen(settings.ANSWER_STREAM_NAME) == 1
+    assert enqueue_answers(participant, [second]) == 2
+
+
+def test_enqueue_seeds_answered_questions_from_database(quiz, redis_client):
+    participant = QuizParticipantFactory(quiz=quiz)
+    (question_id, answer_id), second = _answers(quiz)
+    ParticipantAnswer.objects.create(
+        participant=participant, question_id=question_id, answer_id=answer_id
+    )
+    with pytest.raises(QuizException):
+        enqueue_answers(participant, [(question_id, answer_id)])
+    assert enqueue_answers(participant, [second]) == 2
+
+
+def test_drain_saves_answers_and_acknowledges(quiz, redis_client, settings):
+    participant = QuizParticipantFactory(quiz=quiz)
+    enqueue_answers(participant, _answers(quiz))
+    assert drain_answer_stream() == 2
+    participant.refresh_from_db()
+    assert participant.answers.filter(batched=True).count() == 2
+    assert participant.status == QuizParticipant.STATUS.completed
+    assert participant.score == 2
+    stream = settings.ANSWER_STREAM_NAME
+    assert redis_client.xpending(stream, CONSUMER_GROUP)["pending"] == 0
+    assert redis_client.xlen(stream) == 0
+    assert drain_answer_stream() == 0
+
+
+def test_drain_claims_messages_of_crashed_consumer(quiz, redis_client, settings):
+    settings.ANSWER_STREAM_CLAIM_IDLE_MS = 0
+    stream = settings.ANSWER_STREAM_NAME
+    participant = QuizParticipantFactory(quiz=quiz)
+    redis_client.xgroup_create(stream, CONSUMER_GROUP, id="0", mkstream=True)
+    enqueue_answers(participant, _answers(quiz)[:1])
+    # read, but never acknowledged
+    redis_client.xreadgroup(CONSUMER_GROUP, "crashed", {stream: ">"})
+    assert redis_client.xpending(stream, CONSUMER_GROUP)["pending"] == 1
+
+    assert drain_answer_stream() == 1
+    assert participant.answers.count() == 1
+    assert redis_client.xpending(stream, CONSUMER_GROUP)["pending"] == 0
+
+
+def test_drain_drops_answers_of_deleted_participant(quiz, redis_client, settings):
+    deleted = QuizParticipantFactory(quiz=quiz, email="deleted@example.com")
+    participant = QuizParticipantFactory(quiz=quiz)
+    enqueue_answers(deleted, _answers(quiz))
+    enqueue_answers(participant, _answers(quiz)[:1])
+    deleted.delete()
+    assert drain_answer_stream() == 1
+    assert participant.answers.count() == 1
+    stream = settings.ANSWER_STREAM_NAME
+    assert redis_client.xpending(stream, CONSUMER_GROUP)["pending"] == 0
+    assert redis_client.xlen(stream) == 0
+
+
+def test_drain_moves_failing_answers_to_dead_letter_stream(
+    quiz, redis_client, settings, mocker
+):
+    participant = QuizParticipantFactory(quiz=quiz)
+    (failing_question, _), _ = answers = _answers(quiz)
+    enqueue_answers(participant, answers)
+    save_answers = ingestion.save_answers
+
+    def fail_on_question(entries):
+        if any(entry["question"] == failing_question for entry in entries):
+            raise IntegrityError
+        return save_answers(entries)
+
+    mocker.patch("quiz.ingestion.save_answers", side_effect=fail_on_question)
+    assert drain_answer_stream() == 1
+    assert list(participant.answers.values_list("question_id", flat=True)) == [
+        answers[1][0]
+    ]
+    ((_, fields),) = redis_client.xrange(settings.ANSWER_STREAM_DEAD_LETTER_NAME)
+    assert int(fields[b"question"]) == failing_question
+    stream = settings.ANSWER_STREAM_NAME
+    assert redis_client.xpending(stream, CONSUMER_GROUP)["pending"] == 0
+    assert redis_client.xlen(stream) == 0
@@ -0,0 +1,148 @@
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from faker import Faker
+from rest_framework.reverse import reverse
+
+from quiz import jobs
+from quiz.invitees import invite
+from quiz.models import *
+from tests.factories import QuizFactory, QuizParticipantFactory, UserFactory
+
+fake = Faker()
+
+pytestmark = pytest.mark.django_db
+
+
+def completed_participants(quiz, count, **kwargs):
+    return [
+        QuizParticipantFactory(
+            quiz=quiz,
+            email=fake.email(),
+            status=QuizParticipant.STATUS.completed,
+            **kwargs,
+        )
+        for _ in range(count)
+    ]
+
+
+def test_notify_sends_results_in_chunks(settings, mocker):
+    settings.NOTIFY_CHUNK_SIZE = 2
+    quiz = QuizFactory(questions=[])
+    participants = completed_participants(quiz, 3)
+    completed_participants(quiz, 1, notified=True)
+    QuizParticipantFactory(quiz=quiz, email=fake.email())
+    chunk = mocker.patch.object(
+        jobs.notify_chunk, "delay", side_effect=lambda *args: jobs.notify_chunk(*args)
+    )
+    run = NotificationRun.objects.create(quiz=quiz)
+
+    jobs.notify(run.id)
+
+    assert chunk.call_count == 2
+    assert sorted(to for msg in mail.outbox for to in msg.to) == sorted(
+        participant.email for participant in participants
+    )
+    assert quiz.participants.filter(notified=False).count() == 1
+    run.refresh_from_db()
+    assert run.status == NotificationRun.STATUS.finished
+    assert (run.total, run.sent, run.failed) == (3, 3, 0)
+    assert (run.chunks_total, run.chunks_done) == (2, 2)
+    assert run.progress == "100.0%"
+
+
+def test_notify_chunk_invalidates_participants_listing(
+    client, django_capture_on_commit_callbacks
+):
+    author = UserFactory()
+    quiz = QuizFactory(questions=[], author=author)
+    [participant] = completed_participants(quiz, 1)
+    client.force_login(author)
+    url = reverse("quizmaker-participants", args=[quiz.id])
+    etag = client.get(url)["ETag"]
+    run = NotificationRun.objects.create(quiz=quiz)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        jobs.notify_chunk(run.id, [participant.id])
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data["results"][0]["notified"]
+
+
+def test_notify_chunk_resumes_after_mail_error(mocker):
+    quiz = QuizFactory(questions=[])
+    participants = completed_participants(quiz, 3)
+    ids = [participant.id for participant in participants]
+    run = NotificationRun.objects.create(quiz=quiz)
+    send_messages = EmailBackend.send_messages
+    calls = 0
+
+    def fail_after_first(backend, messages):
+        nonlocal calls
+        calls += 1
+        if calls > 1:
+            raise ConnectionError("connection lost")
+        return send_messages(backend, messages)
+
+    mocker.patch.object(EmailBackend, "send_messages", fail_after_first)
+    with pytest.raises(ConnectionError):
+        jobs.notify_chunk(run.id, ids)
+    assert len(mail.outbox) == 1
+    assert list(
+        quiz.participants.filter(notified=True).values_list("id", flat=True)
+    ) == [ids[0]]
+
+    mocker.stopall()
+    assert jobs.notify_chunk(run.id, ids) == 2
+    assert len(mail.outbox) == 3
+    assert not quiz.participants.filter(notified=False).exists()
+    run.refresh_from_db()
+    assert (run.sent, run.failed, run.chunks_done) == (3, 0, 1)
+
+
+def test_send_invitations_in_batches(settings, mocker):
+    settings.INVITATION_BATCH_SIZE = 2
+    quiz = QuizFactory(questions=[])
+    emails = [fake.email() for _ in range(3)]
+    job = invite(quiz, enumerate(emails, start=1), UserFactory(), "http://testserver/")
+    batch = mocker.patch.object(
+        jobs.send_invitations_batch,
+        "delay",
+        side_effect=lambda *args: jobs.send_invitations_batch(*args),
+    )
+
+    jobs.send_invitations(job.id)
+
+    assert batch.call_count == 2
+    assert sorted(to for msg in mail.outbox for to in msg.to) == sorted(emails)
+    assert "http://testserver/" in mail.outbox[0].body
+    assert {invitation.delivery for invitation in job.invitations.all()} == {
+        QuizInvitation.DELIVERY.sent
+    }
+    job.refresh_from_db()
+    assert job.status == InvitationJob.STATUS.finished
+    assert (job.total, job.sent, job.failed) == (3, 3, 0)
+
+
+def test_send_invitations_batch_gives_up(mocker):
+    quiz = QuizFactory(questions=[])
+    job = invite(
+        quiz,
+        enumerate([fake.email(), fake.email()], start=1),
+        None,
+        "http://testserver/",
+    )
+    ids = list(job.invitations.values_list("id", flat=True))
+    mocker.patch.object(
+        EmailBackend, "send_messages", side_effect=ConnectionError("unavailable")
+    )
+    mocker.patch.object(jobs.send_invitations_batch, "max_retries", 0)
+
+    assert jobs.send_invitations_batch(job.id, ids) == 0
+
+    assert {invitation.delivery for invitation in job.invitations.all()} == {
+        QuizInvitation.DELIVERY.failed
+    }
+    job.refresh_from_db()
+    assert (job.sent, job.failed, job.chunks_done) == (0, 2, 1)
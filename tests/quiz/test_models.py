@@ -1,8 +1,16 @@
+import datetime
+from io import StringIO
+
 import pytest
+from django.core.management import call_command
+from django.utils import timezone
 from faker import Faker
 
+from quiz.cache import ACTIVITY, get_quiz_version
+from quiz.ingestion import save_answers
 from quiz.models import *
 from tests.factories import (
+    QuestionFactory,
     QuizFactory,
     QuizInvitationFactory,
     QuizParticipantFactory,
@@ -86,3 +94,214 @@ def test_user_associated_with_participant_if_exists():
     participant = QuizParticipant.objects.get(email=invitation.email)
     assert participant is not None
     assert participant.user == user
+
+
+def test_quiz_counters_follow_questions(quiz):
+    quiz.refresh_from_db()
+    assert quiz.question_cnt == 2
+    assert quiz.max_score == 2
+    quiz.questions.first().delete()
+    quiz.refresh_from_db()
+    assert quiz.question_cnt == 1
+    assert quiz.max_score == 1
+
+
+def test_stale_quiz_does_not_overwrite_counters():
+    quiz = QuizFactory(questions=[])
+    stale = Quiz.objects.get(pk=quiz.pk)
+    QuestionFactory(quiz=quiz)
+    stale.title = "Renamed"
+    stale.save()
+    quiz.refresh_from_db()
+    assert quiz.title == "Renamed"
+    assert quiz.question_cnt == 1
+
+
+def test_participant_counters_updated_on_answer(quiz):
+    participant = QuizParticipantFactory(quiz=quiz)
+    question = quiz.questions.first()
+    ParticipantAnswer.objects.create(
+        participant=participant,
+        question=question,
+        answer=question.answers.get(correct=True),
+    )
+    participant.refresh_from_db()
+    assert participant.answered_questions_count == 1
+    assert participant.current_score == question.score
+
+
+def test_stale_participant_does_not_overwrite_counters(quiz):
+    participant = QuizParticipantFactory(quiz=quiz)
+    stale = QuizParticipant.objects.get(pk=participant.pk)
+    question = quiz.questions.first()
+    ParticipantAnswer.objects.create(
+        participant=participant,
+        question=question,
+        answer=question.answers.get(correct=True),
+    )
+    stale.notified = True
+    stale.save()
+    stale.save(update_fields=["answered_questions_count", "current_score"])
+    participant.refresh_from_db()
+    assert participant.notified
+    assert participant.answered_questions_count == 1
+    assert participant.current_score == question.score
+
+
+def test_rebuild_counters_command(quiz, django_capture_on_commit_callbacks):
+    participant = QuizParticipantFactory(quiz=quiz)
+    for question in quiz.questions.all():
+        ParticipantAnswer.objects.create(
+            participant=participant,
+            question=question,
+            answer=question.answers.get(correct=True),
+        )
+    Quiz.objects.update(question_cnt=0, max_score=0)
+    QuizParticipant.objects.update(answered_questions_count=0, current_score=0)
+    version = get_quiz_version(quiz.id, ACTIVITY)
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("rebuild_counters", stdout=StringIO())
+    # cached listings of participants are invalidated
+    assert get_quiz_version(quiz.id, ACTIVITY) != version
+    quiz.refresh_from_db()
+    participant.refresh_from_db()
+    assert quiz.question_cnt == 2
+    assert participant.answered_questions_count == 2
+    assert participant.current_score == quiz.max_score
+
+
+def test_progress_counters_follow_invitations_and_participants(quiz, settings):
+    settings.PROGRESS_COUNTER_SHARDS = 4
+    invitations = [
+        QuizInvitationFactory(quiz=quiz, email=fake.email()) for _ in range(3)
+    ]
+    invitations[0].accepted = True
+    invitations[0].save()
+    invitations[1].delete()
+    participant = QuizParticipantFactory(quiz=quiz)
+    QuizParticipantFactory(quiz=quiz, email=fake.email())
+    question = quiz.questions.first()
+    ParticipantAnswer.objects.create(
+        participant=participant,
+        question=question,
+        answer=question.answers.first(),
+    )
+    quiz = Quiz.objects.get(pk=quiz.pk)
+    assert quiz.invitees_summary == [
+        {"accepted": False, "count": 1},
+        {"accepted": True, "count": 1},
+    ]
+    assert quiz.participants_summary == [
+        {"status": "accepted", "count": 1},
+        {"status": "attempted", "count": 1},
+    ]
+
+
+def test_rebuild_progress_counters(quiz):
+    QuizParticipantFactory(quiz=quiz)
+    QuizInvitationFactory(quiz=quiz)
+    QuizProgressCounter.objects.all().delete()
+    call_command("rebuild_counters", quiz_ids=[quiz.id], stdout=StringIO())
+    assert QuizProgressCounter.totals(quiz.id) == {
+        "invitations_pending": 1,
+        "invitations_accepted": 0,
+        "participants_accepted": 1,
+        "participants_attempted": 0,
+        "participants_completed": 0,
+    }
+
+
+def test_progress_counter_shards_created_with_quiz(settings):
+    settings.PROGRESS_COUNTER_SHARDS = 4
+    quiz = QuizFactory(questions=[])
+    assert quiz.progress_counters.count() == 4
+    QuizParticipantFactory(quiz=quiz)
+    assert quiz.progress_counters.count() == 4
+    call_command("rebuild_counters", quiz_ids=[quiz.id], stdout=StringIO())
+    assert quiz.progress_counters.count() == 4
+    assert quiz.progress_totals["participants_accepted"] == 1
+
+
+def test_stream_answers_saved_once(quiz):
+    participant = QuizParticipantFactory(quiz=quiz)
+    entries = [
+        {
+            "participant": participant.id,
+            "question": question.id,
+            "answer": question.answers.get(correct=True).id,
+            "points": question.score,
+        }
+        for question in quiz.questions.all()
+    ]
+    assert save_answers(entries) == 2
+    # redelivered entries are skipped
+    assert save_answers(entries) == 0
+    participant.refresh_from_db()
+    assert participant.answered_questions_count == 2
+    assert participant.status == QuizParticipant.STATUS.completed
+    assert participant.score == 2
+
+
+def test_quiz_for_participant_annotates_own_record(quiz):
+    participant = QuizParticipantFactory(
+        quiz=quiz, email=fake.email(), answered_questions_count=1
+    )
+    QuizParticipantFactory(quiz=quiz, email=fake.email())
+    quizzes = list(Quiz.for_user_or_participant(participant.user, participant))
+    assert quizzes == [quiz]
+    assert quizzes[0].participant_status == participant.status
+    assert quizzes[0].participant_answered_questions_count == 1
+
+
+def test_day_records_are_bounded_in_time_zone(settings):
+    settings.TIME_ZONE = "Asia/Tokyo"
+    day = datetime.date(2021, 6, 15)
+    start = timezone.make_aware(datetime.datetime(2021, 6, 15))
+    inside, before, after = QuizFactory.create_batch(3, questions=[])
+    Quiz.objects.filter(pk=inside.pk).update(created_at=start)
+    Quiz.objects.filter(pk=before.pk).update(
+        created_at=start - datetime.timedelta(microseconds=1)
+    )
+    Quiz.objects.filter(pk=after.pk).update(
+        created_at=start + datetime.timedelta(days=1)
+    )
+    assert list(Quiz.get_day_records(day)) == [inside]
+    assert inside not in Quiz.get_today_records()
+
+
+# the foreign keys are checked on commit
+@pytest.mark.django_db(transaction=True)
+def test_delete_quiz_with_participants_and_invitations():
+    quiz = QuizFactory(questions=[])
+    QuizParticipantFactory(quiz=quiz, email=fake.email())
+    QuizInvitationFactory(quiz=quiz)
+    quiz.delete()
+    assert not QuizProgressCounter.objects.exists()
+
+    quiz = QuizFactory(questions=[])
+    QuizParticipantFactory(quiz=quiz, email=fake.email())
+    QuizInvitationFactory(quiz=quiz)
+    quiz.author.delete()
+    assert not Quiz.objects.filter(pk=quiz.pk).exists()
+    assert not QuizProgressCounter.objects.exists()
+
+
+def test_counters_of_deleted_participant_of_another_shard(quiz, settings):
+    settings.PROGRESS_COUNTER_SHARDS = 1
+    participant = QuizParticipantFactory(quiz=quiz, email=fake.email())
+    settings.PROGRESS_COUNTER_SHARDS = 8
+    participant.delete()
+    assert QuizProgressCounter.objects.filter(quiz=quiz).count() == 1
+    assert quiz.progress_totals["participants_accepted"] == 0
+
+
+def test_invitations_added_by_chunks_skip_concurrent_ones(quiz):
+    job = InvitationJob.objects.create(quiz=quiz, base_url="http://testserver/")
+    job.add_invitations(["first@example.org", "second@example.org"], [])
+    # invited by someone else after the validation of the chunk
+    QuizInvitationFactory(quiz=quiz, email="third@example.org")
+    created = job.add_invitations(["third@example.org", "fourth@example.org"], [])
+    assert created == 1
+    job.refresh_from_db()
+    assert job.total == 3
+    assert quiz.progress_totals["invitations_pending"] == 4
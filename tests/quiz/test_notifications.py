@@ -0,0 +1,50 @@
+from quiz.notifications import NotificationRenderer
+
+
+def context(email, score, answers, quiz_title="Geography"):
+    return {
+        "id": 1,
+        "email": email,
+        "score": score,
+        "quiz_title": quiz_title,
+        "max_score": 2,
+        "answers": [
+            {"question": question, "answer": answer, "correct": correct}
+            for question, answer, correct in answers
+        ],
+    }
+
+
+def test_renderer_renders_results():
+    renderer = NotificationRenderer()
+    msg = renderer.render(
+        context(
+            "first@example.org",
+            1,
+            [
+                ("Capital of France?", "Paris", True),
+                ("Capital of Spain?", "Rome", False),
+            ],
+        )
+    )
+    assert msg.to == ["first@example.org"]
+    assert msg.subject == 'Quiz "Geography" results'
+    assert "You score is 1 out of 2" in msg.body
+    assert '- Question "Capital of France?": your answer "Paris" is right' in msg.body
+    assert '- Question "Capital of Spain?": your answer "Rome" is wrong' in msg.body
+
+
+def test_renderer_renders_shared_parts_once_per_quiz(mocker):
+    renderer = NotificationRenderer()
+    subject = mocker.spy(renderer.subject_template, "render")
+    answer = mocker.spy(renderer.answer_template, "render")
+    answers = [("Capital of France?", "Paris", True)]
+    for email in ["first@example.org", "second@example.org"]:
+        renderer.render(context(email, 1, answers))
+    assert subject.call_count == 1
+    assert answer.call_count == 1
+
+    msg = renderer.render(context("third@example.org", 1, answers, "History"))
+    assert msg.subject == 'Quiz "History" results'
+    assert subject.call_count == 2
+    assert answer.call_count == 2
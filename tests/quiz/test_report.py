@@ -0,0 +1,131 @@
+import datetime
+
+import pytest
+from django.utils import timezone
+from faker import Faker
+
+from quiz.models import *
+from quiz.report import get_daily_report, refresh_rollups
+from quiz.usage import get_usage_report
+from tests.factories import (
+    AnswerFactory,
+    QuizFactory,
+    QuizInvitationFactory,
+    QuizParticipantFactory,
+)
+
+fake = Faker()
+
+pytestmark = pytest.mark.django_db
+
+
+def test_rollups_account_changes_since_watermark(
+    settings, django_assert_max_num_queries
+):
+    settings.REPORT_ROLLUP_LAG = datetime.timedelta(0)
+    quiz = QuizFactory(questions=[])
+    participant = QuizParticipantFactory(quiz=quiz, email=fake.email())
+    refresh_rollups()
+    today = timezone.localdate()
+    assert DailyRollup.objects.get(day=today).participants == 1
+
+    QuizParticipantFactory(quiz=quiz, email=fake.email())
+    participant.status = QuizParticipant.STATUS.completed
+    participant.save()
+    refresh_rollups()
+
+    rollup = DailyQuizRollup.objects.get(day=today, quiz=quiz)
+    assert rollup.quiz_created
+    assert (rollup.participants_accepted, rollup.participants_completed) == (1, 1)
+    report = get_daily_report()
+    assert (report.summary.participants, report.summary.participants_completed) == (
+        2,
+        1,
+    )
+    assert [entry.title for entry in report.quizzes] == [quiz.title]
+
+    # nothing changed: the rollups aren't touched
+    with django_assert_max_num_queries(9):
+        refresh_rollups()
+
+
+def test_rollups_account_deletions(settings):
+    settings.REPORT_ROLLUP_LAG = datetime.timedelta(0)
+    today = timezone.localdate()
+    quiz, other = QuizFactory.create_batch(2, questions=[])
+    participant = QuizParticipantFactory(quiz=quiz, email=fake.email())
+    QuizParticipantFactory(quiz=quiz, email=fake.email())
+    refresh_rollups()
+    assert DailyRollup.objects.get(day=today).participants == 2
+
+    participant.delete()
+    refresh_rollups()
+    assert DailyQuizRollup.objects.get(day=today, quiz=quiz).participants == 1
+    assert DailyRollup.objects.get(day=today).participants == 1
+
+    quiz.delete()
+    refresh_rollups()
+    rollups = DailyQuizRollup.objects.filter(day=today)
+    assert list(rollups.values_list("quiz_id", flat=True)) == [other.id]
+    totals = DailyRollup.objects.get(day=today)
+    assert (totals.quizzes_created, totals.participants) == (1, 0)
+    assert not RollupChange.objects.exists()
+
+
+def test_finished_days_are_finalized(settings):
+    quiz = QuizFactory(questions=[])
+    QuizParticipantFactory(quiz=quiz, email=fake.email())
+    refresh_rollups()
+    today = timezone.localdate()
+    assert DailyRollup.objects.get(day=today).finalized_at is None
+
+    tomorrow = timezone.now() + datetime.timedelta(days=1)
+    refresh_rollups(now=tomorrow + settings.REPORT_ROLLUP_LAG)
+    rollup = DailyRollup.objects.get(day=today)
+    assert rollup.finalized_at is not None
+    assert quiz.title in rollup.csv_report
+    assert quiz.title in rollup.json_report
+
+    # late changes of a finalized day aren't accounted anymore
+    QuizParticipantFactory(quiz=quiz, email=fake.email())
+    refresh_rollups(now=tomorrow + 2 * settings.REPORT_ROLLUP_LAG)
+    assert DailyRollup.objects.get(day=today).participants == 1
+
+
+def _at(*args) -> datetime.datetime:
+    return timezone.make_aware(datetime.datetime(*args))
+
+
+def test_usage_report_by_buckets(django_assert_max_num_queries):
+    monday = _at(2022, 3, 7, 10, 30)
+    quiz = QuizFactory(questions=[])
+    Quiz.objects.filter(pk=quiz.pk).update(created_at=monday)
+    QuizInvitationFactory(quiz=quiz, sent=monday, accepted=True)
+    QuizInvitationFactory(quiz=quiz, sent=monday + datetime.timedelta(hours=2))
+    participant = QuizParticipantFactory(
+        quiz=quiz, email=fake.email(), status=QuizParticipant.STATUS.completed
+    )
+    QuizParticipant.objects.filter(pk=participant.pk).update(created_at=monday)
+    answer = AnswerFactory(question__quiz=quiz)
+    ParticipantAnswer.objects.create(
+        participant=participant, question=answer.question, answer=answer
+    )
+    participant.answers.update(created_at=monday + datetime.timedelta(hours=1))
+
+    with django_assert_max_num_queries(4):
+        hours = get_usage_report(_at(2022, 3, 7, 10), _at(2022, 3, 7, 13), "hour")
+    assert [bucket.start for bucket in hours] == [
+        _at(2022, 3, 7, hour) for hour in (10, 11, 12)
+    ]
+    assert [bucket.quizzes_created for bucket in hours] == [1, 0, 0]
+    assert [bucket.invitations_sent for bucket in hours] == [1, 0, 1]
+    assert [bucket.invitations_accepted for bucket in hours] == [1, 0, 0]
+    assert [bucket.participants["completed"] for bucket in hours] == [1, 0, 0]
+    assert [bucket.answers_submitted for bucket in hours] == [0, 1, 0]
+
+    # the week of the start is reported whole, the range still bounds the rows
+    weeks = get_usage_report(_at(2022, 3, 9), _at(2022, 3, 21), "week")
+    assert [bucket.start for bucket in weeks] == [_at(2022, 3, 7), _at(2022, 3, 14)]
+    assert [bucket.quizzes_created for bucket in weeks] == [0, 0]
+    days = get_usage_report(_at(2022, 3, 6), _at(2022, 3, 8), "day")
+    assert [bucket.invitations_sent for bucket in days] == [0, 2]
@@ -1,11 +1,16 @@
+import csv
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
 from faker import Faker
 from rest_framework.reverse import reverse
 
 from core.utils import generate_random_string
+from quiz.models import NotificationRun, ParticipantAnswer, Quiz, QuizParticipant
+from quiz.report import refresh_rollups
 from tests.factories import *
 
 fake = Faker()
@@ -169,9 +174,9 @@ def test_invitation_is_not_sent_twice(client, user):
         data=json.dumps([email]),
         content_type="application/json",
     )
-    assert response.status_code == 201
-    assert email in response.data["valid"][0]
-    assert response.data["valid"][0][email] == "invited"
+    assert response.status_code == 202
+    assert response.data["total"] == 1
+    assert response.data["invalid"] == []
     response = client.post(
         url,
         data=json.dumps([email]),
@@ -223,6 +228,8 @@ def test_can_my_quiz_as_participant(client, user):
     response = client.get(url)
     assert response.status_code == 200
     assert response.data["count"] == 1
+    assert response.data["results"][0]["participant_status"] == participant.status
+    assert response.data["results"][0]["participant_progress"] == "0.0%"
     url = reverse("quizzes-detail", args=[quiz.id])
     response = client.get(url)
     assert response.status_code == 200
@@ -236,3 +243,597 @@ def test_cannot_see_quizzes_that_i_am_not_invited(client, user):
     response = client.get(url)
     assert response.status_code == 200
     assert response.data["count"] == 0
+
+
+def test_participant_answers_batch(client, quiz):
+    participant = QuizParticipantFactory(quiz=quiz)
+    client.force_login(participant.user)
+    request_data = [
+        {"question": question.id, "answer": question.answers.first().id}
+        for question in quiz.questions.all()
+    ]
+    url = reverse("quizzes-answers", args=[quiz.id])
+    response = client.post(
+        url, data=json.dumps(request_data), content_type="application/json"
+    )
+    assert response.status_code == 200
+    assert response.data["answered_questions_count"] == len(request_data)
+    participant.refresh_from_db()
+    assert participant.status == QuizParticipant.STATUS.completed
+    assert participant.score is not None
+
+
+def test_participant_answers_batch_rejected_as_a_whole(client, quiz):
+    participant = QuizParticipantFactory(quiz=quiz)
+    client.force_login(participant.user)
+    question = quiz.questions.first()
+    request_data = [
+        {"question": question.id, "answer": question.answers.first().id},
+        {"question": question.id, "answer": question.answers.last().id},
+    ]
+    url = reverse("quizzes-answers", args=[quiz.id])
+    response = client.post(
+        url, data=json.dumps(request_data), content_type="application/json"
+    )
+    assert response.status_code == 400
+    assert not response.data[0]
+    assert response.data[1]
+    assert not participant.answers.exists()
+
+
+def test_participant_answers_batch_is_bounded(client, quiz):
+    participant = QuizParticipantFactory(quiz=quiz)
+    client.force_login(participant.user)
+    question = quiz.questions.first()
+    url = reverse("quizzes-answers", args=[quiz.id])
+    request_data = [
+        {"question": question.id, "answer": question.answers.first().id}
+    ] * (quiz.questions.count() + 1)
+    response = client.post(
+        url, data=json.dumps(request_data), content_type="application/json"
+    )
+    assert response.status_code == 400
+    assert not participant.answers.exists()
+
+
+def test_completed_participant_cannot_answer(client, quiz):
+    participant = QuizParticipantFactory(
+        quiz=quiz, status=QuizParticipant.STATUS.completed
+    )
+    client.force_login(participant.user)
+    question = quiz.questions.first()
+    request_data = [{"question": question.id, "answer": question.answers.first().id}]
+    response = client.post(
+        reverse("quizzes-answers", args=[quiz.id]),
+        data=json.dumps(request_data),
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+    response = client.post(reverse("quizzes-answer", args=[quiz.id]), request_data[0])
+    assert response.status_code == 400
+
+
+def test_participant_resolved_by_cached_token(
+    client, quiz, django_capture_on_commit_callbacks
+):
+    participant = QuizParticipantFactory(quiz=quiz)
+    question = quiz.questions.first()
+    url = reverse("quizzes-answer", args=[quiz.id])
+    request_data = {
+        "question": question.id,
+        "answer": question.answers.first().id,
+    }
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(f"{url}?token={participant.key}", request_data)
+    assert response.status_code == 200
+    assert response.data["answered_questions_count"] == 1
+    # participant is not cached with outdated status after answering
+    url = reverse("quizzes-progress", args=[quiz.id])
+    response = client.get(url, HTTP_QUIZ_TOKEN=participant.key)
+    assert response.status_code == 200
+    assert response.data["answered_questions_count"] == 1
+
+
+def test_participant_answer_enqueued_in_stream_mode(client, quiz, settings, mocker):
+    settings.ANSWER_INGESTION = "stream"
+    enqueue_answers = mocker.patch("quiz.views.enqueue_answers", return_value=1)
+    participant = QuizParticipantFactory(quiz=quiz)
+    client.force_login(participant.user)
+    question = quiz.questions.first()
+    answer = question.answers.first()
+    url = reverse("quizzes-answer", args=[quiz.id])
+    response = client.post(url, {"question": question.id, "answer": answer.id})
+    assert response.status_code == 202
+    assert response.data["answered_questions_count"] == 1
+    enqueue_answers.assert_called_once_with(participant, [(question.id, answer.id)])
+    assert not participant.answers.exists()
+
+
+def test_participant_progress_conditional_get(client, quiz):
+    participant = QuizParticipantFactory(quiz=quiz)
+    client.force_login(participant.user)
+    url = reverse("quizzes-progress", args=[quiz.id])
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response["ETag"]
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    question = quiz.questions.first()
+    client.post(
+        reverse("quizzes-answer", args=[quiz.id]),
+        {"question": question.id, "answer": question.answers.first().id},
+    )
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data["answered_questions_count"] == 1
+
+
+def test_quiz_progress_conditional_get(
+    client, user, django_capture_on_commit_callbacks
+):
+    quiz = QuizFactory(questions=[], author=user)
+    client.force_login(user)
+    url = reverse("quizmaker-progress", args=[quiz.id])
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response["ETag"]
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    with django_capture_on_commit_callbacks(execute=True):
+        QuizParticipantFactory(quiz=quiz)
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+def test_participant_token_is_bound_to_quiz(client, quiz):
+    participant = QuizParticipantFactory()
+    question = quiz.questions.first()
+    url = reverse("quizzes-answer", args=[quiz.id])
+    response = client.post(
+        f"{url}?token={participant.key}",
+        {"question": question.id, "answer": question.answers.first().id},
+    )
+    assert response.status_code == 404
+
+
+def test_participant_answer_does_not_depend_on_quiz_size(
+    client, quiz, django_assert_max_num_queries
+):
+    participant = QuizParticipantFactory(quiz=quiz)
+    for _ in range(10):
+        QuizParticipantFactory(quiz=quiz, email=fake.email())
+    question = quiz.questions.first()
+    url = reverse("quizzes-answer", args=[quiz.id])
+    client.get(reverse("quizzes-progress", args=[quiz.id]), {"token": participant.key})
+    with django_assert_max_num_queries(9):
+        response = client.post(
+            f"{url}?token={participant.key}",
+            {"question": question.id, "answer": question.answers.first().id},
+        )
+    assert response.status_code == 200
+
+
+def test_participant_answer_returns_next_question(client, quiz):
+    participant = QuizParticipantFactory(quiz=quiz)
+    first, second = quiz.questions.all()
+    url = reverse("quizzes-answer", args=[quiz.id])
+    response = client.post(
+        f"{url}?token={participant.key}&view=next",
+        {"question": first.id, "answer": first.answers.first().id},
+    )
+    assert response.status_code == 200
+    assert response.data["answered_questions_count"] == 1
+    assert response.data["next_question"]["id"] == second.id
+    assert "remaining_questions" not in response.data
+    response = client.post(
+        url,
+        {"question": second.id, "answer": second.answers.first().id},
+        HTTP_QUIZ_TOKEN=participant.key,
+        HTTP_ACCEPT='application/json; profile="next"',
+    )
+    assert response.status_code == 200
+    assert response.data["next_question"] is None
+
+
+def test_participant_next_question(client, quiz):
+    participant = QuizParticipantFactory(quiz=quiz)
+    client.force_login(participant.user)
+    url = reverse("quizzes-next", args=[quiz.id])
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data["next_question"]["id"] == quiz.questions.first().id
+    assert len(response.data["next_question"]["answers"]) == 2
+    progress = client.get(reverse("quizzes-progress", args=[quiz.id]))
+    assert progress["ETag"] != response["ETag"]
+
+
+def test_create_quiz_query_count_does_not_depend_on_size(
+    client, user, settings, django_assert_max_num_queries
+):
+    settings.MAX_QUESTIONS_PER_QUIZ = 50
+    settings.MAX_ANSWERS_PER_QUESTION = 10
+    client.force_login(user)
+    request_data = {
+        "title": generate_random_string(),
+        "questions": [
+            {
+                "question": f"Question {i}",
+                "score": 2,
+                "answers": [
+                    {"answer": str(j), "correct": j == i % 10} for j in range(10)
+                ],
+            }
+            for i in range(50)
+        ],
+    }
+    with django_assert_max_num_queries(20):
+        response = client.post(
+            reverse("quizmaker-list"),
+            data=json.dumps(request_data),
+            content_type="application/json",
+        )
+    assert response.status_code == 201
+    quiz = Quiz.objects.get(pk=response.data["id"])
+    assert quiz.question_cnt == 50
+    assert quiz.max_score == 100
+    questions = list(quiz.questions.prefetch_related("answers"))
+    assert [q.question for q in questions] == [f"Question {i}" for i in range(50)]
+    assert [a.answer for a in questions[3].answers.all()] == [str(j) for j in range(10)]
+    assert [a.order for a in questions[3].answers.all()] == list(range(10))
+
+
+def test_bulk_import_quizzes(client, user):
+    client.force_login(user)
+    record = {
+        "title": "Imported",
+        "questions": [
+            {
+                "question": "Question",
+                "answers": [
+                    {"answer": "1", "correct": True},
+                    {"answer": "2", "correct": False},
+                ],
+            }
+        ],
+    }
+    upload = SimpleUploadedFile(
+        "quizzes.jsonl", f"{json.dumps(record)}\n{{}}\n".encode()
+    )
+    response = client.post(reverse("quizmaker-bulk-import"), {"file": upload})
+    assert response.status_code == 201
+    assert response.data["created"] == 1
+    assert response.data["failed"] == 1
+    assert response.data["errors"][0]["line"] == 2
+    assert Quiz.objects.get(title="Imported").author == user
+
+
+def test_bulk_import_stops_at_invalid_line(client, user):
+    client.force_login(user)
+    record = {
+        "title": "Imported",
+        "questions": [
+            {
+                "question": "Question",
+                "answers": [
+                    {"answer": "1", "correct": True},
+                    {"answer": "2", "correct": False},
+                ],
+            }
+        ],
+    }
+    upload = SimpleUploadedFile(
+        "quizzes.jsonl", f"{json.dumps(record)}\n".encode() + b"\xff\xfe\n"
+    )
+    response = client.post(reverse("quizmaker-bulk-import"), {"file": upload})
+    assert response.status_code == 201
+    assert response.data["created"] == 1
+    assert response.data["errors"][0]["line"] == 2
+    assert response.data["errors"][0]["errors"].startswith("Invalid file")
+
+    upload = SimpleUploadedFile("quizzes.csv", b"\xff\xfe")
+    response = client.post(reverse("quizmaker-bulk-import"), {"file": upload})
+    assert response.status_code == 400
+    assert response.data["created"] == 0
+    assert response.data["failed"] == 1
+
+
+def test_export_quizzes(client, user):
+    quiz = QuizFactory(author=user)
+    QuizFactory()
+    client.force_login(user)
+    response = client.get(reverse("quizmaker-export"))
+    assert response.status_code == 200
+    assert response.streaming
+    records = [json.loads(line) for line in response.streaming_content]
+    assert [record["id"] for record in records] == [quiz.id]
+    assert len(records[0]["questions"]) == 3
+
+
+def test_quiz_participants_query_count_does_not_depend_on_page_size(
+    client, user, django_assert_max_num_queries
+):
+    quiz = QuizFactory(author=user)
+    for _ in range(20):
+        QuizParticipantFactory(quiz=quiz, email=fake.email())
+    client.force_login(user)
+    url = reverse("quizmaker-participants", args=[quiz.id])
+    with django_assert_max_num_queries(5):
+        response = client.get(url, {"limit": 20})
+    assert response.status_code == 200
+    assert len(response.data["results"]) == 20
+    assert response.data["results"][0]["score_str"] == "0 out of 3"
+
+
+def test_quiz_participants_keyset_pagination(client, user):
+    quiz = QuizFactory(author=user, questions=[])
+    participants = [
+        QuizParticipantFactory(quiz=quiz, email=fake.email()) for _ in range(5)
+    ]
+    client.force_login(user)
+    url = reverse("quizmaker-participants", args=[quiz.id])
+    response = client.get(url, {"pagination": "cursor", "limit": 2})
+    assert response.status_code == 200
+    assert "count" not in response.data
+    ids = [item["id"] for item in response.data["results"]]
+    while response.data["next"]:
+        response = client.get(response.data["next"])
+        ids += [item["id"] for item in response.data["results"]]
+    assert ids == [participant.id for participant in reversed(participants)]
+
+
+def test_quiz_stats_are_refreshed_with_new_answers(
+    client, user, django_assert_max_num_queries, django_capture_on_commit_callbacks
+):
+    quiz = QuizFactory(author=user, questions=[])
+    question = QuestionFactory(quiz=quiz)
+    right = AnswerFactory(question=question, correct=True)
+    wrong = AnswerFactory(question=question)
+
+    def answer(choice):
+        participant = QuizParticipantFactory(quiz=quiz, email=fake.email())
+        QuizParticipant.objects.filter(pk=participant.pk).update(
+            created_at=timezone.now() - timedelta(seconds=10)
+        )
+        with django_capture_on_commit_callbacks(execute=True):
+            ParticipantAnswer.objects.create(
+                participant=participant, question=question, answer=choice
+            )
+
+    answer(right)
+    answer(wrong)
+    client.force_login(user)
+    url = reverse("quizmaker-stats", args=[quiz.id])
+    response = client.get(url)
+    assert response.status_code == 200
+    [stats] = response.data["questions"]
+    assert (stats["id"], stats["answered"], stats["correct"]) == (
+        question.id,
+        2,
+        "50.0%",
+    )
+    assert 10 <= stats["average_time"] < 11
+    assert [(a["id"], a["picked"]) for a in stats["answers"]] == [
+        (right.id, 1),
+        (wrong.id, 1),
+    ]
+
+    answer(right)
+    # only the new answer is aggregated
+    with django_assert_max_num_queries(5):
+        response = client.get(url)
+    [stats] = response.data["questions"]
+    assert (stats["answered"], stats["correct"]) == (3, f"{200 / 3}%")
+    response = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == 304
+
+    client.force_login(UserFactory())
+    assert client.get(url).status_code == 404
+
+
+def test_quiz_stats_do_not_time_batched_answers(client, user, quiz):
+    Quiz.objects.filter(pk=quiz.pk).update(author=user)
+    participant = QuizParticipantFactory(quiz=quiz)
+    client.force_login(participant.user)
+    request_data = [
+        {"question": question.id, "answer": question.answers.first().id}
+        for question in quiz.questions.all()
+    ]
+    response = client.post(
+        reverse("quizzes-answers", args=[quiz.id]),
+        data=json.dumps(request_data),
+        content_type="application/json",
+    )
+    assert response.status_code == 200
+    assert participant.answers.filter(batched=True).count() == 2
+
+    client.force_login(user)
+    response = client.get(reverse("quizmaker-stats", args=[quiz.id]))
+    assert [
+        (stats["answered"], stats["average_time"])
+        for stats in response.data["questions"]
+    ] == [(1, None), (1, None)]
+
+
+@pytest.mark.parametrize("count", ["false", "estimate"])
+def test_quiz_list_without_exact_count(client, user, count):
+    for _ in range(3):
+        QuizFactory(author=user, questions=[])
+    client.force_login(user)
+    url = reverse("quizmaker-list")
+    response = client.get(url, {"count": count, "limit": 2})
+    assert response.status_code == 200
+    assert len(response.data["results"]) == 2
+    assert response.data["count"] == (None if count == "false" else 3)
+    response = client.get(response.data["next"])
+    assert len(response.data["results"]) == 1
+    assert response.data["next"] is None
+
+
+def test_quiz_notify_starts_run(client, user):
+    quiz = QuizFactory(author=user, questions=[])
+    client.force_login(user)
+    response = client.post(reverse("quizmaker-notify", args=[quiz.id]))
+    assert response.status_code == 202
+    assert response.data["status"] == "pending"
+    response = client.get(reverse("quizmaker-notifications", args=[quiz.id]))
+    assert response.status_code == 200
+    assert [run["id"] for run in response.data["results"]] == [
+        quiz.notification_runs.get().id
+    ]
+
+
+def test_quiz_notify_returns_run_in_progress(client, user, mocker):
+    mocker.patch("quiz.jobs.notify.delay")
+    quiz = QuizFactory(author=user, questions=[])
+    client.force_login(user)
+    url = reverse("quizmaker-notify", args=[quiz.id])
+    first = client.post(url).data["id"]
+    assert client.post(url).data["id"] == first
+    assert quiz.notification_runs.count() == 1
+    NotificationRun.objects.filter(pk=first).update(
+        status=NotificationRun.STATUS.finished
+    )
+    assert client.post(url).data["id"] != first
+
+
+def test_invite_validates_emails_at_once(
+    client, user, mocker, django_assert_max_num_queries
+):
+    quiz = QuizFactory(questions=[], author=user)
+    QuizInvitationFactory(quiz=quiz, email="pending@example.org")
+    QuizInvitationFactory(quiz=quiz, email="accepted@example.org", accepted=True)
+    emails = [f"invitee{i}@example.org" for i in range(30)]
+    send = mocker.patch("quiz.jobs.send_invitations.delay")
+    client.force_login(user)
+    with django_assert_max_num_queries(20):
+        response = client.post(
+            reverse("quizmaker-invite", args=[quiz.id]),
+            data=json.dumps(
+                emails
+                + ["Pending@example.org", "accepted@example.org", "bad", emails[0]]
+            ),
+            content_type="application/json",
+        )
+    assert response.status_code == 202
+    assert response.data["total"] == 30
+    assert response.data["invalid"] == [
+        {"Pending@example.org": "pending invite"},
+        {"accepted@example.org": "already accepted"},
+        {"bad": "invalid email"},
+        {emails[0]: "duplicate"},
+    ]
+    assert response.data["rejected"] == 4
+    assert quiz.progress_totals["invitations_pending"] == 31
+    job_id = response.data["id"]
+    send.assert_not_called()  # dispatched on commit of the request
+
+    response = client.get(
+        reverse("quizmaker-invitation-job", args=[quiz.id, job_id]), {"limit": 10}
+    )
+    assert response.status_code == 200
+    assert response.data["count"] == 30
+    assert response.data["job"]["status"] == "pending"
+    assert response.data["results"][0]["email"] == emails[0]
+    assert response.data["results"][0]["delivery"] == "queued"
+
+
+def test_invite_upload_csv(client, user, settings):
+    settings.INVITATION_UPLOAD_CHUNK_SIZE = 2
+    quiz = QuizFactory(questions=[], author=user)
+    QuizInvitationFactory(quiz=quiz, email="accepted@example.org", accepted=True)
+    upload = SimpleUploadedFile(
+        "invitees.csv",
+        b"Name,Email\n"
+        b"First,first@Example.org\n"
+        b"Second,second@example.org\n"
+        b"Bad,not an email\n"
+        b"Again,FIRST@example.org\n"
+        b"Accepted,accepted@example.org\n",
+    )
+    client.force_login(user)
+    response = client.post(
+        reverse("quizmaker-invite-upload", args=[quiz.id]), {"file": upload}
+    )
+    assert response.status_code == 202
+    assert (response.data["total"], response.data["rejected"]) == (2, 3)
+    assert set(quiz.invitations.values_list("email", flat=True)) == {
+        "first@example.org",
+        "second@example.org",
+        "accepted@example.org",
+    }
+
+    response = client.get(
+        reverse("quizmaker-invitation-rejections", args=[quiz.id, response.data["id"]])
+    )
+    assert response.status_code == 200
+    assert response["Content-Type"] == "text/csv"
+    assert b"".join(response.streaming_content).decode().splitlines() == [
+        "line,email,reason",
+        "4,not an email,invalid email",
+        "5,FIRST@example.org,duplicate",
+        "6,accepted@example.org,already accepted",
+    ]
+
+
+def test_invite_upload_requires_email_column(client, user):
+    quiz = QuizFactory(questions=[], author=user)
+    upload = SimpleUploadedFile("invitees.csv", b"name\nFirst\n")
+    client.force_login(user)
+    response = client.post(
+        reverse("quizmaker-invite-upload", args=[quiz.id]), {"file": upload}
+    )
+    assert response.status_code == 400
+    assert not quiz.invitation_jobs.exists()
+
+
+@pytest.mark.parametrize("output_format", ["csv", "json"])
+def test_daily_report_is_streamed(client, output_format):
+    admin = UserFactory(is_staff=True)
+    quiz = QuizFactory(title="Reported quiz", author=admin)
+    QuizParticipantFactory(quiz=quiz, email="reported@example.org")
+    refresh_rollups()
+    client.force_login(admin)
+    response = client.get(reverse("daily-report"), {"output_format": output_format})
+    assert response.status_code == 200
+    assert response.streaming
+    content = b"".join(response.streaming_content).decode()
+    if output_format == "json":
+        report = json.loads(content)
+        assert report["summary"]["participants"] == 1
+        assert [entry["title"] for entry in report["quizzes"]] == ["Reported quiz"]
+        assert report["quizzes"][0]["questions_count"] == 3
+        assert report["participants"] == [
+            {
+                "quiz": "Reported quiz",
+                "accepted": 1,
+                "attempted": 0,
+                "completed": 0,
+                "answers_given": 0,
+                "total_score": 0,
+            }
+        ]
+    else:
+        rows = list(csv.reader(content.splitlines()))
+        assert rows[6][:3] == ["Reported quiz", admin.username, "3"]
+        assert rows[-1] == ["Reported quiz", "1", "0", "0", "0", "0"]
+
+
+def test_usage_report(client):
+    admin = UserFactory(is_staff=True)
+    QuizFactory(questions=[], author=admin)
+    client.force_login(admin)
+    today = timezone.localdate()
+    response = client.get(
+        reverse("usage-report"),
+        {"start": today.isoformat(), "bucket": "hour"},
+    )
+    assert response.status_code == 200
+    assert sum(bucket["quizzes_created"] for bucket in response.data["results"]) == 1
+
+    response = client.get(
+        reverse("usage-report"), {"start": "2000-01-01", "bucket": "hour"}
+    )
+    assert response.status_code == 400
+    response = client.get(reverse("usage-report"), {"start": "yesterday"})
+    assert response.status_code == 400